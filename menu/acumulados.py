@@ -0,0 +1,26 @@
+# ============================================================
+# acumulados.py
+# Filas contador (acumulados) que se suben con UPDATE ... SET
+# campo = campo + n, sin leerlas antes.
+#
+# Lo usan las ventas diarias (reportes.py), los contadores del
+# dashboard (contadores.py), los pares "se pide junto con"
+# (recomendaciones.py) y las versiones de caché (versiones.py).
+# ============================================================
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+
+def sumar_acumulado(modelo, clave, valores):
+    """Suma `valores` a la fila `clave` de un acumulado (la crea si no existe)."""
+    incrementos = {campo: F(campo) + valor for campo, valor in valores.items()}
+    if modelo.objects.filter(**clave).update(**incrementos):
+        return
+
+    try:
+        with transaction.atomic():
+            modelo.objects.create(**clave, **valores)
+    except IntegrityError:
+        # Otro proceso la creó al mismo tiempo
+        modelo.objects.filter(**clave).update(**incrementos)
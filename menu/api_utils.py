@@ -1,8 +1,16 @@
 # api_utils.py
 
+import copy
+
 from django.http import JsonResponse
+from . import versiones
 from .models import ApiToken
 
+# Tokens ya validados en este proceso: {key: usuario}. Se vacía al
+# cambiar cualquier token o usuario (versiones.TOKENS).
+_tokens = {"version": None, "usuarios": {}}
+TOKENS_EN_MEMORIA = 10000
+
 
 def get_user_from_token(request):
     """
@@ -28,12 +36,22 @@ def get_user_from_token(request):
 
     token_key = auth_header.replace("Token ", "").strip()
 
-    # Buscamos el token en la BD
-    try:
-        api_token = ApiToken.objects.get(key=token_key)
-        return api_token.user
-    except ApiToken.DoesNotExist:
-        return None
+    actual = versiones.version(versiones.TOKENS)
+    if _tokens["version"] != actual or len(_tokens["usuarios"]) > TOKENS_EN_MEMORIA:
+        _tokens["usuarios"] = {}
+        _tokens["version"] = actual
+
+    # Buscamos el token en la BD (solo la primera vez en este proceso)
+    usuario = _tokens["usuarios"].get(token_key)
+    if usuario is None:
+        try:
+            usuario = ApiToken.objects.select_related("user").get(key=token_key).user
+        except ApiToken.DoesNotExist:
+            return None
+        _tokens["usuarios"][token_key] = usuario
+
+    # Copia: que un request no modifique el usuario que ven los demás
+    return copy.copy(usuario)
 
 from .models import Carrito
 
@@ -43,3 +61,82 @@ def get_or_create_carrito(user):
     """
     carrito, creado = Carrito.objects.get_or_create(usuario=user)
     return carrito
+
+
+# -----------------------------
+# IDEMPOTENCY-KEY
+# -----------------------------
+from datetime import timedelta
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils import timezone
+
+from .models import IdempotenciaPago
+
+
+def get_idempotency_key(request):
+    """
+    Lee el header Idempotency-Key que manda la app al confirmar un pago.
+
+    Retorna:
+    - la clave (str) si viene
+    - None si no viene o viene vacía
+    """
+    clave = request.headers.get("Idempotency-Key", "").strip()
+    return clave or None
+
+
+def idempotency_expiration():
+    """
+    Fecha límite: los registros creados antes de esto ya expiraron.
+    El TTL se configura con IDEMPOTENCIA_TTL_HORAS en settings.
+    """
+    horas = getattr(settings, "IDEMPOTENCIA_TTL_HORAS", 24)
+    return timezone.now() - timedelta(hours=horas)
+
+
+def get_idempotent_response(user, clave):
+    """
+    Busca una respuesta guardada para (usuario, clave).
+
+    Retorna:
+    - HttpResponse con el mismo cuerpo y status de la primera vez
+    - None si no existe, si sigue en proceso o si ya expiró
+      (los expirados se borran aquí para liberar la clave)
+    """
+    registro = IdempotenciaPago.objects.filter(usuario=user, clave=clave).first()
+
+    if registro is None:
+        return None
+
+    if registro.creado < idempotency_expiration():
+        registro.delete()
+        return None
+
+    if registro.estado_http == 0:
+        return None
+
+    respuesta = HttpResponse(
+        registro.respuesta,
+        status=registro.estado_http,
+        content_type="application/json",
+    )
+    respuesta["Idempotent-Replayed"] = "true"
+    return respuesta
+
+
+# -----------------------------
+# CHECKOUT ASÍNCRONO
+# -----------------------------
+def usar_checkout_asincrono(request):
+    """
+    Indica si /api/pago/confirmar/ debe encolar el pedido y responder 202.
+
+    Se activa para todos con PEDIDOS_CHECKOUT_ASINCRONO = True en settings,
+    o por petición con el header:
+    Prefer: respond-async
+    """
+    if getattr(settings, "PEDIDOS_CHECKOUT_ASINCRONO", False):
+        return True
+    return "respond-async" in request.headers.get("Prefer", "")
@@ -0,0 +1,140 @@
+# ============================================================
+# archivo.py
+# Archivo de pedidos entregados.
+#
+# El comando archivar_pedidos mueve los pedidos entregados viejos
+# (con sus detalles) de Pedido / PedidoDetalle a PedidoArchivado /
+# PedidoDetalleArchivado, por lotes. Cada lote es una transacción:
+# si el proceso se corta, lo ya movido queda movido y al volver a
+# correrlo sigue con lo que falte.
+#
+# Las vistas de historial del cliente leen de las dos tablas con
+# las funciones de abajo (el reporte de ventas, en reportes.py).
+# La lista de cada cliente se guarda en caché hasta que cambia la
+# versión de sus pedidos (ver versiones.py y signals.py).
+# ============================================================
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from . import versiones
+from .models import (
+    Pedido,
+    PedidoArchivado,
+    PedidoDetalle,
+    PedidoDetalleArchivado,
+)
+
+# Columnas que se copian al archivo (las de cola / ETA ya no sirven)
+CAMPOS_PEDIDO = (
+    "id", "cliente_id", "fecha", "total", "estatus", "metodo_pago", "mesa_id",
+    "num_items", "resumen", "imagen_principal",
+)
+CAMPOS_DETALLE = ("pedido_id", "producto_id", "cantidad", "precio_unitario", "notas")
+
+# Columnas de las listas de pedidos (mismas en las dos tablas para el UNION)
+CAMPOS_LISTA = (
+    "id", "fecha", "total", "estatus", "metodo_pago",
+    "num_items", "resumen", "imagen_principal",
+)
+
+
+# ============================================================
+# ARCHIVAR
+# ============================================================
+def archivar_lote(limite, lote=500):
+    """
+    Mueve hasta `lote` pedidos entregados con fecha anterior a `limite`.
+    Retorna cuántos movió (0 = ya no queda nada que archivar).
+    """
+    with transaction.atomic():
+        ids = list(
+            Pedido.objects
+            .select_for_update(skip_locked=True)
+            .filter(estatus="entregado", fecha__lt=limite)
+            .order_by("id")
+            .values_list("id", flat=True)[:lote]
+        )
+        if not ids:
+            return 0
+
+        PedidoArchivado.objects.bulk_create([
+            PedidoArchivado(**datos)
+            for datos in Pedido.objects.filter(id__in=ids).values(*CAMPOS_PEDIDO)
+        ])
+        PedidoDetalleArchivado.objects.bulk_create([
+            PedidoDetalleArchivado(**datos)
+            for datos in PedidoDetalle.objects.filter(pedido_id__in=ids).values(*CAMPOS_DETALLE)
+        ])
+
+        # Borra también detalles, historial y eventos (CASCADE)
+        Pedido.objects.filter(id__in=ids).delete()
+
+    return len(ids)
+
+
+def archivar_pedidos(dias=90, lote=500, max_lotes=None):
+    """
+    Archiva por lotes los pedidos entregados hace más de `dias` días.
+    max_lotes limita el trabajo de una corrida (None = hasta terminar).
+    Retorna el total de pedidos archivados.
+    """
+    limite = timezone.now() - timedelta(days=dias)
+    total = 0
+    lotes = 0
+
+    while max_lotes is None or lotes < max_lotes:
+        movidos = archivar_lote(limite, lote)
+        if not movidos:
+            break
+        total += movidos
+        lotes += 1
+
+    return total
+
+
+# ============================================================
+# LECTURA SOBRE LAS DOS TABLAS
+# ============================================================
+def pedidos_de_cliente(usuario, campos=CAMPOS_LISTA):
+    """
+    Pedidos del cliente (vigentes + archivados), del más reciente al
+    más viejo, como dicts con `campos`. Es un solo UNION ALL.
+    """
+    return (
+        Pedido.objects.filter(cliente=usuario).values(*campos)
+        .union(PedidoArchivado.objects.filter(cliente=usuario).values(*campos), all=True)
+        .order_by("-fecha", "-id")
+    )
+
+
+def lista_de_cliente(usuario):
+    """
+    pedidos_de_cliente() como lista, desde la caché mientras no cambie
+    ningún pedido del cliente (la llave lleva su versión).
+    """
+    # intervalo=0: el cliente debe ver al instante el pedido que acaba de hacer
+    version = versiones.version(versiones.pedidos_de(usuario.id), intervalo=0)
+    llave = f"pedidos_cliente:{usuario.id}:{version}"
+
+    pedidos = cache.get(llave)
+    if pedidos is None:
+        pedidos = list(pedidos_de_cliente(usuario))
+        cache.set(llave, pedidos, getattr(settings, "PEDIDOS_CACHE_SEGUNDOS", 600))
+    return pedidos
+
+
+def buscar_pedido(pedido_id, **filtros):
+    """
+    Pedido vigente o archivado con ese id (None si no existe).
+    Los dos tienen `detalles` con producto, cantidad y precio_unitario.
+    """
+    return (
+        Pedido.objects.filter(id=pedido_id, **filtros).first()
+        or PedidoArchivado.objects.filter(id=pedido_id, **filtros).first()
+    )
+
@@ -0,0 +1,70 @@
+# ============================================================
+# catalogo.py
+# Cambios masivos al catálogo desde el panel admin: ajuste de
+# precios por categoría y cambio de estado (activo / agotado) de
+# varios productos.
+#
+# Cada cambio es un solo UPDATE sobre la tabla de productos y sube
+# una sola vez la versión del menú (update() no dispara signals).
+# ============================================================
+
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import DecimalField, F, Value
+from django.db.models.functions import Greatest, Least, Round
+
+from . import versiones
+from .importacion import PRECIO_MAXIMO
+from .models import Producto
+
+AJUSTES = (
+    ("porcentaje", "Porcentaje (%)"),
+    ("monto", "Monto ($)"),
+)
+
+
+def ajustar_precios(tipo, valor, categoria=None):
+    """
+    Sube (o baja, con valor negativo) los precios de `categoria`
+    (None = todas) un `valor` porcentual o en pesos, redondeado a
+    centavos y sin salir de 0 .. PRECIO_MAXIMO.
+    Retorna cuántos productos cambiaron.
+    """
+    decimal = DecimalField(max_digits=8, decimal_places=2)
+
+    if tipo == "porcentaje":
+        nuevo = F("precio") * Value(1 + valor / Decimal(100), output_field=decimal)
+    else:
+        nuevo = F("precio") + Value(valor, output_field=decimal)
+    nuevo = Least(
+        Greatest(Round(nuevo, 2, output_field=decimal), Value(Decimal("0"), output_field=decimal)),
+        Value(PRECIO_MAXIMO, output_field=decimal),
+    )
+
+    productos = Producto.objects.all()
+    if categoria is not None:
+        productos = productos.filter(categoria=categoria)
+
+    with transaction.atomic():
+        cambiados = productos.update(precio=nuevo)
+        if cambiados:
+            versiones.subir_al_confirmar(versiones.MENU)
+
+    return cambiados
+
+
+def cambiar_estado(ids, estado):
+    """
+    Pone `estado` a los productos `ids` que no lo tengan ya.
+    Retorna cuántos cambiaron.
+    """
+    if estado not in dict(Producto.ESTADOS):
+        raise ValueError(f"Estado inválido: {estado}")
+
+    with transaction.atomic():
+        cambiados = Producto.objects.filter(id__in=ids).exclude(estado=estado).update(estado=estado)
+        if cambiados:
+            versiones.subir_al_confirmar(versiones.MENU)
+
+    return cambiados
@@ -0,0 +1,486 @@
+# ============================================================
+# cocina.py
+# Cola de cocina: contador de pedidos activos y tiempo estimado.
+#
+# El contador vive en ColaCocina (una sola fila) y se actualiza
+# en la misma transacción que crea el pedido o cambia su estatus,
+# así el tiempo estimado sale sin contar la tabla de pedidos.
+#
+# Cada pedido aporta a la cola sus minutos de preparación, que
+# salen del modelo aprendido del historial (comando entrenar_eta).
+# Mientras no haya modelo cada pedido cuenta ETA_MINUTOS_POR_PEDIDO.
+# ============================================================
+
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from . import contadores
+from . import eventos
+from . import recomendaciones
+from . import reportes
+from . import versiones
+from .models import (
+    ColaCocina,
+    ModeloEta,
+    Pedido,
+    PedidoDetalle,
+    PedidoEstatusHistorial,
+    TiempoPreparacion,
+)
+
+COLA_ID = 1
+MODELO_ID = 1
+
+# Margen fijo y minutos por pedido cuando aún no hay modelo entrenado
+ETA_BASE_MINUTOS = 20
+ETA_MINUTOS_POR_PEDIDO = 10
+
+# Parámetros del modelo cargados en memoria (se recargan cada ETA_CACHE_SEGUNDOS)
+_parametros = {"cargado": 0.0, "version": None, "base": None, "productos": {}}
+
+# Máquina de estados del pedido: estatus -> estatus a los que puede pasar
+TRANSICIONES = {
+    "activo": ("listo", "entregado"),
+    "listo": ("entregado",),
+    "entregado": (),
+}
+
+
+class CocinaLlena(Exception):
+    """
+    La cocina no acepta más pedidos por ahora (control de admisión).
+    reintentar_en: minutos sugeridos antes de volver a intentar.
+    """
+
+    def __init__(self, mensaje, reintentar_en):
+        super().__init__(mensaje)
+        self.reintentar_en = reintentar_en
+
+
+class TransicionInvalida(Exception):
+    """El cambio de estatus no está permitido por TRANSICIONES."""
+
+
+class ConflictoVersion(Exception):
+    """Otro usuario guardó el pedido después de que se leyó (su versión ya cambió)."""
+
+
+# ============================================================
+# COLA
+# ============================================================
+def obtener_cola(bloquear=False):
+    """
+    Devuelve la fila de la cola de cocina.
+    Si todavía no existe la crea contando los pedidos activos (solo pasa una vez).
+    Con bloquear=True la fila queda bloqueada hasta el fin de la transacción.
+    """
+    qs = ColaCocina.objects.select_for_update() if bloquear else ColaCocina.objects
+    cola = qs.filter(pk=COLA_ID).first()
+
+    if cola is None:
+        activos = Pedido.objects.filter(estatus="activo")
+        cola, _ = ColaCocina.objects.get_or_create(
+            pk=COLA_ID,
+            defaults={
+                "pedidos_activos": activos.count(),
+                "minutos_pendientes": activos.aggregate(m=Sum("minutos_preparacion"))["m"] or 0,
+            },
+        )
+        if bloquear:
+            cola = ColaCocina.objects.select_for_update().get(pk=COLA_ID)
+
+    return cola
+
+
+def tiempo_estimado(cola):
+    """
+    Minutos estimados para el último pedido que entró a la cola:
+    margen fijo + minutos de preparación de todos los pedidos activos.
+    """
+    return round(ETA_BASE_MINUTOS + cola.minutos_pendientes)
+
+
+def tiempo_restante(pedido):
+    """
+    Minutos que le faltan a un pedido según lo prometido al crearse.
+    Sale de campos del propio pedido, sin consultas extra.
+    """
+    if pedido.estatus != "activo" or pedido.tiempo_estimado is None:
+        return 0
+
+    transcurrido = (timezone.now() - pedido.fecha).total_seconds() / 60
+    return max(0, round(pedido.tiempo_estimado - transcurrido))
+
+
+def revisar_capacidad(cola, minutos):
+    """
+    Control de admisión: lanza CocinaLlena si al meter un pedido de
+    `minutos` se pasaría de COCINA_MAX_PEDIDOS_ACTIVOS o de
+    COCINA_MAX_MINUTOS_PENDIENTES (None = sin límite).
+    """
+    max_pedidos = getattr(settings, "COCINA_MAX_PEDIDOS_ACTIVOS", None)
+    max_minutos = getattr(settings, "COCINA_MAX_MINUTOS_PENDIENTES", None)
+
+    # Minutos promedio por pedido en cola, para sugerir cuándo reintentar
+    promedio = (
+        cola.minutos_pendientes / cola.pedidos_activos
+        if cola.pedidos_activos > 0 else ETA_MINUTOS_POR_PEDIDO
+    )
+
+    if max_pedidos is not None and cola.pedidos_activos + 1 > max_pedidos:
+        sobran = cola.pedidos_activos + 1 - max_pedidos
+        raise CocinaLlena(
+            "La cocina tiene demasiados pedidos en este momento.",
+            reintentar_en=max(1, round(sobran * promedio)),
+        )
+
+    if max_minutos is not None and cola.minutos_pendientes + minutos > max_minutos:
+        raise CocinaLlena(
+            "La cocina tiene demasiado trabajo pendiente en este momento.",
+            reintentar_en=max(1, round(cola.minutos_pendientes + minutos - max_minutos)),
+        )
+
+
+def entrar_a_cola(minutos):
+    """
+    Aparta un lugar en la cola para un pedido nuevo que tardará `minutos`.
+    Llamar dentro de transaction.atomic() antes de crear el Pedido.
+    Lanza CocinaLlena si la cocina ya no tiene capacidad.
+
+    La fila queda bloqueada hasta el fin de la transacción; el contador
+    lo sube el post_save del Pedido (signals.py), igual que para
+    cualquier otro pedido que se guarde como activo.
+
+    Retorna la fila de la cola con el pedido ya contado (solo en
+    memoria): pedidos_activos es la posición del pedido y sirve para
+    tiempo_estimado().
+    """
+    cola = obtener_cola(bloquear=True)
+    revisar_capacidad(cola, minutos)
+
+    cola.pedidos_activos += 1
+    cola.minutos_pendientes += minutos
+    return cola
+
+
+def actualizar_cola(estatus_anterior, estatus_nuevo, cantidad=1, minutos=0):
+    """
+    Ajusta el contador cuando `cantidad` pedidos (que suman `minutos`
+    de preparación) pasan de estatus_anterior a estatus_nuevo
+    (None = el pedido se creó / se borró).
+    Llamar dentro de la misma transacción que guarda el cambio.
+    """
+    if estatus_anterior == estatus_nuevo:
+        return
+
+    signo = 0
+    if estatus_anterior == "activo":
+        signo -= 1
+    if estatus_nuevo == "activo":
+        signo += 1
+
+    if signo:
+        actualizada = ColaCocina.objects.filter(pk=COLA_ID).update(
+            pedidos_activos=F("pedidos_activos") + signo * cantidad,
+            minutos_pendientes=F("minutos_pendientes") + signo * minutos,
+        )
+        if not actualizada:
+            # Sin fila: se crea contando los pedidos, que ya incluyen este cambio
+            obtener_cola()
+
+
+def registrar_historial(pedido, estatus_anterior):
+    """
+    Guarda el cambio de estatus con su fecha (estatus_anterior=None al crearse).
+    """
+    PedidoEstatusHistorial.objects.create(
+        pedido=pedido,
+        estatus_anterior=estatus_anterior,
+        estatus_nuevo=pedido.estatus,
+    )
+
+
+def al_entregar(pedido_ids):
+    """
+    Acumulados que se alimentan de los pedidos entregados:
+    ventas diarias, ingresos del dashboard y productos pedidos juntos.
+    """
+    reportes.sumar_entregados(pedido_ids)
+    contadores.sumar_entregados(pedido_ids)
+    recomendaciones.sumar_pedidos(pedido_ids)
+
+
+def registrar_cambio(pedido, estatus_anterior):
+    """
+    Historial, contador de la cola y acumulados (al_entregar) para un
+    pedido que ya se guardó con su nuevo estatus. Llamar dentro de
+    la misma transacción.
+    """
+    if estatus_anterior == pedido.estatus:
+        return
+
+    registrar_historial(pedido, estatus_anterior)
+    actualizar_cola(estatus_anterior, pedido.estatus, minutos=pedido.minutos_preparacion)
+
+    if pedido.estatus == "entregado":
+        al_entregar([pedido.id])
+
+
+def validar_transicion(estatus_anterior, estatus_nuevo):
+    """Lanza TransicionInvalida si la máquina de estados no permite el cambio."""
+    if estatus_nuevo not in TRANSICIONES.get(estatus_anterior, ()):
+        raise TransicionInvalida(f"No se puede pasar de {estatus_anterior} a {estatus_nuevo}.")
+
+
+def guardar_estatus(pedido, estatus_anterior, version):
+    """
+    Guarda el nuevo pedido.estatus con compare-and-swap sobre la versión:
+      UPDATE ... SET estatus, version = version + 1
+      WHERE id = pedido.id AND version = `version`
+    No deja la fila bloqueada: si otro usuario guardó el pedido desde
+    que se leyó la `version`, no se actualiza nada y se lanza
+    ConflictoVersion. Lanza TransicionInvalida si el cambio no está
+    permitido.
+
+    Llamar dentro de transaction.atomic(): historial, cola y evento
+    se guardan en la misma transacción.
+    """
+    if pedido.estatus == estatus_anterior:
+        return
+
+    validar_transicion(estatus_anterior, pedido.estatus)
+
+    ahora = timezone.now()
+    guardado = Pedido.objects.filter(id=pedido.id, version=version).update(
+        estatus=pedido.estatus,
+        version=F("version") + 1,
+        actualizado=ahora,  # update() no toca auto_now
+    )
+    if not guardado:
+        raise ConflictoVersion(f"El pedido #{pedido.id} cambió mientras se editaba.")
+
+    pedido.version = version + 1
+    pedido.actualizado = ahora
+
+    registrar_cambio(pedido, estatus_anterior)
+    # update() no dispara signals: avisamos a la app directamente
+    eventos.publicar(pedido)
+    versiones.subir_al_confirmar(versiones.pedidos_de(pedido.cliente_id))
+    pedido._estatus_cargado = pedido.estatus
+
+
+def cambiar_estatus_masivo(ids, estatus_esperado, estatus_nuevo):
+    """
+    Pasa varios pedidos de estatus_esperado a estatus_nuevo con un
+    solo UPDATE ... WHERE estatus = estatus_esperado.
+
+    Los pedidos que ya no estaban en estatus_esperado (otro usuario
+    los movió antes) se omiten. Historial, cola de cocina, acumulados
+    de ventas y eventos se actualizan en lote, en la misma transacción.
+
+    Retorna la lista de ids que sí cambiaron.
+    Lanza TransicionInvalida si el cambio no está permitido.
+    """
+    validar_transicion(estatus_esperado, estatus_nuevo)
+
+    with transaction.atomic():
+        candidatos = list(
+            Pedido.objects
+            .select_for_update()
+            .filter(id__in=ids, estatus=estatus_esperado)
+            .values_list("id", "cliente_id", "minutos_preparacion")
+        )
+        if not candidatos:
+            return []
+
+        cambiados = [pedido_id for pedido_id, _, _ in candidatos]
+        Pedido.objects.filter(id__in=cambiados, estatus=estatus_esperado).update(
+            estatus=estatus_nuevo,
+            version=F("version") + 1,
+            actualizado=timezone.now(),  # update() no toca auto_now
+        )
+
+        PedidoEstatusHistorial.objects.bulk_create([
+            PedidoEstatusHistorial(
+                pedido_id=pedido_id,
+                estatus_anterior=estatus_esperado,
+                estatus_nuevo=estatus_nuevo,
+            )
+            for pedido_id in cambiados
+        ])
+
+        actualizar_cola(
+            estatus_esperado,
+            estatus_nuevo,
+            cantidad=len(cambiados),
+            minutos=sum(minutos for _, _, minutos in candidatos),
+        )
+
+        if estatus_nuevo == "entregado":
+            al_entregar(cambiados)
+
+        # update() no dispara signals: avisamos a la app directamente
+        eventos.publicar([
+            Pedido(id=pedido_id, cliente_id=cliente_id, estatus=estatus_nuevo)
+            for pedido_id, cliente_id, _ in candidatos
+        ])
+        versiones.subir_al_confirmar(*{versiones.pedidos_de(cliente_id) for _, cliente_id, _ in candidatos})
+
+    return cambiados
+
+
+def recalcular_cola():
+    """
+    Vuelve a contar los pedidos activos y corrige el contador.
+    Útil si se cambiaron pedidos sin pasar por save() ni por este módulo
+    (un update() en lote, SQL a mano).
+    """
+    activos = Pedido.objects.filter(estatus="activo")
+    conteo = activos.count()
+    minutos = activos.aggregate(m=Sum("minutos_preparacion"))["m"] or 0
+
+    obtener_cola()
+    ColaCocina.objects.filter(pk=COLA_ID).update(
+        pedidos_activos=conteo,
+        minutos_pendientes=minutos,
+    )
+    return conteo
+
+
+# ============================================================
+# MODELO DE TIEMPOS DE PREPARACIÓN
+# ============================================================
+def parametros_eta():
+    """
+    Parámetros del modelo en memoria: {"base": float|None, "productos": {id: minutos}}.
+    Se leen de la BD como mucho cada ETA_CACHE_SEGUNDOS por proceso, o
+    en cuanto se vuelve a entrenar el modelo (versiones.ETA).
+    base=None significa que aún no hay modelo entrenado.
+    """
+    ttl = getattr(settings, "ETA_CACHE_SEGUNDOS", 300)
+    actual = versiones.version(versiones.ETA)
+
+    if time.monotonic() - _parametros["cargado"] > ttl or _parametros["version"] != actual:
+        modelo = ModeloEta.objects.filter(pk=MODELO_ID, entrenado__isnull=False).first()
+        _parametros["base"] = modelo.base_minutos if modelo else None
+        _parametros["productos"] = dict(
+            TiempoPreparacion.objects.values_list("producto_id", "minutos")
+        )
+        _parametros["cargado"] = time.monotonic()
+        _parametros["version"] = actual
+
+    return _parametros
+
+
+def minutos_preparacion(lineas):
+    """
+    Minutos estimados de preparación de un pedido.
+
+    lineas: lista de (producto_id, cantidad).
+    Productos sin historial usan el promedio de los conocidos.
+    """
+    parametros = parametros_eta()
+
+    if parametros["base"] is None:
+        return float(ETA_MINUTOS_POR_PEDIDO)
+
+    tiempos = parametros["productos"]
+    promedio = sum(tiempos.values()) / len(tiempos) if tiempos else 0
+
+    minutos = parametros["base"]
+    for producto_id, cantidad in lineas:
+        minutos += cantidad * tiempos.get(producto_id, promedio)
+
+    return max(1.0, minutos)
+
+
+def entrenar_modelo_eta(dias=60, minimo=20, regularizacion=1.0):
+    """
+    Aprende los minutos por producto a partir del historial de estatus.
+
+    Para cada pedido que salió de "activo" en los últimos `dias`:
+      servicio = salida - max(creación, salida del pedido anterior)
+    es decir, el tiempo que la cocina le dedicó (sin la espera en cola).
+    Luego se ajusta  servicio ≈ base + Σ cantidad_p · minutos_p
+    con mínimos cuadrados regularizados (ridge) en NumPy.
+
+    Retorna el número de pedidos usados, o 0 si no hubo suficientes.
+    """
+    import numpy as np
+
+    desde = timezone.now() - timedelta(days=dias)
+
+    salidas = (
+        PedidoEstatusHistorial.objects
+        .filter(estatus_anterior="activo", fecha__gte=desde)
+        .order_by("fecha")
+        .values_list("pedido_id", "pedido__fecha", "fecha")
+    )
+    vistos = {}
+    for pedido_id, creado, salida in salidas.iterator(chunk_size=2000):
+        vistos.setdefault(pedido_id, (creado.timestamp(), salida.timestamp()))
+
+    if len(vistos) < minimo:
+        return 0
+
+    pedido_ids = np.fromiter(vistos.keys(), dtype=np.int64)
+    tiempos = np.array(list(vistos.values()), dtype=np.float64)
+    creado, salida = tiempos[:, 0], tiempos[:, 1]
+
+    # Tiempo de servicio: desde que la cocina pudo empezarlo hasta que salió
+    orden = np.argsort(salida, kind="stable")
+    pedido_ids, creado, salida = pedido_ids[orden], creado[orden], salida[orden]
+    salida_anterior = np.concatenate(([-np.inf], salida[:-1]))
+    servicio = (salida - np.maximum(creado, salida_anterior)) / 60.0
+
+    # Renglones del detalle de esos pedidos
+    lineas = np.array(
+        list(
+            PedidoDetalle.objects
+            .filter(pedido__in=salidas.values("pedido_id"))
+            .values_list("pedido_id", "producto_id", "cantidad")
+            .iterator(chunk_size=5000)
+        ),
+        dtype=np.int64,
+    ).reshape(-1, 3)
+
+    # Fila de cada renglón (búsqueda binaria sobre los ids de pedido)
+    lineas = lineas[np.isin(lineas[:, 0], pedido_ids)]
+    por_id = np.argsort(pedido_ids)
+    filas = por_id[np.searchsorted(pedido_ids[por_id], lineas[:, 0])]
+    producto_ids, columnas = np.unique(lineas[:, 1], return_inverse=True)
+
+    # Matriz de diseño: cantidades por producto + columna de unos (base)
+    n, m = len(pedido_ids), len(producto_ids)
+    X = np.zeros((n, m + 1))
+    np.add.at(X, (filas, columnas), lineas[:, 2])
+    X[:, m] = 1.0
+
+    # Ridge: (XᵀX + λI) w = Xᵀy, sin penalizar la base
+    penalizacion = np.full(m + 1, regularizacion)
+    penalizacion[m] = 0.0
+    w = np.linalg.solve(X.T @ X + np.diag(penalizacion), X.T @ servicio)
+
+    minutos = np.clip(w[:m], 0.0, None)
+    base = max(0.0, float(w[m]))
+    muestras = np.count_nonzero(X[:, :m], axis=0)  # pedidos distintos con el producto
+
+    with transaction.atomic():
+        ModeloEta.objects.update_or_create(
+            pk=MODELO_ID,
+            defaults={"base_minutos": base, "muestras": n, "entrenado": timezone.now()},
+        )
+        TiempoPreparacion.objects.all().delete()
+        TiempoPreparacion.objects.bulk_create([
+            TiempoPreparacion(producto_id=int(pid), minutos=float(mins), muestras=int(cnt))
+            for pid, mins, cnt in zip(producto_ids, minutos, muestras)
+        ])
+
+    # Forzar recarga en todos los procesos
+    versiones.subir(versiones.ETA)
+    return n
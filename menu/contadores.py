@@ -0,0 +1,95 @@
+# ============================================================
+# contadores.py
+# Contadores del dashboard admin guardados en la tabla Contador.
+#
+# Los signals (signals.py) los suben / bajan al crear o borrar
+# usuarios, productos, categorías y pedidos; los ingresos del día
+# se suman al entregarse el pedido (cocina.al_entregar), en el día
+# del pedido, igual que VentaDiaria. El dashboard los lee con una
+# sola consulta. Si se desfasan (cambios hechos con
+# update() / bulk_create o directo en la BD):
+#   python manage.py recalcular_contadores
+# ============================================================
+
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Categoria, Contador, Pedido, PedidoArchivado, Producto
+from .acumulados import sumar_acumulado
+
+# Conteos totales: clave -> modelo
+TOTALES = {
+    "clientes": User,
+    "productos": Producto,
+    "categorias": Categoria,
+    "pedidos": Pedido,
+}
+
+
+def clave_dia(nombre, fecha):
+    """Clave de un contador por día, p. ej. "pedidos_dia:2025-01-31"."""
+    return f"{nombre}:{fecha.isoformat()}"
+
+
+def sumar(clave, cantidad=1):
+    """Suma `cantidad` (puede ser negativa) al contador `clave`."""
+    sumar_acumulado(Contador, {"clave": clave}, {"valor": cantidad})
+
+
+def sumar_pedido(pedido, signo=1):
+    """Cuenta un pedido en el total y en los pedidos de su día."""
+    sumar("pedidos", signo)
+    sumar(clave_dia("pedidos_dia", timezone.localdate(pedido.fecha)), signo)
+
+
+def sumar_entregados(pedido_ids):
+    """
+    Suma a los ingresos del día de cada pedido los que acaban de
+    entregarse. Llamar dentro de la misma transacción que cambia su estatus.
+    """
+    ingresos = {}
+    for fecha, total in Pedido.objects.filter(id__in=pedido_ids).values_list("fecha", "total"):
+        dia = timezone.localdate(fecha)
+        ingresos[dia] = ingresos.get(dia, 0) + total
+
+    for dia, total in ingresos.items():
+        sumar(clave_dia("ingresos_dia", dia), total)
+
+
+def leer(claves):
+    """{clave: valor} en una sola consulta (0 si el contador no existe)."""
+    valores = dict(Contador.objects.filter(clave__in=claves).values_list("clave", "valor"))
+    return {clave: valores.get(clave, 0) for clave in claves}
+
+
+def recalcular(dias=7):
+    """
+    Vuelve a contar los totales y los pedidos / ingresos de los
+    últimos `dias` días (incluido hoy), con los pedidos vigentes y
+    archivados. Los ingresos solo cuentan pedidos entregados.
+    """
+    valores = {clave: modelo.objects.count() for clave, modelo in TOTALES.items()}
+
+    desde = timezone.localdate() - timedelta(days=dias - 1)
+    for i in range(dias):
+        dia = desde + timedelta(days=i)
+        valores[clave_dia("pedidos_dia", dia)] = 0
+        valores[clave_dia("ingresos_dia", dia)] = 0
+
+    # El día se saca en Python (TruncDate / __date usan CONVERT_TZ en MySQL)
+    inicio = timezone.make_aware(datetime.combine(desde, time.min))
+    for modelo in (Pedido, PedidoArchivado):
+        for fecha, total, estatus in modelo.objects.filter(fecha__gte=inicio).values_list("fecha", "total", "estatus"):
+            dia = timezone.localdate(fecha)
+            valores[clave_dia("pedidos_dia", dia)] += 1
+            if estatus == "entregado":
+                valores[clave_dia("ingresos_dia", dia)] += total
+
+    with transaction.atomic():
+        for clave, valor in valores.items():
+            Contador.objects.update_or_create(clave=clave, defaults={"valor": valor})
+
+    return valores
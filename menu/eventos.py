@@ -0,0 +1,288 @@
+# ============================================================
+# eventos.py
+# Publicación / suscripción de cambios de estatus de pedidos.
+#
+# publicar() se llama al guardar un Pedido (ver signals.py).
+# Las vistas async (SSE y long-poll) se suscriben por cliente y
+# esperan eventos sin tener una conexión a la BD abierta.
+#
+# Backends (EVENTOS_BACKEND en settings):
+# - "db": el evento se guarda en EventoPedido y un solo sondeo
+#   por proceso (en su propio hilo, no en el loop de ningún
+#   request) lo reparte a los suscriptores de ese proceso.
+#   Sirve con varios workers (el que guarda y el que escucha
+#   pueden ser procesos distintos).
+#
+#   Los ids se reparten al insertar, no al confirmar: una
+#   transacción lenta puede aparecer con un id menor que otros ya
+#   leídos. Por eso el sondeo relee desde un piso que va
+#   EVENTOS_RETRASO segundos atrás del último id visto y no
+#   repite los que ya entregó. Al arrancar el hilo el piso también
+#   empieza EVENTOS_RETRASO segundos atrás (piso_inicial).
+# - "memoria": se reparte directo en el mismo proceso (pruebas,
+#   runserver con un solo proceso).
+# ============================================================
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import EventoPedido
+
+EVENTOS_POR_LECTURA = 500
+
+logger = logging.getLogger(__name__)
+
+
+def _backend():
+    return getattr(settings, "EVENTOS_BACKEND", "db")
+
+
+def _retraso():
+    return getattr(settings, "EVENTOS_RETRASO", 5.0)
+
+
+def _datos(evento):
+    """Lo que recibe la app por cada evento."""
+    return {
+        "id": evento.id,
+        "pedido_id": evento.pedido_id,
+        "cliente_id": evento.cliente_id,
+        "estatus": evento.estatus,
+        "fecha": evento.fecha.isoformat() if evento.fecha else None,
+    }
+
+
+class Suscripcion:
+    """
+    Cola de eventos de un cliente conectado.
+    Se usa con `async with hub.suscribir(cliente_id) as sub:`.
+    """
+
+    def __init__(self, hub, cliente_id):
+        self.hub = hub
+        self.cliente_id = cliente_id
+        self.cola = asyncio.Queue()
+        self.loop = None
+
+    async def __aenter__(self):
+        self.loop = asyncio.get_running_loop()
+        self.hub._agregar(self)
+        return self
+
+    async def __aexit__(self, *exc):
+        self.hub._quitar(self)
+
+    def _entregar(self, datos):
+        # Puede llamarse desde otro hilo: se pasa al loop del suscriptor
+        try:
+            self.loop.call_soon_threadsafe(self.cola.put_nowait, datos)
+        except RuntimeError:
+            pass  # su loop ya se cerró (el request terminó)
+
+    async def siguiente(self, timeout=None):
+        """Espera el próximo evento; None si se acaba el timeout."""
+        try:
+            return await asyncio.wait_for(self.cola.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class CursorEventos:
+    """
+    Por dónde va el sondeo. Se leen los eventos con id > piso; el piso
+    se queda EVENTOS_RETRASO segundos atrás del último id de la tabla
+    para alcanzar a ver los ids que se confirmaron tarde, y los ids ya
+    entregados no se repiten.
+    """
+
+    def __init__(self, piso, retraso=None):
+        self.piso = piso
+        self.retraso = _retraso() if retraso is None else retraso
+        self._vistos = deque()  # (momento, último id de la tabla en ese momento)
+        self._entregados = set()  # ids > piso ya repartidos
+
+    def filtrar(self, ahora, nuevos, ultimo):
+        """
+        Recibe una lectura (eventos con id > piso y último id de la
+        tabla) y regresa los eventos que falta entregar.
+        """
+        pendientes = [d for d in nuevos if d["id"] not in self._entregados]
+        self._entregados.update(d["id"] for d in pendientes)
+        self._vistos.append((ahora, ultimo))
+
+        # El piso sube al último id que se vio hace más de `retraso`
+        # segundos (sin pasar del último leído si la lectura se cortó)
+        while self._vistos and ahora - self._vistos[0][0] >= self.retraso:
+            self.piso = max(self.piso, self._vistos.popleft()[1])
+        if len(nuevos) == EVENTOS_POR_LECTURA:
+            self.piso = min(self.piso, nuevos[-1]["id"])
+        self._entregados = {i for i in self._entregados if i > self.piso}
+
+        return pendientes
+
+
+class Hub:
+    """
+    Reparte eventos de pedidos a los suscriptores de este proceso.
+    """
+
+    def __init__(self):
+        self._suscriptores = {}  # cliente_id -> set(Suscripcion)
+        self._lock = threading.Lock()
+        self._sondeo = None  # hilo del sondeo (backend "db")
+
+    def suscribir(self, cliente_id):
+        return Suscripcion(self, cliente_id)
+
+    def _agregar(self, sub):
+        with self._lock:
+            self._suscriptores.setdefault(sub.cliente_id, set()).add(sub)
+
+            # Un solo hilo por proceso; sale solo cuando ya no hay suscriptores
+            if _backend() == "db" and self._sondeo is None:
+                self._sondeo = threading.Thread(target=self._sondear, name="eventos-sondeo", daemon=True)
+                self._sondeo.start()
+
+    def _quitar(self, sub):
+        with self._lock:
+            subs = self._suscriptores.get(sub.cliente_id)
+            if subs:
+                subs.discard(sub)
+                if not subs:
+                    del self._suscriptores[sub.cliente_id]
+
+    def entregar(self, datos):
+        """Manda un evento a todos los suscriptores de su cliente en este proceso."""
+        with self._lock:
+            subs = list(self._suscriptores.get(datos["cliente_id"], ()))
+        for sub in subs:
+            sub._entregar(datos)
+
+    def _sondear(self):
+        """
+        Backend "db": lee los eventos nuevos cada EVENTOS_INTERVALO
+        segundos mientras haya alguien suscrito en este proceso.
+        Corre en su propio hilo; cada evento se pasa al loop de su
+        suscriptor con call_soon_threadsafe.
+        """
+        intervalo = getattr(settings, "EVENTOS_INTERVALO", 1.0)
+        cursor = None
+
+        while True:
+            with self._lock:
+                clientes = list(self._suscriptores)
+                if not clientes:
+                    self._sondeo = None
+                    return
+
+            try:
+                ahora = time.monotonic()
+                if cursor is None:
+                    # Lo que ya estaba al arrancar no se entrega, pero el
+                    # piso empieza atrás para ver lo que se confirme tarde
+                    cursor = CursorEventos(piso_inicial())
+                    cursor.filtrar(ahora, *leer_eventos(cursor.piso, clientes))
+                else:
+                    nuevos, ultimo = leer_eventos(cursor.piso, clientes)
+                    for datos in cursor.filtrar(ahora, nuevos, ultimo):
+                        self.entregar(datos)
+            except Exception:
+                # BD caída o similar: se reintenta en la siguiente vuelta
+                logger.exception("No se pudieron leer los eventos de pedidos")
+
+            time.sleep(intervalo)
+
+
+hub = Hub()
+
+
+# ============================================================
+# LADO QUE PUBLICA (código síncrono: vistas, signals, comandos)
+# ============================================================
+def publicar(pedidos):
+    """
+    Publica el estatus actual de uno o varios pedidos.
+    Si hay una transacción abierta, el aviso sale hasta el commit.
+    """
+    if not isinstance(pedidos, (list, tuple)):
+        pedidos = [pedidos]
+
+    if _backend() == "db":
+        # La fila se guarda en la misma transacción que el cambio
+        EventoPedido.objects.bulk_create([
+            EventoPedido(pedido_id=p.id, cliente_id=p.cliente_id, estatus=p.estatus)
+            for p in pedidos
+        ])
+        return
+
+    datos = [
+        {
+            "id": None,
+            "pedido_id": p.id,
+            "cliente_id": p.cliente_id,
+            "estatus": p.estatus,
+            "fecha": timezone.now().isoformat(),
+        }
+        for p in pedidos
+    ]
+    transaction.on_commit(lambda: [hub.entregar(d) for d in datos])
+
+
+def piso_inicial(retraso=None):
+    """
+    Piso para arrancar el sondeo: el último id guardado hace más de
+    `retraso` segundos (EVENTOS_RETRASO). Una transacción que aún no
+    confirma guardó su fila después, así que su id queda arriba.
+    """
+    limite = timezone.now() - timedelta(seconds=_retraso() if retraso is None else retraso)
+    try:
+        return EventoPedido.objects.filter(fecha__lt=limite).order_by("-id").values_list("id", flat=True).first() or 0
+    finally:
+        connection.close()
+
+
+def _eventos_desde(cursor, clientes):
+    return [
+        _datos(e)
+        for e in EventoPedido.objects.filter(
+            id__gt=cursor, cliente_id__in=clientes,
+        ).order_by("id")[:EVENTOS_POR_LECTURA]
+    ]
+
+
+def eventos_desde(cursor, clientes):
+    """
+    Eventos con id > cursor de los clientes dados.
+    Cierra la conexión al terminar: quien espera eventos no debe
+    quedarse con una conexión abierta.
+    """
+    try:
+        return _eventos_desde(cursor, clientes)
+    finally:
+        connection.close()
+
+
+def leer_eventos(piso, clientes):
+    """
+    Lectura del sondeo: (eventos con id > piso de los clientes dados,
+    último id de toda la tabla). Cierra la conexión al terminar.
+    """
+    try:
+        ultimo = EventoPedido.objects.order_by("-id").values_list("id", flat=True).first() or 0
+        return _eventos_desde(piso, clientes), ultimo
+    finally:
+        connection.close()
+
+
+def limpiar_eventos(horas=24):
+    """Borra eventos viejos; la app solo necesita los recientes para reconectarse."""
+    limite = timezone.now() - timedelta(hours=horas)
+    return EventoPedido.objects.filter(fecha__lt=limite).delete()[0]
@@ -4,13 +4,18 @@
 # - Registro de clientes
 # - Login
 # - CRUD de productos
+# - Importación masiva de productos
 # - CRUD de categorías
 # - Cambio de estatus de pedidos
+# - Filtros de las listas del panel admin
 # ============================================================
 
 from django import forms
 from django.contrib.auth.models import User
 from .models import Producto, Categoria, Pedido
+from .cocina import TRANSICIONES
+from .reportes import AGRUPACIONES
+from .catalogo import AJUSTES
 
 
 # ============================================================
@@ -73,6 +78,29 @@ class FormProducto(forms.ModelForm):
         fields = ['nombre', 'categoria', 'descripcion', 'precio', 'estado', 'imagen']
 
 
+# ============================================================
+# IMPORTACIÓN MASIVA DE PRODUCTOS (ADMIN)
+# ============================================================
+class FormImportarProductos(forms.Form):
+    """
+    CSV de productos y zip opcional con sus imágenes (ver importacion.py).
+    """
+    archivo = forms.FileField(label="CSV de productos")
+    imagenes = forms.FileField(label="Zip de imágenes", required=False)
+
+    def clean_archivo(self):
+        archivo = self.cleaned_data["archivo"]
+        if not archivo.name.lower().endswith(".csv"):
+            raise forms.ValidationError("El archivo debe ser .csv")
+        return archivo
+
+    def clean_imagenes(self):
+        imagenes = self.cleaned_data.get("imagenes")
+        if imagenes and not imagenes.name.lower().endswith(".zip"):
+            raise forms.ValidationError("Las imágenes deben venir en un .zip")
+        return imagenes
+
+
 # ============================================================
 # FORMULARIO PARA CATEGORÍAS
 # ============================================================
@@ -91,11 +119,106 @@ class FormCategoria(forms.ModelForm):
 class FormPedidoEstado(forms.ModelForm):
     """
     Formulario usado en el panel admin para actualizar el estado del pedido.
+    Lleva oculta la versión del pedido que se mostró: si otro usuario lo
+    cambia antes de guardar, el guardado se rechaza (ver cocina.guardar_estatus).
     """
+    version = forms.IntegerField(widget=forms.HiddenInput)
+
     class Meta:
         model = Pedido
         fields = ['estatus']
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['version'].initial = self.instance.version
+
+    def clean_estatus(self):
+        estatus = self.cleaned_data['estatus']
+        actual = self.instance.estatus
+
+        if estatus != actual and estatus not in TRANSICIONES.get(actual, ()):
+            raise forms.ValidationError(
+                f"Un pedido {self.instance.get_estatus_display().lower()} no puede pasar a {estatus}."
+            )
+        return estatus
+
+# ============================================================
+# FILTROS DE LA LISTA DE PEDIDOS (ADMIN)
+# ============================================================
+class FormRangoFechas(forms.Form):
+    """
+    Rango de fechas opcional (desde / hasta, ambos incluidos).
+    """
+    desde = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    hasta = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+
+    def clean(self):
+        data = super().clean()
+        desde, hasta = data.get("desde"), data.get("hasta")
+
+        if desde and hasta and desde > hasta:
+            self.add_error("hasta", "La fecha final no puede ser anterior a la inicial.")
+
+        return data
+
+
+class FormFiltroPedidos(FormRangoFechas):
+    """
+    Filtros opcionales de la lista de pedidos del panel admin.
+    """
+    q = forms.CharField(required=False)
+    estatus = forms.ChoiceField(required=False, choices=[('', 'Todos')] + list(Pedido.ESTATUS))
+
+
+# ============================================================
+# FILTROS DE LAS LISTAS DE PRODUCTOS Y CLIENTES (ADMIN)
+# ============================================================
+class FormFiltroProductos(forms.Form):
+    """
+    Búsqueda por nombre y filtros de categoría / estado de la lista de productos.
+    """
+    q = forms.CharField(required=False)
+    categoria = forms.ModelChoiceField(required=False, queryset=Categoria.objects.all(), empty_label="Todas")
+    estado = forms.ChoiceField(required=False, choices=[('', 'Todos')] + list(Producto.ESTADOS))
+
+
+class FormAjustePrecios(forms.Form):
+    """
+    Ajuste masivo de precios de una categoría (o de todas) por porcentaje o monto.
+    """
+    categoria = forms.ModelChoiceField(required=False, queryset=Categoria.objects.all(), empty_label="Todas las categorías")
+    tipo = forms.ChoiceField(choices=AJUSTES)
+    valor = forms.DecimalField(max_digits=8, decimal_places=2)
+
+    def clean(self):
+        data = super().clean()
+        tipo, valor = data.get("tipo"), data.get("valor")
+
+        if valor == 0:
+            self.add_error("valor", "El ajuste no puede ser cero.")
+        elif tipo == "porcentaje" and valor is not None and valor <= -100:
+            self.add_error("valor", "No se puede bajar el precio 100% o más.")
+
+        return data
+
+
+class FormFiltroClientes(forms.Form):
+    """
+    Búsqueda por usuario, nombre o correo en la lista de clientes.
+    """
+    q = forms.CharField(required=False)
+
+
+# ============================================================
+# REPORTE DE VENTAS (ADMIN)
+# ============================================================
+class FormReporteVentas(FormRangoFechas):
+    """
+    Rango de fechas y agrupación del reporte de ventas.
+    """
+    agrupar = forms.ChoiceField(required=False, choices=AGRUPACIONES)
+
+
 class FormRegistro(forms.Form):
     first_name = forms.CharField(max_length=50)
     last_name = forms.CharField(max_length=50)
@@ -0,0 +1,374 @@
+# ============================================================
+# importacion.py
+# Carga masiva de productos desde un CSV (y un zip opcional con
+# sus imágenes), para no dar de alta un menú producto por producto.
+#
+# Columnas del CSV (encabezado obligatorio; "," o ";"):
+#   categoria, nombre, precio        obligatorias
+#   estado, descripcion, imagen      opcionales
+#   id                               opcional: actualiza ese producto
+# Sin id, un producto con el mismo nombre en la misma categoría se
+# actualiza; si no existe, se crea. Las categorías que no existan
+# se crean. Los nombres se comparan sin mayúsculas ni espacios a
+# los lados (en Python, no depende del collation de la BD).
+#
+# Primero se validan TODAS las filas: si alguna tiene errores no se
+# guarda nada. Luego todo se aplica en una transacción con
+# bulk_create / bulk_update. Las imágenes se procesan después del
+# commit en hilos de fondo (IMPORTACION_HILOS), así la respuesta no
+# espera a Pillow.
+#
+# bulk_create / bulk_update / update() no disparan signals: aquí se
+# suben a mano los contadores y la versión del menú.
+# ============================================================
+
+import csv
+import io
+import logging
+import os
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+
+from . import contadores, versiones
+from .models import Categoria, Producto
+
+COLUMNAS_OBLIGATORIAS = ("categoria", "nombre", "precio")
+EXTENSIONES_IMAGEN = (".jpg", ".jpeg", ".png", ".webp", ".gif")
+PRECIO_MAXIMO = Decimal("999999.99")  # max_digits=8, decimal_places=2
+
+_hilos = None
+_hilos_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+
+class ErrorImportacion(Exception):
+    """El archivo no se pudo leer o alguna fila no es válida (lleva la lista de errores)."""
+
+    def __init__(self, errores):
+        super().__init__("; ".join(errores))
+        self.errores = errores
+
+
+# ============================================================
+# NOMBRES
+# ============================================================
+def _llave(nombre):
+    """Forma de un nombre para compararlo: sin espacios a los lados y en minúsculas."""
+    return nombre.strip().lower()
+
+
+def _categorias_por_llave():
+    """{llave del nombre: Categoria} de todas las categorías (la más vieja si se repite)."""
+    categorias = {}
+    for categoria in Categoria.objects.order_by("id"):
+        categorias.setdefault(_llave(categoria.nombre), categoria)
+    return categorias
+
+
+def _productos_por_nombre(categorias):
+    """{(categoria_id, llave del nombre): Producto} de los productos de esas categorías."""
+    productos = {}
+    for producto in Producto.objects.filter(categoria__in=categorias).order_by("id"):
+        productos.setdefault((producto.categoria_id, _llave(producto.nombre)), producto)
+    return productos
+
+
+# ============================================================
+# LECTURA Y VALIDACIÓN
+# ============================================================
+def leer_csv(archivo):
+    """Filas del CSV como dicts con llaves en minúsculas. Acepta "," o ";"."""
+    try:
+        texto = archivo.read().decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise ErrorImportacion(["El CSV debe estar en UTF-8."])
+
+    try:
+        dialecto = csv.Sniffer().sniff(texto[:4096], delimiters=",;")
+    except csv.Error:
+        dialecto = csv.excel
+
+    lector = csv.DictReader(io.StringIO(texto), dialect=dialecto)
+    encabezado = [(c or "").strip().lower() for c in (lector.fieldnames or [])]
+    faltan = [c for c in COLUMNAS_OBLIGATORIAS if c not in encabezado]
+    if faltan:
+        raise ErrorImportacion([f"Faltan columnas: {', '.join(faltan)}."])
+
+    lector.fieldnames = encabezado
+    return [
+        {llave: (valor or "").strip() for llave, valor in fila.items() if llave}
+        for fila in lector
+    ]
+
+
+def _validar_fila(numero, fila, imagenes_zip):
+    """Regresa (datos limpios, errores) de una fila del CSV."""
+    errores = []
+    datos = {
+        "id": None,
+        "categoria": fila.get("categoria", ""),
+        "nombre": fila.get("nombre", ""),
+        "descripcion": fila.get("descripcion") or None,
+        "estado": (fila.get("estado") or "activo").lower(),
+        "imagen": fila.get("imagen", ""),
+    }
+
+    if fila.get("id"):
+        if fila["id"].isdigit():
+            datos["id"] = int(fila["id"])
+        else:
+            errores.append(f"Fila {numero}: id inválido.")
+
+    if not datos["categoria"]:
+        errores.append(f"Fila {numero}: falta la categoría.")
+    elif len(datos["categoria"]) > 100:
+        errores.append(f"Fila {numero}: la categoría es muy larga.")
+
+    if not datos["nombre"]:
+        errores.append(f"Fila {numero}: falta el nombre.")
+    elif len(datos["nombre"]) > 150:
+        errores.append(f"Fila {numero}: el nombre es muy largo.")
+
+    try:
+        datos["precio"] = Decimal(fila.get("precio", "").lstrip("$")).quantize(Decimal("0.01"))
+        if not Decimal(0) <= datos["precio"] <= PRECIO_MAXIMO:
+            errores.append(f"Fila {numero}: precio fuera de rango.")
+    except InvalidOperation:
+        errores.append(f"Fila {numero}: precio inválido.")
+
+    if datos["estado"] not in dict(Producto.ESTADOS):
+        errores.append(f"Fila {numero}: estado inválido ({datos['estado']}).")
+
+    if datos["imagen"]:
+        if imagenes_zip is None:
+            errores.append(f"Fila {numero}: trae imagen pero no se subió el zip.")
+        elif datos["imagen"] not in imagenes_zip:
+            errores.append(f"Fila {numero}: la imagen {datos['imagen']} no está en el zip.")
+        elif not datos["imagen"].lower().endswith(EXTENSIONES_IMAGEN):
+            errores.append(f"Fila {numero}: {datos['imagen']} no es una imagen.")
+
+    return datos, errores
+
+
+def validar(filas, imagenes_zip=None):
+    """
+    Valida todas las filas (número de fila = línea del CSV).
+    imagenes_zip: nombres de archivo del zip (None si no hay zip).
+    Regresa la lista de filas limpias o lanza ErrorImportacion con todos los errores.
+    """
+    limpias, errores = [], []
+    vistos = set()
+
+    for numero, fila in enumerate(filas, start=2):
+        datos, errores_fila = _validar_fila(numero, fila, imagenes_zip)
+        errores.extend(errores_fila)
+
+        llave = datos["id"] or (_llave(datos["categoria"]), _llave(datos["nombre"]))
+        if llave in vistos:
+            errores.append(f"Fila {numero}: producto repetido en el archivo.")
+        vistos.add(llave)
+        limpias.append(datos)
+
+    if not limpias:
+        errores.append("El CSV no tiene filas.")
+
+    ids = {d["id"] for d in limpias if d["id"]}
+    if ids:
+        faltan = ids - set(Producto.objects.filter(id__in=ids).values_list("id", flat=True))
+        errores.extend(f"No existe el producto con id {i}." for i in sorted(faltan))
+        errores.extend(_repetidos_por_id(limpias, ids))
+
+    if errores:
+        raise ErrorImportacion(errores)
+    return limpias
+
+
+def _repetidos_por_id(limpias, ids):
+    """
+    Errores de las filas sin id cuya (categoría, nombre) ya es un
+    producto que otra fila trae por id: se actualizaría dos veces.
+    """
+    categorias = _categorias_por_llave()
+    usadas = {_llave(d["categoria"]) for d in limpias if not d["id"]}
+    existentes = _productos_por_nombre([c for llave, c in categorias.items() if llave in usadas])
+
+    errores = []
+    for numero, d in enumerate(limpias, start=2):
+        categoria = None if d["id"] else categorias.get(_llave(d["categoria"]))
+        producto = categoria and existentes.get((categoria.id, _llave(d["nombre"])))
+        if producto and producto.id in ids:
+            errores.append(f"Fila {numero}: es el producto con id {producto.id}, que ya viene en otra fila.")
+    return errores
+
+
+# ============================================================
+# APLICAR
+# ============================================================
+def importar(filas):
+    """
+    Crea / actualiza los productos de `filas` (ya validadas) en una
+    transacción. Regresa {"creados", "actualizados", "categorias",
+    "imagenes": [(producto_id, nombre en el zip)]}.
+    """
+    with transaction.atomic():
+        # Categorías: se comparan en Python contra todas; las que falten en un bulk_create
+        nombres = {}
+        for d in filas:
+            nombres.setdefault(_llave(d["categoria"]), d["categoria"])  # se respeta la primera forma escrita
+        categorias = _categorias_por_llave()
+        nuevas = [Categoria(nombre=nombre) for llave, nombre in nombres.items() if llave not in categorias]
+        if nuevas:
+            Categoria.objects.bulk_create(nuevas)
+            # En MySQL bulk_create no regresa los ids: se vuelven a leer
+            categorias = _categorias_por_llave()
+
+        # Productos existentes: por id o por (categoría, nombre)
+        por_id = Producto.objects.in_bulk([d["id"] for d in filas if d["id"]])
+        por_nombre = _productos_por_nombre([categorias[llave] for llave in nombres])
+
+        crear, actualizar, imagenes = [], [], []
+        for d in filas:
+            categoria = categorias[_llave(d["categoria"])]
+            producto = por_id.get(d["id"]) if d["id"] else por_nombre.get((categoria.id, _llave(d["nombre"])))
+
+            if producto is None:
+                producto = Producto()
+                crear.append(producto)
+            else:
+                actualizar.append(producto)
+
+            producto.categoria = categoria
+            producto.nombre = d["nombre"]
+            producto.precio = d["precio"]
+            producto.estado = d["estado"]
+            if d["descripcion"] is not None:
+                producto.descripcion = d["descripcion"]
+            if d["imagen"]:
+                imagenes.append((producto, d["imagen"]))
+
+        Producto.objects.bulk_create(crear, batch_size=500)
+        Producto.objects.bulk_update(
+            actualizar, ["categoria", "nombre", "precio", "estado", "descripcion"], batch_size=500
+        )
+
+        # Ids de los creados que llevan imagen (MySQL no los regresa)
+        sin_id = [producto for producto, _ in imagenes if producto.pk is None]
+        if sin_id:
+            ids = {
+                (categoria_id, _llave(nombre)): pk
+                for pk, categoria_id, nombre in Producto.objects.filter(
+                    categoria__in={p.categoria_id for p in sin_id},
+                    nombre__in={p.nombre for p in sin_id},
+                ).order_by("id").values_list("id", "categoria_id", "nombre")
+            }
+            for producto in sin_id:
+                producto.pk = ids[(producto.categoria_id, _llave(producto.nombre))]
+
+        # Sin signals: contadores y versión del menú a mano
+        if nuevas:
+            contadores.sumar("categorias", len(nuevas))
+        if crear:
+            contadores.sumar("productos", len(crear))
+        versiones.subir_al_confirmar(versiones.MENU)
+
+    return {
+        "creados": len(crear),
+        "actualizados": len(actualizar),
+        "categorias": len(nuevas),
+        "imagenes": [(producto.id, nombre) for producto, nombre in imagenes],
+    }
+
+
+# ============================================================
+# IMÁGENES (EN SEGUNDO PLANO)
+# ============================================================
+def _pool():
+    global _hilos
+    with _hilos_lock:
+        if _hilos is None:
+            _hilos = ThreadPoolExecutor(
+                max_workers=getattr(settings, "IMPORTACION_HILOS", 4),
+                thread_name_prefix="importacion",
+            )
+    return _hilos
+
+
+def guardar_zip(archivo):
+    """Copia el zip subido a un archivo temporal; regresa (ruta, nombres de archivo)."""
+    with tempfile.NamedTemporaryFile(suffix=".zip", delete=False) as temporal:
+        for trozo in archivo.chunks():
+            temporal.write(trozo)
+
+    try:
+        with zipfile.ZipFile(temporal.name) as zf:
+            nombres = set(zf.namelist())
+    except zipfile.BadZipFile:
+        os.remove(temporal.name)
+        raise ErrorImportacion(["El archivo de imágenes no es un zip válido."])
+    return temporal.name, nombres
+
+
+def _procesar_imagen(ruta_zip, producto_id, nombre):
+    """Abre, reduce y guarda una imagen del zip y la asigna al producto."""
+    from PIL import Image
+
+    lado = getattr(settings, "IMPORTACION_IMAGEN_MAX", 1200)
+    try:
+        with zipfile.ZipFile(ruta_zip) as zf, zf.open(nombre) as entrada:
+            imagen = Image.open(entrada)
+            imagen.thumbnail((lado, lado))
+            formato = "PNG" if imagen.mode in ("RGBA", "LA", "P") else "JPEG"
+            salida = io.BytesIO()
+            imagen.save(salida, formato)
+
+        base = os.path.splitext(os.path.basename(nombre))[0]
+        ruta = default_storage.save(
+            f"productos/{base}.{'png' if formato == 'PNG' else 'jpg'}",
+            ContentFile(salida.getvalue()),
+        )
+        Producto.objects.filter(id=producto_id).update(imagen=ruta)
+    except Exception:
+        logger.exception("No se pudo procesar la imagen %s del producto %s", nombre, producto_id)
+    finally:
+        connection.close()
+
+
+def procesar_imagenes(ruta_zip, imagenes):
+    """
+    Manda las imágenes [(producto_id, nombre en el zip)] a los hilos de
+    fondo al confirmarse la transacción. Al terminar la última se borra
+    el zip temporal y se sube la versión del menú.
+    """
+    if not imagenes:
+        os.remove(ruta_zip)
+        return
+
+    pendientes = {"n": len(imagenes)}
+    lock = threading.Lock()
+
+    def terminar(_futuro):
+        with lock:
+            pendientes["n"] -= 1
+            ultima = pendientes["n"] == 0
+        if ultima:
+            os.remove(ruta_zip)
+            try:
+                versiones.subir(versiones.MENU)
+            finally:
+                connection.close()
+
+    def enviar():
+        pool = _pool()
+        for producto_id, nombre in imagenes:
+            pool.submit(_procesar_imagen, ruta_zip, producto_id, nombre).add_done_callback(terminar)
+
+    transaction.on_commit(enviar)
@@ -0,0 +1,30 @@
+# ============================================================
+# archivar_pedidos.py
+# Mueve los pedidos entregados viejos (y sus detalles) a las
+# tablas de archivo, por lotes. Se puede cortar y volver a correr.
+#
+# Uso (por ejemplo desde cron cada noche):
+#   python manage.py archivar_pedidos --dias 90 --lote 500
+# ============================================================
+
+from django.core.management.base import BaseCommand
+
+from menu.archivo import archivar_pedidos
+
+
+class Command(BaseCommand):
+    help = "Archiva los pedidos entregados hace más de --dias días, en lotes de --lote."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dias", type=int, default=90)
+        parser.add_argument("--lote", type=int, default=500)
+        parser.add_argument(
+            "--max-lotes",
+            type=int,
+            default=None,
+            help="Detenerse después de este número de lotes (por defecto hasta terminar).",
+        )
+
+    def handle(self, *args, **options):
+        archivados = archivar_pedidos(options["dias"], options["lote"], options["max_lotes"])
+        self.stdout.write(self.style.SUCCESS(f"Pedidos archivados: {archivados}"))
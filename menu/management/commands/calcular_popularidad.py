@@ -0,0 +1,20 @@
+# ============================================================
+# calcular_popularidad.py
+# Recalcula el ranking de productos más pedidos (7 y 30 días)
+# que usan ?orden=popular en la API y el inicio del cliente.
+#
+# Uso (por ejemplo desde cron cada hora):
+#   python manage.py calcular_popularidad
+# ============================================================
+
+from django.core.management.base import BaseCommand
+
+from menu.reportes import calcular_popularidad
+
+
+class Command(BaseCommand):
+    help = "Recalcula la popularidad de los productos a partir de los acumulados de ventas."
+
+    def handle(self, *args, **options):
+        productos = calcular_popularidad()
+        self.stdout.write(self.style.SUCCESS(f"Popularidad calculada para {productos} productos."))
@@ -0,0 +1,29 @@
+# ============================================================
+# entrenar_eta.py
+# Entrena el modelo de tiempos de preparación por producto a
+# partir del historial de estatus de los pedidos.
+#
+# Uso (por ejemplo desde cron cada noche):
+#   python manage.py entrenar_eta --dias 60
+# ============================================================
+
+from django.core.management.base import BaseCommand
+
+from menu.cocina import entrenar_modelo_eta
+
+
+class Command(BaseCommand):
+    help = "Recalcula los minutos de preparación por producto usando el historial."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dias", type=int, default=60, help="Días de historial a usar.")
+        parser.add_argument("--minimo", type=int, default=20, help="Pedidos mínimos para entrenar.")
+
+    def handle(self, *args, **options):
+        muestras = entrenar_modelo_eta(dias=options["dias"], minimo=options["minimo"])
+
+        if not muestras:
+            self.stdout.write(self.style.WARNING("No hay suficientes pedidos para entrenar el modelo."))
+            return
+
+        self.stdout.write(self.style.SUCCESS(f"Modelo entrenado con {muestras} pedidos."))
@@ -0,0 +1,22 @@
+# ============================================================
+# limpiar_eventos.py
+# Borra los eventos de pedidos viejos (ya se entregaron a la app).
+#
+# Uso (por ejemplo desde cron cada hora):
+#   python manage.py limpiar_eventos --horas 24
+# ============================================================
+
+from django.core.management.base import BaseCommand
+
+from menu.eventos import limpiar_eventos
+
+
+class Command(BaseCommand):
+    help = "Borra los eventos de pedidos más viejos que --horas."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--horas", type=int, default=24)
+
+    def handle(self, *args, **options):
+        borrados = limpiar_eventos(options["horas"])
+        self.stdout.write(self.style.SUCCESS(f"Eventos borrados: {borrados}"))
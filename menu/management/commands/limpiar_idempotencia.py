@@ -0,0 +1,43 @@
+# ============================================================
+# limpiar_idempotencia.py
+# Borra las respuestas de pago guardadas por Idempotency-Key
+# que ya pasaron su TTL (IDEMPOTENCIA_TTL_HORAS).
+#
+# Uso (por ejemplo desde cron cada hora):
+#   python manage.py limpiar_idempotencia
+# ============================================================
+
+from django.core.management.base import BaseCommand
+
+from menu.api_utils import idempotency_expiration
+from menu.models import IdempotenciaPago
+
+
+class Command(BaseCommand):
+    help = "Borra los registros de Idempotency-Key vencidos."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--lote",
+            type=int,
+            default=1000,
+            help="Cantidad de registros a borrar por consulta.",
+        )
+
+    def handle(self, *args, **options):
+        limite = idempotency_expiration()
+        lote = options["lote"]
+        borrados = 0
+
+        # Borramos por lotes para no bloquear la tabla mucho tiempo
+        while True:
+            ids = list(
+                IdempotenciaPago.objects
+                .filter(creado__lt=limite)
+                .values_list("id", flat=True)[:lote]
+            )
+            if not ids:
+                break
+            borrados += IdempotenciaPago.objects.filter(id__in=ids).delete()[0]
+
+        self.stdout.write(self.style.SUCCESS(f"Registros vencidos borrados: {borrados}"))
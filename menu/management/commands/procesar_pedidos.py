@@ -0,0 +1,42 @@
+# ============================================================
+# procesar_pedidos.py
+# Worker de la cola de entrada asíncrona: convierte cada
+# PedidoEntrante pendiente en un Pedido.
+#
+# Uso:
+#   python manage.py procesar_pedidos --hilos 4
+#   python manage.py procesar_pedidos --una-vez   (vacía la cola y termina)
+# ============================================================
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from menu.pedidos import vaciar_cola_entrada
+
+
+class Command(BaseCommand):
+    help = "Procesa los pedidos recibidos en modo asíncrono."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hilos", type=int, default=4, help="Hilos que procesan la cola.")
+        parser.add_argument("--espera", type=float, default=1.0, help="Segundos entre revisiones de la cola.")
+        parser.add_argument("--una-vez", action="store_true", help="Vaciar la cola una vez y salir.")
+
+    def handle(self, *args, **options):
+        hilos = options["hilos"]
+
+        with ThreadPoolExecutor(max_workers=hilos) as pool:
+            while True:
+                # Cada hilo vacía la cola; las filas bloqueadas se saltan
+                procesados = sum(pool.map(lambda _: vaciar_cola_entrada(), range(hilos)))
+
+                if procesados:
+                    self.stdout.write(f"Pedidos procesados: {procesados}")
+
+                if options["una_vez"]:
+                    break
+
+                if not procesados:
+                    time.sleep(options["espera"])
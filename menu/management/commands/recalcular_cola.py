@@ -0,0 +1,20 @@
+# ============================================================
+# recalcular_cola.py
+# Corrige el contador de la cola de cocina contando los
+# pedidos activos reales.
+#
+# Uso:
+#   python manage.py recalcular_cola
+# ============================================================
+
+from django.core.management.base import BaseCommand
+
+from menu.cocina import recalcular_cola
+
+
+class Command(BaseCommand):
+    help = "Recalcula el contador de pedidos activos de la cola de cocina."
+
+    def handle(self, *args, **options):
+        activos = recalcular_cola()
+        self.stdout.write(self.style.SUCCESS(f"Pedidos activos en cola: {activos}"))
@@ -0,0 +1,24 @@
+# ============================================================
+# recalcular_contadores.py
+# Vuelve a contar los contadores del dashboard admin (clientes,
+# productos, categorías, pedidos y pedidos / ingresos por día).
+#
+# Los signals los mantienen al día; correrlo después de cargas
+# masivas o cambios hechos directo en la BD, o desde cron:
+#   python manage.py recalcular_contadores --dias 7
+# ============================================================
+
+from django.core.management.base import BaseCommand
+
+from menu.contadores import recalcular
+
+
+class Command(BaseCommand):
+    help = "Recalcula los contadores del dashboard admin."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dias", type=int, default=7, help="Días hacia atrás de pedidos / ingresos (incluye hoy).")
+
+    def handle(self, *args, **options):
+        valores = recalcular(options["dias"])
+        self.stdout.write(self.style.SUCCESS(f"{len(valores)} contadores recalculados."))
@@ -0,0 +1,24 @@
+# ============================================================
+# reconstruir_coocurrencia.py
+# Rehace la tabla de productos pedidos juntos (recomendaciones
+# del carrito) a partir de todos los pedidos entregados.
+#
+# Correr una vez al instalar y cuando se corrijan pedidos por fuera
+# del panel; el día a día se suma solo al entregar cada pedido:
+#   python manage.py reconstruir_coocurrencia --bloque 5000
+# ============================================================
+
+from django.core.management.base import BaseCommand
+
+from menu.recomendaciones import reconstruir_coocurrencia
+
+
+class Command(BaseCommand):
+    help = "Reconstruye los conteos de productos pedidos juntos."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--bloque", type=int, default=5000, help="Pedidos por bloque.")
+
+    def handle(self, *args, **options):
+        pares = reconstruir_coocurrencia(options["bloque"])
+        self.stdout.write(self.style.SUCCESS(f"Pares de productos guardados: {pares}"))
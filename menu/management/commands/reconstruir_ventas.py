@@ -0,0 +1,38 @@
+# ============================================================
+# reconstruir_ventas.py
+# Rehace los acumulados de ventas (VentaDiaria / ResumenDiario)
+# a partir de los pedidos entregados, vigentes y archivados.
+#
+# Correr una vez después de aplicar la migración 0017 (crea las
+# tablas vacías; los pedidos ya entregados no aparecen en los
+# reportes hasta correrlo) y cuando se corrijan pedidos por fuera
+# del panel:
+#   python manage.py reconstruir_ventas
+#   python manage.py reconstruir_ventas --desde 2025-01-01
+# ============================================================
+
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from menu.reportes import reconstruir_ventas
+
+
+class Command(BaseCommand):
+    help = "Reconstruye los acumulados diarios de ventas (todo, o desde --desde AAAA-MM-DD)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--desde", default=None)
+
+    def handle(self, *args, **options):
+        desde = None
+        if options["desde"]:
+            try:
+                desde = date.fromisoformat(options["desde"])
+            except ValueError:
+                raise CommandError("--desde debe tener el formato AAAA-MM-DD.")
+
+        ventas, resumenes = reconstruir_ventas(desde)
+        self.stdout.write(self.style.SUCCESS(
+            f"Acumulados reconstruidos: {ventas} filas por producto, {resumenes} filas por día."
+        ))
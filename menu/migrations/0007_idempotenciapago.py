@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0006_carrito_carritoitem'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotenciaPago',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=255)),
+                ('estado_http', models.PositiveSmallIntegerField(default=0)),
+                ('respuesta', models.TextField(blank=True, default='')),
+                ('creado', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('usuario', 'clave'), name='idempotencia_usuario_clave')],
+            },
+        ),
+    ]
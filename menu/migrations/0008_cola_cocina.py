@@ -0,0 +1,42 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:50
+
+from django.db import migrations, models
+
+
+def crear_cola(apps, schema_editor):
+    """Crea la fila de la cola con los pedidos activos que ya existen."""
+    ColaCocina = apps.get_model('menu', 'ColaCocina')
+    Pedido = apps.get_model('menu', 'Pedido')
+    ColaCocina.objects.update_or_create(
+        pk=1,
+        defaults={'pedidos_activos': Pedido.objects.filter(estatus='activo').count()},
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0007_idempotenciapago'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ColaCocina',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pedidos_activos', models.IntegerField(default=0)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='pedido',
+            name='posicion_cola',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='pedido',
+            name='estatus',
+            field=models.CharField(choices=[('activo', 'Activo'), ('listo', 'Listo'), ('entregado', 'Entregado')], db_index=True, default='activo', max_length=10),
+        ),
+        migrations.RunPython(crear_cola, migrations.RunPython.noop),
+    ]
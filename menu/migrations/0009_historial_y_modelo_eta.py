@@ -0,0 +1,70 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def minutos_pedidos_activos(apps, schema_editor):
+    """
+    Los pedidos activos que ya existían cuentan los 10 minutos de la
+    fórmula anterior, para que la cola arranque con el mismo estimado.
+    """
+    ColaCocina = apps.get_model('menu', 'ColaCocina')
+    Pedido = apps.get_model('menu', 'Pedido')
+    Pedido.objects.filter(estatus='activo').update(minutos_preparacion=10)
+    activos = Pedido.objects.filter(estatus='activo').count()
+    ColaCocina.objects.filter(pk=1).update(minutos_pendientes=activos * 10)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0008_cola_cocina'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModeloEta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('base_minutos', models.FloatField(default=0)),
+                ('muestras', models.PositiveIntegerField(default=0)),
+                ('entrenado', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='colacocina',
+            name='minutos_pendientes',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='pedido',
+            name='minutos_preparacion',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='pedido',
+            name='tiempo_estimado',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='PedidoEstatusHistorial',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estatus_anterior', models.CharField(blank=True, max_length=10, null=True)),
+                ('estatus_nuevo', models.CharField(max_length=10)),
+                ('fecha', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('pedido', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='historial', to='menu.pedido')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TiempoPreparacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('minutos', models.FloatField(default=0)),
+                ('muestras', models.PositiveIntegerField(default=0)),
+                ('producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='tiempo_preparacion', to='menu.producto')),
+            ],
+        ),
+        migrations.RunPython(minutos_pedidos_activos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0009_historial_y_modelo_eta'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PedidoEntrante',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lineas', models.JSONField()),
+                ('metodo_pago', models.CharField(blank=True, max_length=20, null=True)),
+                ('mesa_numero', models.PositiveIntegerField(blank=True, null=True)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('estatus', models.CharField(choices=[('pendiente', 'Pendiente'), ('completado', 'Completado'), ('error', 'Error')], default='pendiente', max_length=10)),
+                ('resultado', models.JSONField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+                ('pedido', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='menu.pedido')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['estatus', 'id'], name='entrante_estatus_id')],
+            },
+        ),
+    ]
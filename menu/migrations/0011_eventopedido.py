@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0010_pedidoentrante'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoPedido',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estatus', models.CharField(max_length=10)),
+                ('fecha', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('cliente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('pedido', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='eventos', to='menu.pedido')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['cliente', 'id'], name='evento_cliente_id')],
+            },
+        ),
+    ]
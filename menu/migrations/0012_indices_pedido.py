@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0011_eventopedido'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pedido',
+            name='estatus',
+            field=models.CharField(choices=[('activo', 'Activo'), ('listo', 'Listo'), ('entregado', 'Entregado')], default='activo', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['estatus', 'fecha'], name='pedido_estatus_fecha'),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['cliente', 'fecha'], name='pedido_cliente_fecha'),
+        ),
+    ]
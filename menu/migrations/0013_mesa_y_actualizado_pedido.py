@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0012_indices_pedido'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pedido',
+            name='actualizado',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='pedido',
+            name='mesa',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='menu.mesa'),
+        ),
+    ]
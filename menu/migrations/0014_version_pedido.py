@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0013_mesa_y_actualizado_pedido'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pedido',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0014_version_pedido'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PedidoArchivado',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('fecha', models.DateTimeField()),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('estatus', models.CharField(choices=[('activo', 'Activo'), ('listo', 'Listo'), ('entregado', 'Entregado')], default='entregado', max_length=10)),
+                ('metodo_pago', models.CharField(blank=True, max_length=20, null=True)),
+                ('archivado', models.DateTimeField(auto_now_add=True)),
+                ('cliente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pedidos_archivados', to=settings.AUTH_USER_MODEL)),
+                ('mesa', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='menu.mesa')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PedidoDetalleArchivado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad', models.PositiveIntegerField(default=1)),
+                ('precio_unitario', models.DecimalField(decimal_places=2, max_digits=8)),
+                ('notas', models.TextField(blank=True, null=True)),
+                ('pedido', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='detalles', to='menu.pedidoarchivado')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='menu.producto')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='pedidoarchivado',
+            index=models.Index(fields=['cliente', 'fecha'], name='archivado_cliente_fecha'),
+        ),
+        migrations.AddIndex(
+            model_name='pedidoarchivado',
+            index=models.Index(fields=['fecha'], name='archivado_fecha'),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:03
+
+from django.db import migrations, models
+
+
+def _llenar(Modelo, Detalle):
+    """Llena num_items / resumen / imagen_principal a partir de los detalles."""
+    lote = []
+    pedidos = Modelo.objects.only('id').prefetch_related(
+        models.Prefetch('detalles', queryset=Detalle.objects.select_related('producto').order_by('id'))
+    )
+    for pedido in pedidos.iterator(chunk_size=500):
+        detalles = list(pedido.detalles.all())
+        resumen = ', '.join(f'{d.cantidad}× {d.producto.nombre}' for d in detalles)
+        if len(resumen) > 200:
+            resumen = resumen[:199] + '…'
+
+        pedido.num_items = sum(d.cantidad for d in detalles)
+        pedido.resumen = resumen
+        pedido.imagen_principal = next((d.producto.imagen.name for d in detalles if d.producto.imagen), '')
+        lote.append(pedido)
+
+        if len(lote) >= 500:
+            Modelo.objects.bulk_update(lote, ['num_items', 'resumen', 'imagen_principal'])
+            lote = []
+
+    Modelo.objects.bulk_update(lote, ['num_items', 'resumen', 'imagen_principal'])
+
+
+def llenar_resumenes(apps, schema_editor):
+    _llenar(apps.get_model('menu', 'Pedido'), apps.get_model('menu', 'PedidoDetalle'))
+    _llenar(apps.get_model('menu', 'PedidoArchivado'), apps.get_model('menu', 'PedidoDetalleArchivado'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0015_pedidos_archivados'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pedido',
+            name='imagen_principal',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='pedido',
+            name='num_items',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='pedido',
+            name='resumen',
+            field=models.CharField(blank=True, default='', max_length=200),
+        ),
+        migrations.AddField(
+            model_name='pedidoarchivado',
+            name='imagen_principal',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='pedidoarchivado',
+            name='num_items',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='pedidoarchivado',
+            name='resumen',
+            field=models.CharField(blank=True, default='', max_length=200),
+        ),
+        migrations.RunPython(llenar_resumenes, migrations.RunPython.noop),
+    ]
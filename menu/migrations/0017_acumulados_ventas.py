@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0016_resumen_pedido'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('metodo_pago', models.CharField(blank=True, default='', max_length=20)),
+                ('pedidos', models.PositiveIntegerField(default=0)),
+                ('articulos', models.PositiveIntegerField(default=0)),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'metodo_pago'), name='resumen_diario_unico')],
+            },
+        ),
+        migrations.CreateModel(
+            name='VentaDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('metodo_pago', models.CharField(blank=True, default='', max_length=20)),
+                ('pedidos', models.PositiveIntegerField(default=0)),
+                ('cantidad', models.PositiveIntegerField(default=0)),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='menu.producto')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'producto', 'metodo_pago'), name='venta_diaria_unica')],
+            },
+        ),
+    ]
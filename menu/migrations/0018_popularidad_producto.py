@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0017_acumulados_ventas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PopularidadProducto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad_7d', models.PositiveIntegerField(default=0)),
+                ('cantidad_30d', models.PositiveIntegerField(default=0)),
+                ('rango_7d', models.PositiveIntegerField(blank=True, null=True)),
+                ('rango_30d', models.PositiveIntegerField(blank=True, null=True)),
+                ('rango_categoria_7d', models.PositiveIntegerField(blank=True, null=True)),
+                ('rango_categoria_30d', models.PositiveIntegerField(blank=True, null=True)),
+                ('calculado', models.DateTimeField(auto_now=True)),
+                ('producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='popularidad', to='menu.producto')),
+            ],
+        ),
+    ]
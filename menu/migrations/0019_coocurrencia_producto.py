@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0018_popularidad_producto'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CoocurrenciaProducto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pedidos', models.PositiveIntegerField(default=0)),
+                ('producto_a', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='menu.producto')),
+                ('producto_b', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='menu.producto')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('producto_a', 'producto_b'), name='coocurrencia_unica')],
+            },
+        ),
+    ]
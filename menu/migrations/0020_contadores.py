@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:10
+
+from django.db import migrations, models
+
+
+def llenar_contadores(apps, schema_editor):
+    """Conteos iniciales (los del día los llena recalcular_contadores)."""
+    Contador = apps.get_model('menu', 'Contador')
+    modelos = {
+        'clientes': apps.get_model('auth', 'User'),
+        'productos': apps.get_model('menu', 'Producto'),
+        'categorias': apps.get_model('menu', 'Categoria'),
+        'pedidos': apps.get_model('menu', 'Pedido'),
+    }
+    Contador.objects.bulk_create([
+        Contador(clave=clave, valor=modelo.objects.count()) for clave, modelo in modelos.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('menu', '0019_coocurrencia_producto'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Contador',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=50, unique=True)),
+                ('valor', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(llenar_contadores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0021_versiones_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pedidoentrante',
+            name='intentos',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='pedidoentrante',
+            name='reintentar_despues',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0022_reintentos_entrantes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pedidoarchivado',
+            name='id',
+            field=models.BigIntegerField(primary_key=True, serialize=False),
+        ),
+    ]
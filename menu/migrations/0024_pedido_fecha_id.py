@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0023_id_archivado_bigint'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['fecha', 'id'], name='pedido_fecha_id'),
+        ),
+    ]
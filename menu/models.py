@@ -69,11 +69,157 @@ class Pedido(models.Model):
     total = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     estatus = models.CharField(max_length=10, choices=ESTATUS, default='activo')
     metodo_pago = models.CharField(max_length=20, blank=True, null=True)  # tarjeta / sucursal
+    posicion_cola = models.PositiveIntegerField(blank=True, null=True)  # lugar en cocina al crearse
+    minutos_preparacion = models.FloatField(default=0)  # estimado del modelo para este pedido
+    tiempo_estimado = models.PositiveIntegerField(blank=True, null=True)  # minutos prometidos al crearse
+    mesa = models.ForeignKey('Mesa', on_delete=models.SET_NULL, blank=True, null=True)
+    actualizado = models.DateTimeField(auto_now=True, db_index=True)  # cursor del tablero de cocina
+    version = models.PositiveIntegerField(default=1)  # control de concurrencia optimista (ver cocina.guardar_estatus)
+
+    # Resumen para las listas, se escribe al crear el pedido (ver pedidos.resumen_lineas)
+    num_items = models.PositiveIntegerField(default=0)
+    resumen = models.CharField(max_length=200, blank=True, default="")  # "2× Taco, 1× Agua"
+    imagen_principal = models.CharField(max_length=255, blank=True, default="")  # ruta en MEDIA
+
+    class Meta:
+        indexes = [
+            # Listas por estatus y fecha (panel admin, cocina, reportes)
+            models.Index(fields=["estatus", "fecha"], name="pedido_estatus_fecha"),
+            # Historial de cada cliente
+            models.Index(fields=["cliente", "fecha"], name="pedido_cliente_fecha"),
+            # Lista del panel sin filtros (ORDER BY fecha DESC, id DESC)
+            models.Index(fields=["fecha", "id"], name="pedido_fecha_id"),
+        ]
 
     def __str__(self):
         return f"Pedido #{self.id} - {self.cliente.username}"
 
 
+# -----------------------------
+# COLA DE COCINA
+# -----------------------------
+class ColaCocina(models.Model):
+    """
+    Estado de la cola de cocina (una sola fila, pk=1).
+    Lleva el conteo de pedidos activos para no hacer COUNT(*) sobre
+    Pedido en cada checkout. Se actualiza desde menu/cocina.py.
+    """
+    pedidos_activos = models.IntegerField(default=0)
+    minutos_pendientes = models.FloatField(default=0)  # suma de minutos_preparacion de los activos
+    actualizado = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Cola de cocina ({self.pedidos_activos} activos)"
+
+
+# -----------------------------
+# PEDIDO ENTRANTE (CHECKOUT ASÍNCRONO)
+# -----------------------------
+class PedidoEntrante(models.Model):
+    """
+    Foto de un carrito confirmado desde la API en modo asíncrono.
+    El comando procesar_pedidos lo convierte en Pedido; la app
+    consulta su estatus en /api/pago/entrante/<id>/.
+    """
+    ESTATUS = (
+        ('pendiente', 'Pendiente'),
+        ('completado', 'Completado'),
+        ('error', 'Error'),
+    )
+
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE)
+    lineas = models.JSONField()  # [{producto_id, cantidad, precio_unitario, nota}]
+    metodo_pago = models.CharField(max_length=20, blank=True, null=True)
+    mesa_numero = models.PositiveIntegerField(blank=True, null=True)
+    total = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    estatus = models.CharField(max_length=10, choices=ESTATUS, default='pendiente')
+    pedido = models.ForeignKey(Pedido, on_delete=models.SET_NULL, blank=True, null=True)
+    resultado = models.JSONField(blank=True, null=True)  # lo que se regresa a la app
+    error = models.TextField(blank=True, default="")
+    intentos = models.PositiveSmallIntegerField(default=0)  # fallos temporales al procesarlo
+    reintentar_despues = models.DateTimeField(blank=True, null=True)
+    creado = models.DateTimeField(auto_now_add=True)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["estatus", "id"], name="entrante_estatus_id"),
+        ]
+
+    def __str__(self):
+        return f"Entrante #{self.id} ({self.estatus})"
+
+
+# -----------------------------
+# HISTORIAL DE ESTATUS DEL PEDIDO
+# -----------------------------
+class PedidoEstatusHistorial(models.Model):
+    """
+    Un renglón por cada cambio de estatus de un pedido (incluida su creación,
+    con estatus_anterior vacío). Con estas fechas se entrena el modelo de
+    tiempos de preparación.
+    """
+    pedido = models.ForeignKey(Pedido, on_delete=models.CASCADE, related_name="historial")
+    estatus_anterior = models.CharField(max_length=10, blank=True, null=True)
+    estatus_nuevo = models.CharField(max_length=10)
+    fecha = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"Pedido #{self.pedido_id}: {self.estatus_anterior} → {self.estatus_nuevo}"
+
+
+# -----------------------------
+# EVENTOS DE PEDIDO (PUSH A LA APP)
+# -----------------------------
+class EventoPedido(models.Model):
+    """
+    Bitácora de cambios de estatus que se empujan a la app por
+    /api/pedidos/eventos/. Cada proceso ASGI la lee por id creciente
+    para avisar a sus clientes conectados (ver menu/eventos.py).
+    """
+    pedido = models.ForeignKey(Pedido, on_delete=models.CASCADE, related_name="eventos")
+    cliente = models.ForeignKey(User, on_delete=models.CASCADE)
+    estatus = models.CharField(max_length=10)
+    fecha = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["cliente", "id"], name="evento_cliente_id"),
+        ]
+
+    def __str__(self):
+        return f"Pedido #{self.pedido_id} → {self.estatus}"
+
+
+# -----------------------------
+# MODELO DE TIEMPOS (ETA)
+# -----------------------------
+class ModeloEta(models.Model):
+    """
+    Parámetros generales del modelo de tiempos de preparación (una sola fila).
+    Lo llena el comando entrenar_eta.
+    """
+    base_minutos = models.FloatField(default=0)  # minutos fijos por pedido
+    muestras = models.PositiveIntegerField(default=0)  # pedidos usados al entrenar
+    entrenado = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"Modelo ETA ({self.muestras} pedidos)"
+
+
+class TiempoPreparacion(models.Model):
+    """
+    Minutos que aporta cada unidad de un producto al tiempo de un pedido,
+    aprendidos del historial.
+    """
+    producto = models.OneToOneField(Producto, on_delete=models.CASCADE, related_name="tiempo_preparacion")
+    minutos = models.FloatField(default=0)
+    muestras = models.PositiveIntegerField(default=0)  # pedidos donde apareció
+
+    def __str__(self):
+        return f"{self.producto.nombre}: {self.minutos:.1f} min"
+
+
 # -----------------------------
 # DETALLE DE PEDIDO
 # -----------------------------
@@ -91,6 +237,51 @@ class PedidoDetalle(models.Model):
         return f"{self.cantidad} x {self.producto.nombre}"
 
 
+# -----------------------------
+# PEDIDOS ARCHIVADOS
+# -----------------------------
+class PedidoArchivado(models.Model):
+    """
+    Pedido entregado que se sacó de Pedido para que la tabla
+    caliente no crezca sin límite (comando archivar_pedidos).
+    Conserva el mismo id que tenía en Pedido.
+    """
+    id = models.BigIntegerField(primary_key=True)  # mismo tipo que Pedido.id (BigAutoField)
+    cliente = models.ForeignKey(User, on_delete=models.CASCADE, related_name="pedidos_archivados")
+    fecha = models.DateTimeField()
+    total = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    estatus = models.CharField(max_length=10, choices=Pedido.ESTATUS, default='entregado')
+    metodo_pago = models.CharField(max_length=20, blank=True, null=True)
+    mesa = models.ForeignKey('Mesa', on_delete=models.SET_NULL, blank=True, null=True, related_name="+")
+    num_items = models.PositiveIntegerField(default=0)
+    resumen = models.CharField(max_length=200, blank=True, default="")
+    imagen_principal = models.CharField(max_length=255, blank=True, default="")
+    archivado = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["cliente", "fecha"], name="archivado_cliente_fecha"),
+            models.Index(fields=["fecha"], name="archivado_fecha"),
+        ]
+
+    def __str__(self):
+        return f"Pedido archivado #{self.id} - {self.cliente.username}"
+
+
+class PedidoDetalleArchivado(models.Model):
+    pedido = models.ForeignKey(PedidoArchivado, on_delete=models.CASCADE, related_name="detalles")
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name="+")
+    cantidad = models.PositiveIntegerField(default=1)
+    precio_unitario = models.DecimalField(max_digits=8, decimal_places=2)
+    notas = models.TextField(blank=True, null=True)
+
+    def subtotal(self):
+        return self.cantidad * self.precio_unitario
+
+    def __str__(self):
+        return f"{self.cantidad} x {self.producto.nombre}"
+
+
 # -----------------------------
 # Mesa
 # -----------------------------
@@ -174,4 +365,155 @@ class CarritoItem(models.Model):
         return self.cantidad * self.precio_unitario
 
     def __str__(self):
-        return f"{self.cantidad} × {self.producto.nombre}"
\ No newline at end of file
+        return f"{self.cantidad} × {self.producto.nombre}"
+
+
+# -----------------------------
+# IDEMPOTENCIA DE PAGOS (API)
+# -----------------------------
+class IdempotenciaPago(models.Model):
+    """
+    Respuesta guardada de un POST /api/pago/confirmar/ identificada por
+    el header Idempotency-Key que manda la app.
+    Si la app reintenta con la misma clave se devuelve esta respuesta
+    en lugar de volver a crear el pedido.
+    """
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE)
+    clave = models.CharField(max_length=255)
+    estado_http = models.PositiveSmallIntegerField(default=0)  # 0 = en proceso
+    respuesta = models.TextField(blank=True, default="")
+    creado = models.DateTimeField(auto_now_add=True, db_index=True)  # para limpiar por TTL
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["usuario", "clave"], name="idempotencia_usuario_clave"),
+        ]
+
+    def __str__(self):
+        return f"{self.clave} ({self.usuario.username})"
+
+
+# -----------------------------
+# ACUMULADOS DE VENTAS (REPORTES)
+# -----------------------------
+class VentaDiaria(models.Model):
+    """
+    Ventas entregadas por día, producto y método de pago.
+    Se suma al entregar cada pedido (reportes.sumar_entregados) y se
+    reconstruye con el comando reconstruir_ventas.
+    """
+    fecha = models.DateField()
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name="+")
+    metodo_pago = models.CharField(max_length=20, blank=True, default="")
+    pedidos = models.PositiveIntegerField(default=0)  # pedidos que incluyeron el producto
+    cantidad = models.PositiveIntegerField(default=0)
+    ingresos = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["fecha", "producto", "metodo_pago"], name="venta_diaria_unica"),
+        ]
+
+    def __str__(self):
+        return f"{self.fecha} - {self.producto_id} ({self.metodo_pago or 'sin método'})"
+
+
+class ResumenDiario(models.Model):
+    """
+    Pedidos entregados por día y método de pago (conteo de pedidos,
+    artículos y total). Se mantiene junto con VentaDiaria.
+    """
+    fecha = models.DateField()
+    metodo_pago = models.CharField(max_length=20, blank=True, default="")
+    pedidos = models.PositiveIntegerField(default=0)
+    articulos = models.PositiveIntegerField(default=0)
+    ingresos = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["fecha", "metodo_pago"], name="resumen_diario_unico"),
+        ]
+
+    def __str__(self):
+        return f"{self.fecha} ({self.metodo_pago or 'sin método'}): {self.pedidos} pedidos"
+
+
+# -----------------------------
+# POPULARIDAD DE PRODUCTOS
+# -----------------------------
+class PopularidadProducto(models.Model):
+    """
+    Ranking de los productos más pedidos en los últimos 7 y 30 días,
+    general y dentro de su categoría (1 = el más pedido; None = sin ventas).
+    Lo recalcula el comando calcular_popularidad desde VentaDiaria;
+    las vistas solo ordenan por estos campos.
+    """
+    producto = models.OneToOneField(Producto, on_delete=models.CASCADE, related_name="popularidad")
+    cantidad_7d = models.PositiveIntegerField(default=0)
+    cantidad_30d = models.PositiveIntegerField(default=0)
+    rango_7d = models.PositiveIntegerField(blank=True, null=True)
+    rango_30d = models.PositiveIntegerField(blank=True, null=True)
+    rango_categoria_7d = models.PositiveIntegerField(blank=True, null=True)
+    rango_categoria_30d = models.PositiveIntegerField(blank=True, null=True)
+    calculado = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.producto.nombre}: #{self.rango_30d or '-'} (30 días)"
+
+
+# -----------------------------
+# PRODUCTOS PEDIDOS JUNTOS (RECOMENDACIONES)
+# -----------------------------
+class CoocurrenciaProducto(models.Model):
+    """
+    En cuántos pedidos entregados aparecieron juntos dos productos
+    (se guarda una sola vez con producto_a <= producto_b). La diagonal
+    (producto_a = producto_b) es el número de pedidos con ese producto.
+    Ver menu/recomendaciones.py.
+    """
+    producto_a = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name="+")
+    producto_b = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name="+")
+    pedidos = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["producto_a", "producto_b"], name="coocurrencia_unica"),
+        ]
+
+    def __str__(self):
+        return f"{self.producto_a_id} + {self.producto_b_id}: {self.pedidos}"
+
+
+# -----------------------------
+# CONTADORES DEL PANEL ADMIN
+# -----------------------------
+class Contador(models.Model):
+    """
+    Conteos del dashboard admin (clave -> valor) para no hacer
+    COUNT(*) en cada carga. Los mantienen los signals; se corrigen
+    con el comando recalcular_contadores. Ver menu/contadores.py.
+    """
+    clave = models.CharField(max_length=50, unique=True)  # "pedidos", "ingresos_dia:2025-01-31", ...
+    valor = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.clave} = {self.valor}"
+
+
+# -----------------------------
+# VERSIONES DE CACHÉ (ENTRE PROCESOS)
+# -----------------------------
+class VersionCache(models.Model):
+    """
+    Versión de un grupo de datos cacheados ("menu", "tokens",
+    "pedidos:<cliente>", ...). Se sube al cambiar esos datos y cada
+    worker la consulta para saber si su caché en memoria sigue
+    vigente. Ver menu/versiones.py.
+    """
+    nombre = models.CharField(max_length=100, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.nombre} v{self.version}"
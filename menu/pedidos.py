@@ -0,0 +1,264 @@
+# ============================================================
+# pedidos.py
+# Creación de pedidos a partir de un carrito y cola de entrada
+# asíncrona para /api/pago/confirmar/.
+#
+# En modo asíncrono el checkout solo guarda una foto del carrito
+# en PedidoEntrante y responde 202; el comando procesar_pedidos
+# crea los pedidos con un grupo de hilos.
+# ============================================================
+
+import logging
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import cocina
+from .api_utils import get_or_create_carrito
+from .models import CarritoItem, Mesa, Pedido, PedidoDetalle, PedidoEntrante, Producto
+
+RESUMEN_MAX = 200  # largo de Pedido.resumen
+
+# Fallos de los datos del propio pedido: reintentarlo no sirve
+ERRORES_DEFINITIVOS = (
+    ValidationError,
+    ObjectDoesNotExist,
+    IntegrityError,  # p. ej. un producto que se borró
+    ValueError,
+    TypeError,
+    KeyError,
+    ArithmeticError,  # decimal.InvalidOperation
+)
+ESPERA_REINTENTO_SEGUNDOS = 5  # se duplica en cada intento
+ESPERA_REINTENTO_MAXIMA = 300
+
+logger = logging.getLogger(__name__)
+
+
+def lineas_de_carrito(items):
+    """
+    Foto de los items de un Carrito en forma de lista de dicts
+    (se puede guardar como JSON y procesar después).
+    """
+    return [
+        {
+            "producto_id": item.producto_id,
+            "cantidad": item.cantidad,
+            "precio_unitario": str(item.precio_unitario),
+            "nota": item.nota,
+        }
+        for item in items
+    ]
+
+
+def resumen_lineas(lineas):
+    """
+    num_items, resumen ("2× Taco, 1× Agua") e imagen principal del
+    pedido. Se guardan en el Pedido para que las listas no tengan
+    que leer los detalles. Una sola consulta a Producto.
+    """
+    productos = {
+        p["id"]: p
+        for p in Producto.objects.filter(id__in=[l["producto_id"] for l in lineas]).values("id", "nombre", "imagen")
+    }
+
+    partes = []
+    imagen = ""
+    for l in lineas:
+        producto = productos.get(l["producto_id"], {})
+        partes.append(f'{l["cantidad"]}× {producto.get("nombre", "?")}')
+        imagen = imagen or producto.get("imagen") or ""
+
+    resumen = ", ".join(partes)
+    if len(resumen) > RESUMEN_MAX:
+        resumen = resumen[:RESUMEN_MAX - 1] + "…"
+
+    return {
+        "num_items": sum(l["cantidad"] for l in lineas),
+        "resumen": resumen,
+        "imagen_principal": imagen,
+    }
+
+
+def crear_pedido(usuario, lineas, metodo_pago, mesa=None):
+    """
+    Crea el Pedido con sus detalles y lo mete a la cola de cocina
+    (el contador y el primer renglón de historial los guarda el
+    post_save del Pedido, ver signals.py).
+    Llamar dentro de transaction.atomic().
+    Lanza cocina.CocinaLlena si la cocina no tiene capacidad.
+
+    lineas: lista de dicts como los de lineas_de_carrito().
+    mesa: Mesa donde se sirve (opcional).
+    """
+    total = sum(Decimal(l["precio_unitario"]) * l["cantidad"] for l in lineas)
+
+    # Lugar en la cola de cocina (contador, sin COUNT sobre pedidos)
+    minutos = cocina.minutos_preparacion([(l["producto_id"], l["cantidad"]) for l in lineas])
+    cola = cocina.entrar_a_cola(minutos)
+
+    pedido = Pedido.objects.create(
+        cliente=usuario,
+        total=total,
+        estatus="activo",
+        metodo_pago=metodo_pago,
+        mesa=mesa,
+        posicion_cola=cola.pedidos_activos,
+        minutos_preparacion=minutos,
+        tiempo_estimado=cocina.tiempo_estimado(cola),
+        **resumen_lineas(lineas),
+    )
+
+    PedidoDetalle.objects.bulk_create([
+        PedidoDetalle(
+            pedido=pedido,
+            producto_id=l["producto_id"],
+            cantidad=l["cantidad"],
+            precio_unitario=Decimal(l["precio_unitario"]),
+            notas=l.get("nota"),
+        )
+        for l in lineas
+    ])
+
+    return pedido
+
+
+def resultado_pedido(pedido):
+    """
+    Datos del pedido recién creado que se regresan a la app.
+    """
+    return {
+        "pedido_id": pedido.id,
+        "total": float(pedido.total),
+        "posicion_cola": pedido.posicion_cola,
+        "tiempo_estimado": pedido.tiempo_estimado,
+    }
+
+
+# ============================================================
+# COLA DE ENTRADA ASÍNCRONA
+# ============================================================
+def encolar_pedido(usuario, lineas, metodo_pago, mesa_numero=None):
+    """
+    Guarda la foto del carrito para que un worker cree el pedido.
+    Llamar dentro de la misma transacción que vacía el carrito.
+    """
+    total = sum(Decimal(l["precio_unitario"]) * l["cantidad"] for l in lineas)
+    return PedidoEntrante.objects.create(
+        usuario=usuario,
+        lineas=lineas,
+        metodo_pago=metodo_pago,
+        mesa_numero=mesa_numero,
+        total=total,
+    )
+
+
+def devolver_al_carrito(usuario, lineas):
+    """
+    Regresa al carrito del usuario las líneas de un pedido que no se
+    pudo crear (el checkout ya lo había vaciado). Se omiten los
+    productos que ya no existen.
+    """
+    existentes = set(
+        Producto.objects.filter(id__in=[l["producto_id"] for l in lineas]).values_list("id", flat=True)
+    )
+    carrito = get_or_create_carrito(usuario)
+    CarritoItem.objects.bulk_create([
+        CarritoItem(
+            carrito=carrito,
+            producto_id=l["producto_id"],
+            cantidad=l["cantidad"],
+            precio_unitario=Decimal(l["precio_unitario"]),
+            nota=l.get("nota"),
+        )
+        for l in lineas
+        if l.get("producto_id") in existentes
+    ])
+
+
+def _espera_reintento(intentos):
+    return timedelta(seconds=min(ESPERA_REINTENTO_SEGUNDOS * 2 ** (intentos - 1), ESPERA_REINTENTO_MAXIMA))
+
+
+def procesar_siguiente():
+    """
+    Toma el siguiente PedidoEntrante pendiente y crea su pedido.
+
+    La fila queda bloqueada (SKIP LOCKED) mientras se procesa, así
+    varios hilos o procesos pueden trabajar la cola sin pisarse. Si
+    el proceso muere a la mitad la transacción se deshace y la fila
+    sigue pendiente.
+
+    Si la cocina está llena (control de admisión) el pedido se queda
+    pendiente en su lugar de la fila y se deja de procesar por ahora.
+
+    Si falla por los datos del pedido (ERRORES_DEFINITIVOS) queda en
+    "error" y sus productos regresan al carrito. Cualquier otro fallo
+    se toma como temporal: se deshace lo que se alcanzó a crear y la
+    fila sigue pendiente, con espera creciente entre intentos, hasta
+    PEDIDOS_ENTRANTES_MAX_INTENTOS.
+
+    Retorna False si ya no hay pendientes o la cocina está llena.
+    """
+    with transaction.atomic():
+        entrante = (
+            PedidoEntrante.objects
+            .select_for_update(skip_locked=True)
+            .filter(estatus="pendiente")
+            .filter(Q(reintentar_despues__isnull=True) | Q(reintentar_despues__lte=timezone.now()))
+            .order_by("id")
+            .first()
+        )
+        if entrante is None:
+            return False
+
+        try:
+            with transaction.atomic():
+                mesa = (
+                    Mesa.objects.filter(numero=entrante.mesa_numero).first()
+                    if entrante.mesa_numero else None
+                )
+                pedido = crear_pedido(entrante.usuario, entrante.lineas, entrante.metodo_pago, mesa)
+        except cocina.CocinaLlena:
+            return False
+        except ERRORES_DEFINITIVOS as e:
+            entrante.estatus = "error"
+            entrante.error = str(e)
+            devolver_al_carrito(entrante.usuario, entrante.lineas)
+        except Exception as e:
+            logger.exception("Fallo temporal al procesar el pedido entrante #%s", entrante.id)
+            entrante.intentos += 1
+            entrante.error = str(e)
+            if entrante.intentos >= getattr(settings, "PEDIDOS_ENTRANTES_MAX_INTENTOS", 5):
+                entrante.estatus = "error"
+                devolver_al_carrito(entrante.usuario, entrante.lineas)
+            else:
+                entrante.reintentar_despues = timezone.now() + _espera_reintento(entrante.intentos)
+        else:
+            entrante.estatus = "completado"
+            entrante.pedido = pedido
+            entrante.resultado = resultado_pedido(pedido)
+
+        entrante.save()
+
+    return True
+
+
+def vaciar_cola_entrada():
+    """
+    Procesa pendientes hasta que no quede ninguno.
+    Pensado para correr en un hilo del pool: al final cierra su conexión.
+    Retorna cuántos procesó.
+    """
+    procesados = 0
+    try:
+        while procesar_siguiente():
+            procesados += 1
+    finally:
+        connection.close()
+    return procesados
@@ -0,0 +1,238 @@
+# ============================================================
+# recomendaciones.py
+# "Se pide junto con": sugerencias para el carrito a partir de
+# los productos que aparecen juntos en los pedidos entregados.
+#
+# CoocurrenciaProducto guarda los conteos por par de productos:
+# se suma al entregar cada pedido (ver cocina.py) y se rehace con
+# el comando reconstruir_coocurrencia (NumPy, por bloques, solo con
+# los pares que existen).
+#
+# Cada proceso arma en memoria, cada RECOMENDACIONES_CACHE_SEGUNDOS
+# (o antes si cambia el menú o se reconstruye la tabla, ver
+# versiones.py), una tabla con los TOP_K mejores compañeros de cada
+# producto (ordenados por lift); consultar sugerencias no toca la BD.
+#
+#   lift(a, b) = pedidos(a y b) · total_pedidos / (pedidos(a) · pedidos(b))
+#   > 1 significa que se piden juntos más de lo que tocaría por azar.
+# ============================================================
+
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Sum
+
+from .models import (
+    CoocurrenciaProducto,
+    PedidoDetalle,
+    PedidoDetalleArchivado,
+    Producto,
+    ResumenDiario,
+)
+from . import versiones
+from .acumulados import sumar_acumulado
+
+TOP_K = 5  # compañeros por producto que se guardan en memoria
+MIN_PEDIDOS = 2  # pares vistos menos veces se ignoran (ruido)
+
+# Tabla en memoria (se recarga cada RECOMENDACIONES_CACHE_SEGUNDOS)
+_tabla = {"cargado": 0.0, "versiones": None, "sugerencias": {}, "productos": {}}
+
+
+# ============================================================
+# CONTEOS
+# ============================================================
+def _pares(productos):
+    """Pares (a, b) con a <= b de un conjunto de productos, incluida la diagonal."""
+    productos = sorted(productos)
+    for i, a in enumerate(productos):
+        for b in productos[i:]:
+            yield a, b
+
+
+def sumar_pedidos(pedido_ids):
+    """
+    Suma a los conteos los pedidos que acaban de entregarse.
+    Llamar dentro de la misma transacción que cambia su estatus.
+    """
+    por_pedido = {}
+    renglones = PedidoDetalle.objects.filter(pedido_id__in=pedido_ids).values_list("pedido_id", "producto_id")
+    for pedido_id, producto_id in renglones:
+        por_pedido.setdefault(pedido_id, set()).add(producto_id)
+
+    conteos = Counter()
+    for productos in por_pedido.values():
+        conteos.update(_pares(productos))
+
+    for (a, b), pedidos in conteos.items():
+        sumar_acumulado(CoocurrenciaProducto, {"producto_a_id": a, "producto_b_id": b}, {"pedidos": pedidos})
+
+
+def _pares_del_bloque(renglones):
+    """
+    Conteos de pares (a, b), a <= b, de un bloque de renglones
+    (pedido_id, producto_id) en NumPy: {(a, b): pedidos}.
+    Solo se generan los pares que existen (sin matriz productos × productos).
+    """
+    import numpy as np
+
+    # Un producto repetido en el pedido cuenta una vez; queda ordenado por (pedido, producto)
+    renglones = np.unique(renglones, axis=0)
+    pedidos, productos = renglones[:, 0], renglones[:, 1]
+
+    # Cada renglón se junta con él mismo y con los que le siguen en su pedido
+    inicios = np.flatnonzero(np.r_[True, pedidos[1:] != pedidos[:-1]])
+    tamanos = np.diff(np.r_[inicios, len(pedidos)])
+    fin = np.repeat(inicios + tamanos, tamanos)  # fin del pedido de cada renglón
+    companeros = fin - np.arange(len(pedidos))
+
+    i = np.repeat(np.arange(len(pedidos)), companeros)
+    j = i + np.arange(len(i)) - np.repeat(np.cumsum(companeros) - companeros, companeros)
+
+    pares, conteos = np.unique(np.stack([productos[i], productos[j]], axis=1), axis=0, return_counts=True)
+    return {(int(a), int(b)): int(n) for (a, b), n in zip(pares, conteos)}
+
+
+def reconstruir_coocurrencia(bloque=5000):
+    """
+    Rehace CoocurrenciaProducto desde todos los pedidos entregados
+    (vigentes y archivados).
+
+    Se leen `bloque` pedidos a la vez; de cada bloque salen solo los
+    pares que aparecen (ver _pares_del_bloque) y se suman en un
+    Counter, así la memoria depende de los pares distintos y no del
+    tamaño del historial ni del número de productos.
+    Retorna el número de pares guardados.
+    """
+    import numpy as np
+
+    conteos = Counter()
+
+    for qs in (PedidoDetalle.objects.filter(pedido__estatus="entregado"), PedidoDetalleArchivado.objects.all()):
+        ultimo = qs.aggregate(ultimo=Max("pedido_id"))["ultimo"] or 0
+
+        for desde in range(0, ultimo, bloque):
+            renglones = np.array(
+                list(qs.filter(pedido_id__gt=desde, pedido_id__lte=desde + bloque).values_list("pedido_id", "producto_id")),
+                dtype=np.int64,
+            ).reshape(-1, 2)
+            if len(renglones):
+                conteos.update(_pares_del_bloque(renglones))
+
+    with transaction.atomic():
+        CoocurrenciaProducto.objects.all().delete()
+        CoocurrenciaProducto.objects.bulk_create(
+            [
+                CoocurrenciaProducto(producto_a_id=a, producto_b_id=b, pedidos=n)
+                for (a, b), n in conteos.items()
+            ],
+            batch_size=1000,
+        )
+
+    # Forzar recarga en todos los procesos
+    versiones.subir(versiones.RECOMENDACIONES)
+    return len(conteos)
+
+
+# ============================================================
+# TABLA EN MEMORIA
+# ============================================================
+def _cargar():
+    """Arma {producto_id: [(otro_id, lift), ...]} con los TOP_K de cada producto."""
+    import numpy as np
+
+    filas = np.array(
+        list(CoocurrenciaProducto.objects.values_list("producto_a_id", "producto_b_id", "pedidos")),
+        dtype=np.int64,
+    ).reshape(-1, 3)
+    total = ResumenDiario.objects.aggregate(total=Sum("pedidos"))["total"] or 0
+    productos = {
+        p["id"]: p
+        for p in Producto.objects.filter(estado="activo").values("id", "nombre", "precio", "imagen")
+    }
+
+    a, b, juntos = filas[:, 0], filas[:, 1], filas[:, 2]
+
+    # Pedidos de cada producto (diagonal), buscados por id
+    diagonal = a == b
+    ids_diagonal, pedidos_diagonal = a[diagonal], juntos[diagonal]
+    orden = np.argsort(ids_diagonal)
+    ids_diagonal, pedidos_diagonal = ids_diagonal[orden], pedidos_diagonal[orden]
+
+    pares = ~diagonal & (juntos >= MIN_PEDIDOS)
+    a, b, juntos = a[pares], b[pares], juntos[pares]
+    if not len(a) or not total:
+        return {}, productos
+
+    pedidos_a = pedidos_diagonal[np.searchsorted(ids_diagonal, a)]
+    pedidos_b = pedidos_diagonal[np.searchsorted(ids_diagonal, b)]
+    lift = juntos * total / (pedidos_a * pedidos_b)
+
+    # Cada par sirve en las dos direcciones; solo productos activos y lift > 1
+    origen = np.concatenate([a, b])
+    destino = np.concatenate([b, a])
+    lift = np.concatenate([lift, lift])
+    utiles = (lift > 1.0) & np.isin(destino, np.fromiter(productos, dtype=np.int64, count=len(productos)))
+    origen, destino, lift = origen[utiles], destino[utiles], lift[utiles]
+
+    # Ordenar por origen y lift descendente; quedarse con los primeros TOP_K de cada origen
+    orden = np.lexsort((-lift, origen))
+    origen, destino, lift = origen[orden], destino[orden], lift[orden]
+    primeros = np.unique(origen, return_index=True)[1]
+    tamanos = np.diff(np.append(primeros, len(origen)))
+    posicion = np.arange(len(origen)) - np.repeat(primeros, tamanos)
+    top = posicion < TOP_K
+
+    sugerencias = {}
+    for o, d, l in zip(origen[top].tolist(), destino[top].tolist(), lift[top].tolist()):
+        sugerencias.setdefault(o, []).append((d, l))
+
+    return sugerencias, productos
+
+
+def tabla_sugerencias():
+    """
+    Tabla en memoria: {"sugerencias": {id: [(otro_id, lift)]}, "productos": {id: datos}}.
+    Se lee de la BD como mucho cada RECOMENDACIONES_CACHE_SEGUNDOS por
+    proceso, o en cuanto cambia el menú o se reconstruye la tabla.
+    """
+    ttl = getattr(settings, "RECOMENDACIONES_CACHE_SEGUNDOS", 300)
+    actuales = (versiones.version(versiones.MENU), versiones.version(versiones.RECOMENDACIONES))
+
+    global _tabla
+    tabla = _tabla
+    if time.monotonic() - tabla["cargado"] > ttl or tabla["versiones"] != actuales:
+        por_producto, productos = _cargar()
+        # Tabla nueva y un solo cambio de referencia: otro hilo que esté
+        # leyendo la anterior nunca ve una mitad vieja y otra nueva
+        tabla = {
+            "cargado": time.monotonic(),
+            "versiones": actuales,
+            "sugerencias": por_producto,
+            "productos": productos,
+        }
+        _tabla = tabla
+
+    return tabla
+
+
+def sugerencias(producto_ids, limite=4):
+    """
+    Productos que suelen pedirse junto con `producto_ids` (y que no
+    están ya en la lista), mejor lift primero. Solo lee memoria.
+    Retorna dicts con id, nombre, precio e imagen (ruta en MEDIA).
+    """
+    tabla = tabla_sugerencias()
+    ya_estan = set(producto_ids)
+
+    puntaje = {}
+    for producto_id in ya_estan:
+        for otro, lift in tabla["sugerencias"].get(producto_id, ()):
+            if otro not in ya_estan:
+                puntaje[otro] = max(puntaje.get(otro, 0.0), lift)
+
+    mejores = sorted(puntaje, key=puntaje.get, reverse=True)
+    productos = (tabla["productos"].get(producto_id) for producto_id in mejores)
+    return [p for p in productos if p is not None][:limite]
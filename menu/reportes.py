@@ -0,0 +1,365 @@
+# ============================================================
+# reportes.py
+# Reporte de ventas a partir de tablas acumuladas.
+#
+# VentaDiaria (día, producto, método de pago) y ResumenDiario
+# (día, método de pago) se suman en la misma transacción en que
+# un pedido pasa a "entregado" (ver cocina.py). Los reportes leen
+# solo de ellas: nunca recorren Pedido ni PedidoDetalle.
+#
+# Si los acumulados se desfasan (cambios hechos por fuera, datos
+# viejos) se rehacen con:  python manage.py reconstruir_ventas
+# ============================================================
+
+from datetime import datetime, timedelta
+from itertools import chain
+
+from django.db import transaction
+from django.db.models import DecimalField, F, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.utils import timezone
+
+from . import versiones
+from .acumulados import sumar_acumulado
+from .models import (
+    Pedido,
+    PedidoArchivado,
+    PedidoDetalle,
+    PedidoDetalleArchivado,
+    PopularidadProducto,
+    Producto,
+    ResumenDiario,
+    VentaDiaria,
+)
+
+AGRUPACIONES = (
+    ("dia", "Día"),
+    ("semana", "Semana"),
+    ("mes", "Mes"),
+    ("producto", "Producto"),
+    ("categoria", "Categoría"),
+    ("metodo_pago", "Método de pago"),
+)
+
+# Agrupaciones por fecha (las demás se ordenan por total)
+PERIODOS = {
+    "dia": F("fecha"),
+    "semana": TruncWeek("fecha"),
+    "mes": TruncMonth("fecha"),
+}
+
+# Agrupaciones que salen de VentaDiaria (por producto)
+POR_PRODUCTO = {
+    "producto": "producto__nombre",
+    "categoria": "producto__categoria__nombre",
+}
+
+
+def _inicio_del_dia(dia):
+    """Fecha (date) -> datetime con zona horaria a las 00:00 de ese día."""
+    return timezone.make_aware(datetime.combine(dia, datetime.min.time()))
+
+
+# ============================================================
+# ACUMULADOS
+# ============================================================
+RECONSTRUIR_BLOQUE = 1000  # pedidos por bloque en reconstruir_ventas()
+
+
+# El día de cada pedido se saca en Python con timezone.localdate():
+# TruncDate se vuelve CONVERT_TZ en MySQL, que regresa NULL si el
+# servidor no tiene cargadas las tablas de zonas horarias.
+def _ventas_por_producto(detalles):
+    """Renglones de pedido agrupados por (dia, producto_id, pago)."""
+    # La BD suma por (pedido, producto); aquí se juntan por día
+    por_pedido = (
+        detalles
+        .values("pedido_id", "producto_id", "pedido__fecha", "pedido__metodo_pago")
+        .annotate(
+            piezas=Sum("cantidad"),
+            importe=Sum(F("cantidad") * F("precio_unitario"), output_field=DecimalField()),
+        )
+        .order_by()
+    )
+
+    grupos = {}
+    for r in por_pedido:
+        dia = timezone.localdate(r["pedido__fecha"])
+        pago = r["pedido__metodo_pago"] or ""
+        g = grupos.setdefault(
+            (dia, r["producto_id"], pago),
+            {"dia": dia, "producto_id": r["producto_id"], "pago": pago, "pedidos": 0, "piezas": 0, "importe": 0},
+        )
+        g["pedidos"] += 1
+        g["piezas"] += r["piezas"]
+        g["importe"] += r["importe"]
+    return list(grupos.values())
+
+
+def _pedidos_por_dia(pedidos):
+    """Pedidos agrupados por (dia, pago)."""
+    grupos = {}
+    for fecha, metodo_pago, num_items, total in pedidos.values_list("fecha", "metodo_pago", "num_items", "total"):
+        dia = timezone.localdate(fecha)
+        pago = metodo_pago or ""
+        g = grupos.setdefault(
+            (dia, pago),
+            {"dia": dia, "pago": pago, "pedidos": 0, "articulos": 0, "ingresos": 0},
+        )
+        g["pedidos"] += 1
+        g["articulos"] += num_items or 0
+        g["ingresos"] += total
+    return list(grupos.values())
+
+
+def _sumar_pedidos(detalles, pedidos):
+    """Suma a los acumulados los renglones `detalles` y los `pedidos` (querysets)."""
+    for g in _ventas_por_producto(detalles):
+        sumar_acumulado(
+            VentaDiaria,
+            {"fecha": g["dia"], "producto_id": g["producto_id"], "metodo_pago": g["pago"]},
+            {"pedidos": g["pedidos"], "cantidad": g["piezas"], "ingresos": g["importe"]},
+        )
+
+    for g in _pedidos_por_dia(pedidos):
+        sumar_acumulado(
+            ResumenDiario,
+            {"fecha": g["dia"], "metodo_pago": g["pago"]},
+            {"pedidos": g["pedidos"], "articulos": g["articulos"] or 0, "ingresos": g["ingresos"]},
+        )
+
+
+def sumar_entregados(pedido_ids):
+    """
+    Agrega a los acumulados los pedidos que acaban de entregarse.
+    Llamar dentro de la misma transacción que cambia su estatus.
+    """
+    _sumar_pedidos(PedidoDetalle.objects.filter(pedido_id__in=pedido_ids), Pedido.objects.filter(id__in=pedido_ids))
+
+
+def _ids_por_bloques(qs, bloque):
+    """Listas de hasta `bloque` ids de qs, en orden de id (ver _por_bloques)."""
+    ids = []
+    for (pedido_id,) in _por_bloques(qs, bloque=bloque):
+        ids.append(pedido_id)
+        if len(ids) == bloque:
+            yield ids
+            ids = []
+    if ids:
+        yield ids
+
+
+def reconstruir_ventas(desde=None):
+    """
+    Rehace los acumulados desde la fecha `desde` (date; None = todo)
+    leyendo los pedidos entregados vigentes y archivados.
+
+    Recorre los pedidos por bloques de RECONSTRUIR_BLOQUE ids y suma
+    cada bloque antes de leer el siguiente: la memoria no crece con
+    el historial.
+    Retorna (filas de VentaDiaria, filas de ResumenDiario).
+    """
+    tablas = (
+        (Pedido.objects.filter(estatus="entregado"), PedidoDetalle),
+        (PedidoArchivado.objects.all(), PedidoDetalleArchivado),
+    )
+
+    with transaction.atomic():
+        acumulados = [modelo.objects.filter(fecha__gte=desde) if desde else modelo.objects.all()
+                      for modelo in (VentaDiaria, ResumenDiario)]
+        for viejos in acumulados:
+            viejos.delete()
+
+        for pedidos, detalles in tablas:
+            if desde:
+                pedidos = pedidos.filter(fecha__gte=_inicio_del_dia(desde))
+            for ids in _ids_por_bloques(pedidos, RECONSTRUIR_BLOQUE):
+                _sumar_pedidos(detalles.objects.filter(pedido_id__in=ids), pedidos.model.objects.filter(id__in=ids))
+
+    return tuple(qs.count() for qs in acumulados)
+
+
+# ============================================================
+# LECTURA
+# ============================================================
+def _en_rango(qs, desde, hasta):
+    if desde:
+        qs = qs.filter(fecha__gte=desde)
+    if hasta:
+        qs = qs.filter(fecha__lte=hasta)
+    return qs
+
+
+def ventas_agrupadas(agrupar="dia", desde=None, hasta=None):
+    """
+    Ventas entregadas agrupadas por `agrupar` (ver AGRUPACIONES)
+    entre las fechas desde y hasta (dates, ambas incluidas).
+
+    Retorna un queryset de dicts {clave, pedidos, articulos, total}:
+    los periodos del más reciente al más viejo, lo demás por total.
+    En "categoria", pedidos cuenta una vez por producto distinto.
+    """
+    if agrupar in POR_PRODUCTO:
+        return (
+            _en_rango(VentaDiaria.objects, desde, hasta)
+            .values(clave=F(POR_PRODUCTO[agrupar]))
+            .annotate(pedidos=Sum("pedidos"), articulos=Sum("cantidad"), total=Sum("ingresos"))
+            .order_by("-total")
+        )
+
+    clave = PERIODOS.get(agrupar, F("metodo_pago"))
+    return (
+        _en_rango(ResumenDiario.objects, desde, hasta)
+        .values(clave=clave)
+        .annotate(pedidos=Sum("pedidos"), articulos=Sum("articulos"), total=Sum("ingresos"))
+        .order_by("-clave" if agrupar in PERIODOS else "-total")
+    )
+
+
+def totales_ventas(desde=None, hasta=None):
+    """Pedidos, artículos y total vendido en el rango."""
+    totales = _en_rango(ResumenDiario.objects, desde, hasta).aggregate(
+        pedidos=Sum("pedidos"), articulos=Sum("articulos"), total=Sum("ingresos"),
+    )
+    return {campo: valor or 0 for campo, valor in totales.items()}
+
+
+# ============================================================
+# POPULARIDAD DE PRODUCTOS
+# ============================================================
+VENTANAS_POPULARIDAD = (7, 30)
+
+
+def _rangos(cantidades):
+    """{id: cantidad} -> {id: lugar}, solo para los que tienen ventas."""
+    orden = sorted((c for c in cantidades.items() if c[1] > 0), key=lambda c: (-c[1], c[0]))
+    return {producto_id: lugar for lugar, (producto_id, _) in enumerate(orden, start=1)}
+
+
+def calcular_popularidad(hoy=None):
+    """
+    Recalcula PopularidadProducto con las ventas de los últimos 7 y
+    30 días (incluido hoy), leyendo solo VentaDiaria.
+    Retorna cuántos productos se calcularon.
+    """
+    hoy = hoy or timezone.localdate()
+    categorias = dict(Producto.objects.values_list("id", "categoria_id"))
+
+    filas = {
+        producto_id: PopularidadProducto(producto_id=producto_id)
+        for producto_id in categorias
+    }
+
+    for dias in VENTANAS_POPULARIDAD:
+        cantidades = dict(
+            VentaDiaria.objects
+            .filter(fecha__gt=hoy - timedelta(days=dias))
+            .values("producto_id")
+            .annotate(total=Sum("cantidad"))
+            .values_list("producto_id", "total")
+        )
+        cantidades = {producto_id: cantidades.get(producto_id, 0) for producto_id in categorias}
+
+        por_categoria = {}
+        for producto_id, cantidad in cantidades.items():
+            por_categoria.setdefault(categorias[producto_id], {})[producto_id] = cantidad
+
+        rangos = _rangos(cantidades)
+        rangos_categoria = {}
+        for grupo in por_categoria.values():
+            rangos_categoria.update(_rangos(grupo))
+
+        for producto_id, fila in filas.items():
+            setattr(fila, f"cantidad_{dias}d", cantidades[producto_id])
+            setattr(fila, f"rango_{dias}d", rangos.get(producto_id))
+            setattr(fila, f"rango_categoria_{dias}d", rangos_categoria.get(producto_id))
+
+    with transaction.atomic():
+        PopularidadProducto.objects.all().delete()
+        PopularidadProducto.objects.bulk_create(filas.values(), batch_size=1000)
+
+    # El orden "lo más pedido" del inicio cambió
+    versiones.subir(versiones.MENU)
+    return len(filas)
+
+
+# ============================================================
+# EXPORTACIÓN (CSV)
+# Generadores de renglones: leen por bloques de EXPORTAR_BLOQUE con
+# paginación por llave (WHERE id > último ORDER BY id LIMIT n), así
+# la memoria no crece con el rango. iterator() no sirve para esto en
+# MySQL: el driver trae todo el resultado de una vez.
+# ============================================================
+EXPORTAR_BLOQUE = 2000
+
+ENCABEZADO_PEDIDOS = ("pedido", "fecha", "cliente", "metodo_pago", "articulos", "total", "resumen")
+ENCABEZADO_DETALLES = (
+    "pedido", "fecha", "producto", "categoria", "cantidad", "precio_unitario", "subtotal", "notas",
+)
+
+
+def _pedidos_en_rango(qs, campo, desde, hasta):
+    if desde:
+        qs = qs.filter(**{f"{campo}__gte": _inicio_del_dia(desde)})
+    if hasta:
+        qs = qs.filter(**{f"{campo}__lt": _inicio_del_dia(hasta + timedelta(days=1))})
+    return qs
+
+
+def _por_bloques(qs, *campos, bloque=EXPORTAR_BLOQUE):
+    """
+    Tuplas (id, *campos) de qs en orden de id, una consulta por bloque.
+    Cada consulta sigue desde el último id leído (usa la llave primaria).
+    """
+    ultimo = 0
+    while True:
+        filas = list(qs.filter(id__gt=ultimo).order_by("id").values_list("id", *campos)[:bloque])
+        yield from filas
+        if len(filas) < bloque:
+            return
+        ultimo = filas[-1][0]
+
+
+def filas_pedidos(desde=None, hasta=None):
+    """Pedidos entregados (vigentes y archivados) en el rango, uno por renglón, por id."""
+    consultas = (
+        _por_bloques(
+            _pedidos_en_rango(qs, "fecha", desde, hasta),
+            "fecha", "cliente__username", "metodo_pago", "num_items", "total", "resumen",
+        )
+        for qs in (PedidoArchivado.objects.all(), Pedido.objects.filter(estatus="entregado"))
+    )
+    for pedido_id, fecha, cliente, metodo_pago, articulos, total, resumen in chain.from_iterable(consultas):
+        yield (pedido_id, timezone.localtime(fecha).strftime("%Y-%m-%d %H:%M"), cliente,
+               metodo_pago or "", articulos, total, resumen)
+
+
+def filas_detalles(desde=None, hasta=None):
+    """Renglones de los pedidos entregados (vigentes y archivados) en el rango, por id."""
+    consultas = (
+        _por_bloques(
+            _pedidos_en_rango(qs, "pedido__fecha", desde, hasta),
+            "pedido_id", "pedido__fecha", "producto__nombre", "producto__categoria__nombre",
+            "cantidad", "precio_unitario", "notas",
+        )
+        for qs in (
+            PedidoDetalleArchivado.objects.all(),
+            PedidoDetalle.objects.filter(pedido__estatus="entregado"),
+        )
+    )
+    for _, pedido_id, fecha, producto, categoria, cantidad, precio, notas in chain.from_iterable(consultas):
+        yield (pedido_id, timezone.localtime(fecha).strftime("%Y-%m-%d %H:%M"), producto,
+               categoria or "", cantidad, precio, cantidad * precio, notas or "")
+
+
+def filas_ventas(agrupar="dia", desde=None, hasta=None):
+    """
+    Los grupos del reporte de ventas (mismos filtros que la vista).
+    Salen de los acumulados ya agrupados: son pocos renglones (uno por
+    periodo o producto) y se leen en una sola consulta.
+    """
+    for fila in ventas_agrupadas(agrupar, desde, hasta):
+        clave = fila["clave"]
+        if agrupar in PERIODOS:
+            clave = clave.isoformat()
+        yield (clave or "", fila["pedidos"], fila["articulos"], fila["total"])
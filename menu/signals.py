@@ -0,0 +1,130 @@
+# ============================================================
+# signals.py
+# Receptores de señales de los modelos de la app.
+# Se conectan en MenuConfig.ready().
+# ============================================================
+
+from django.contrib.auth.models import User
+from django.core.signals import request_finished, request_started
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from . import cocina, contadores, eventos, versiones
+from .models import ApiToken, Categoria, Pedido, Producto
+
+
+@receiver(post_init, sender=Pedido)
+def recordar_estatus(sender, instance, **kwargs):
+    """Guarda el estatus con el que se cargó el pedido para saber si cambió."""
+    instance._estatus_cargado = instance.estatus
+
+
+@receiver(post_save, sender=Pedido)
+def guardar_cambio_estatus(sender, instance, created, **kwargs):
+    """
+    Cuando se crea un pedido o cambia su estatus con save() (checkout,
+    admin de Django, scripts): historial, contador de la cola de
+    cocina y aviso a la app (SSE / long-poll).
+
+    Es el único receptor que mira _estatus_cargado: al final lo
+    deja igual al estatus guardado. Los UPDATE de cocina.py no pasan
+    por aquí y hacen lo mismo a mano.
+    """
+    if created:
+        cocina.registrar_historial(instance, None)
+        cocina.actualizar_cola(None, instance.estatus, minutos=instance.minutos_preparacion)
+    elif instance.estatus != instance._estatus_cargado:
+        cocina.registrar_cambio(instance, instance._estatus_cargado)
+
+    if created or instance.estatus != instance._estatus_cargado:
+        eventos.publicar(instance)
+    instance._estatus_cargado = instance.estatus
+
+
+@receiver(post_delete, sender=Pedido)
+def sacar_de_cola(sender, instance, **kwargs):
+    """Un pedido activo que se borra (a mano o en cascada con su cliente) deja la cola."""
+    cocina.actualizar_cola(instance._estatus_cargado, None, minutos=instance.minutos_preparacion)
+
+
+# ============================================================
+# CONTADORES DEL DASHBOARD (ver contadores.py)
+# ============================================================
+CLAVE_CONTADOR = {User: "clientes", Producto: "productos", Categoria: "categorias"}
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Producto)
+@receiver(post_save, sender=Categoria)
+def contar_alta(sender, instance, created, **kwargs):
+    if created:
+        contadores.sumar(CLAVE_CONTADOR[sender], 1)
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Producto)
+@receiver(post_delete, sender=Categoria)
+def contar_baja(sender, instance, **kwargs):
+    contadores.sumar(CLAVE_CONTADOR[sender], -1)
+
+
+@receiver(post_save, sender=Pedido)
+def contar_pedido(sender, instance, created, **kwargs):
+    """Total de pedidos y pedidos del día (los ingresos, al entregarse: cocina.al_entregar)."""
+    if created:
+        contadores.sumar_pedido(instance)
+
+
+@receiver(post_delete, sender=Pedido)
+def descontar_pedido(sender, instance, **kwargs):
+    """
+    Solo baja el total (la tabla de pedidos vigentes): los pedidos y
+    los ingresos de su día no cambian porque se archive.
+    """
+    contadores.sumar("pedidos", -1)
+
+
+# ============================================================
+# VERSIÓN DEL MENÚ (caché del inicio del cliente)
+# ============================================================
+@receiver(post_save, sender=Producto)
+@receiver(post_save, sender=Categoria)
+@receiver(post_delete, sender=Producto)
+@receiver(post_delete, sender=Categoria)
+def subir_version_menu(sender, **kwargs):
+    versiones.subir_al_confirmar(versiones.MENU)
+
+
+# ============================================================
+# VERSIÓN DEL HISTORIAL DE PEDIDOS DE CADA CLIENTE
+# (los UPDATE en lote de cocina.py la suben por su cuenta)
+# ============================================================
+@receiver(post_save, sender=Pedido)
+@receiver(post_delete, sender=Pedido)
+def subir_version_pedidos(sender, instance, **kwargs):
+    versiones.subir_al_confirmar(versiones.pedidos_de(instance.cliente_id))
+
+
+# ============================================================
+# TOKENS DE LA API (caché en memoria de api_utils.py)
+# ============================================================
+@receiver(post_save, sender=ApiToken)
+@receiver(post_delete, sender=ApiToken)
+@receiver(post_delete, sender=User)
+def subir_version_tokens(sender, **kwargs):
+    versiones.subir_al_confirmar(versiones.TOKENS)
+
+
+@receiver(post_save, sender=User)
+def subir_version_tokens_usuario(sender, instance, update_fields=None, **kwargs):
+    # El login solo toca last_login: no hace falta invalidar
+    if update_fields is not None and set(update_fields) == {"last_login"}:
+        return
+    versiones.subir_al_confirmar(versiones.TOKENS)
+
+
+# ============================================================
+# REQUESTS: cada versión se lee una vez por request
+# ============================================================
+request_started.connect(versiones.inicio_request, dispatch_uid="versiones_inicio_request")
+request_finished.connect(versiones.fin_request, dispatch_uid="versiones_fin_request")
@@ -1,3 +1,891 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import os
+import tempfile
+import zipfile
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError
+from django.db.models import Sum
+from django.test import AsyncClient, Client, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from . import archivo, catalogo, cocina, contadores, eventos, importacion, pedidos, recomendaciones, reportes, versiones
+from .models import (
+    ApiToken,
+    CarritoItem,
+    Categoria,
+    ColaCocina,
+    CoocurrenciaProducto,
+    EventoPedido,
+    IdempotenciaPago,
+    Mesa,
+    Pedido,
+    PedidoArchivado,
+    PedidoEntrante,
+    PedidoEstatusHistorial,
+    Producto,
+    ResumenDiario,
+    TiempoPreparacion,
+    VentaDiaria,
+)
+
+
+class BaseMenuTest(TestCase):
+    """Cliente con token, un admin, una mesa y dos productos."""
+
+    def setUp(self):
+        cache.clear()
+        versiones._memo.clear()
+
+        self.usuario = User.objects.create_user("a@a.com", "a@a.com", "pw")
+        self.admin = User.objects.create_user("admin", "admin@a.com", "pw", is_staff=True)
+        self.token = ApiToken.objects.create(user=self.usuario).key
+        self.categoria = Categoria.objects.create(nombre="Tacos")
+        self.taco = Producto.objects.create(categoria=self.categoria, nombre="Taco", precio=20)
+        self.agua = Producto.objects.create(categoria=self.categoria, nombre="Agua", precio=15)
+        self.mesa = Mesa.objects.create(numero=1)
+        self.api = Client(HTTP_AUTHORIZATION="Token " + self.token)
+
+    def post_json(self, url, datos, cliente=None, **extra):
+        return (cliente or self.api).post(url, json.dumps(datos), content_type="application/json", **extra)
+
+    def agregar(self, producto, cantidad=1):
+        r = self.post_json("/api/carrito/agregar/", {"producto_id": producto.id, "cantidad": cantidad})
+        self.assertEqual(r.status_code, 200, r.content)
+
+    def pagar(self, **extra):
+        return self.post_json("/api/pago/confirmar/", {"metodo_pago": "tarjeta", "mesa": 1}, **extra)
+
+    def pedido_nuevo(self, producto=None, cantidad=1):
+        """Hace un checkout por la API y regresa el Pedido creado."""
+        self.agregar(producto or self.taco, cantidad)
+        r = self.pagar()
+        self.assertEqual(r.status_code, 200, r.content)
+        return Pedido.objects.get(id=r.json()["pedido_id"])
+
+    def cola(self):
+        return ColaCocina.objects.get(pk=cocina.COLA_ID)
+
+
+class PanelTest(BaseMenuTest):
+    """Además, un cliente de pruebas con sesión de admin."""
+
+    def setUp(self):
+        super().setUp()
+        self.panel = Client()
+        self.panel.force_login(self.admin)
+
+
+# ============================================================
+# CHECKOUT
+# ============================================================
+class CheckoutTest(BaseMenuTest):
+
+    def test_crea_pedido_y_vacia_carrito(self):
+        self.agregar(self.taco, 2)
+        self.agregar(self.agua)
+        r = self.pagar()
+
+        self.assertEqual(r.status_code, 200)
+        pedido = Pedido.objects.get(id=r.json()["pedido_id"])
+        self.assertEqual((pedido.total, pedido.num_items, pedido.mesa_id), (55, 3, self.mesa.id))
+        self.assertEqual(pedido.detalles.count(), 2)
+        self.assertEqual(CarritoItem.objects.count(), 0)
+
+    def test_carrito_vacio(self):
+        self.assertEqual(self.pagar().status_code, 400)
+
+    def test_misma_clave_repite_la_respuesta(self):
+        self.agregar(self.taco, 2)
+        primera = self.pagar(HTTP_IDEMPOTENCY_KEY="pago-1")
+        repetida = self.pagar(HTTP_IDEMPOTENCY_KEY="pago-1")
+
+        self.assertEqual(repetida.status_code, primera.status_code)
+        self.assertEqual(repetida.json(), primera.json())
+        self.assertEqual(repetida["Idempotent-Replayed"], "true")
+        self.assertEqual(Pedido.objects.count(), 1)
+        self.assertEqual(IdempotenciaPago.objects.count(), 1)
+
+        # Otra clave es otro intento (el carrito ya está vacío)
+        self.assertEqual(self.pagar(HTTP_IDEMPOTENCY_KEY="pago-2").status_code, 400)
+        self.assertEqual(Pedido.objects.count(), 1)
+
+
+# ============================================================
+# COLA DE COCINA
+# ============================================================
+class ColaCocinaTest(BaseMenuTest):
+
+    def test_checkout_entra_a_la_cola(self):
+        primero = self.pedido_nuevo()
+        segundo = self.pedido_nuevo()
+
+        self.assertEqual(self.cola().pedidos_activos, 2)
+        self.assertEqual((primero.posicion_cola, segundo.posicion_cola), (1, 2))
+        self.assertEqual(PedidoEstatusHistorial.objects.filter(estatus_anterior=None).count(), 2)
+
+    def test_save_cambia_el_contador(self):
+        pedido = self.pedido_nuevo()
+        pedido.estatus = "listo"
+        pedido.save()
+
+        self.assertEqual(self.cola().pedidos_activos, 0)
+        self.assertTrue(PedidoEstatusHistorial.objects.filter(
+            pedido=pedido, estatus_anterior="activo", estatus_nuevo="listo",
+        ).exists())
+
+        # Guardar otra vez sin cambiar el estatus no lo vuelve a tocar
+        pedido.save()
+        self.assertEqual(self.cola().pedidos_activos, 0)
+
+    def test_borrar_cliente_saca_sus_pedidos(self):
+        self.pedido_nuevo()
+        self.pedido_nuevo()
+        self.usuario.delete()
+
+        cola = self.cola()
+        self.assertEqual(cola.pedidos_activos, 0)
+        self.assertAlmostEqual(cola.minutos_pendientes, 0)
+
+    def test_sin_fila_se_recuenta(self):
+        self.pedido_nuevo()
+        ColaCocina.objects.all().delete()
+        pedido = Pedido.objects.get()
+        pedido.delete()
+
+        self.assertEqual(self.cola().pedidos_activos, 0)
+
+    def test_recalcular_cola(self):
+        self.pedido_nuevo()
+        ColaCocina.objects.update(pedidos_activos=7)
+        cocina.recalcular_cola()
+
+        self.assertEqual(self.cola().pedidos_activos, 1)
+
+
+class AdmisionTest(BaseMenuTest):
+
+    @override_settings(COCINA_MAX_PEDIDOS_ACTIVOS=1)
+    def test_cocina_llena_responde_503(self):
+        self.pedido_nuevo()
+        self.agregar(self.taco)
+        r = self.pagar()
+
+        self.assertEqual(r.status_code, 503)
+        self.assertIn("Retry-After", r)
+        self.assertEqual(Pedido.objects.count(), 1)
+        self.assertEqual(CarritoItem.objects.count(), 1)  # el carrito se conserva
+        self.assertEqual(self.cola().pedidos_activos, 1)
+
+    @override_settings(COCINA_MAX_PEDIDOS_ACTIVOS=1)
+    def test_pedido_entregado_libera_lugar(self):
+        pedido = self.pedido_nuevo()
+        pedido.estatus = "entregado"
+        pedido.save()
+
+        self.pedido_nuevo()
+        self.assertEqual(self.cola().pedidos_activos, 1)
+
+
+class ModeloEtaTest(BaseMenuTest):
+
+    def test_muestras_cuentan_pedidos_no_renglones(self):
+        lineas = [
+            # Dos renglones del mismo producto (notas distintas) en un solo pedido
+            {"producto_id": self.taco.id, "cantidad": 1, "precio_unitario": "20", "nota": "sin cebolla"},
+            {"producto_id": self.taco.id, "cantidad": 2, "precio_unitario": "20", "nota": None},
+            {"producto_id": self.agua.id, "cantidad": 1, "precio_unitario": "15", "nota": None},
+        ]
+        for _ in range(3):
+            pedido = pedidos.crear_pedido(self.usuario, lineas, "tarjeta")
+            pedido.estatus = "entregado"
+            pedido.save()
+
+        self.assertEqual(cocina.entrenar_modelo_eta(minimo=1), 3)
+        muestras = dict(TiempoPreparacion.objects.values_list("producto_id", "muestras"))
+        self.assertEqual(muestras, {self.taco.id: 3, self.agua.id: 3})
+
+
+# ============================================================
+# CAMBIOS DE ESTATUS
+# ============================================================
+class EstatusTest(PanelTest):
+
+    def test_version_vieja_responde_409(self):
+        pedido = self.pedido_nuevo()
+        url = f"/admin_panel/pedidos/{pedido.id}/"
+
+        self.assertEqual(self.panel.post(url, {"estatus": "listo", "version": 1}).status_code, 302)
+        r = self.panel.post(url, {"estatus": "entregado", "version": 1})  # se leyó antes del cambio
+
+        self.assertEqual(r.status_code, 409)
+        self.assertEqual(Pedido.objects.values_list("estatus", "version").get(id=pedido.id), ("listo", 2))
+
+    def test_conflicto_no_deja_rastro(self):
+        pedido = self.pedido_nuevo()
+        with self.assertRaises(cocina.ConflictoVersion):
+            pedido.estatus = "listo"
+            cocina.guardar_estatus(pedido, "activo", version=7)
+
+        self.assertEqual(Pedido.objects.get(id=pedido.id).estatus, "activo")
+        self.assertEqual(PedidoEstatusHistorial.objects.filter(pedido=pedido).count(), 1)
+        self.assertEqual(self.cola().pedidos_activos, 1)
+
+    def test_transicion_invalida(self):
+        pedido = self.pedido_nuevo()
+        pedido.estatus = "entregado"
+        pedido.save()
+
+        with self.assertRaises(cocina.TransicionInvalida):
+            pedido.estatus = "listo"
+            cocina.guardar_estatus(pedido, "entregado", version=pedido.version)
+
+
+class TableroCocinaTest(PanelTest):
+
+    def datos(self, **params):
+        r = self.panel.get("/admin_panel/cocina/datos/", params)
+        self.assertEqual(r.status_code, 200)
+        return r.json()
+
+    def test_cursor_trae_solo_lo_que_cambio(self):
+        quieto, cambia, entregado = [self.pedido_nuevo() for _ in range(3)]
+        entregado.estatus = "entregado"
+        entregado.save()
+
+        completo = self.datos()
+        self.assertTrue(completo["completo"])
+        self.assertEqual([p["id"] for p in completo["pedidos"]], [quieto.id, cambia.id])
+
+        # Todo quedó antes del cursor (fuera del solape)
+        cursor = datetime.fromisoformat(completo["cursor"])
+        Pedido.objects.update(actualizado=cursor - timedelta(minutes=1))
+        cambia.estatus = "listo"
+        cambia.save()
+
+        nuevos = self.datos(desde=completo["cursor"])
+        self.assertFalse(nuevos["completo"])
+        self.assertEqual([(p["id"], p["estatus"]) for p in nuevos["pedidos"]], [(cambia.id, "listo")])
+
+    def test_solape_repite_lo_del_limite(self):
+        pedido = self.pedido_nuevo()
+        cursor = timezone.now()
+        Pedido.objects.filter(id=pedido.id).update(actualizado=cursor - timedelta(seconds=1))
+
+        self.assertEqual([p["id"] for p in self.datos(desde=cursor.isoformat())["pedidos"]], [pedido.id])
+
+    def test_cursor_invalido_carga_todo(self):
+        pedido = self.pedido_nuevo()
+        Pedido.objects.update(actualizado=timezone.now() - timedelta(hours=1))
+
+        datos = self.datos(desde="ayer")
+        self.assertTrue(datos["completo"])
+        self.assertEqual([p["id"] for p in datos["pedidos"]], [pedido.id])
+
+
+class CambioMasivoTest(PanelTest):
+
+    def test_omite_los_que_ya_cambiaron(self):
+        primero = self.pedido_nuevo()
+        segundo = self.pedido_nuevo()
+        segundo.estatus = "listo"
+        segundo.save()
+
+        cambiados = cocina.cambiar_estatus_masivo([primero.id, segundo.id], "activo", "listo")
+
+        self.assertEqual(cambiados, [primero.id])
+        self.assertEqual(Pedido.objects.values_list("estatus", "version").get(id=primero.id), ("listo", 2))
+        self.assertEqual(self.cola().pedidos_activos, 0)
+        self.assertAlmostEqual(self.cola().minutos_pendientes, 0)
+        self.assertEqual(PedidoEstatusHistorial.objects.filter(estatus_nuevo="listo").count(), 2)
+
+    def test_vista_reporta_omitidos(self):
+        primero = self.pedido_nuevo()
+        segundo = self.pedido_nuevo()
+        segundo.estatus = "listo"
+        segundo.save()
+
+        r = self.post_json("/admin_panel/cocina/estatus/",
+                           {"ids": [primero.id, segundo.id], "de": "activo", "a": "listo"},
+                           cliente=self.panel)
+
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.json(), {"success": True, "actualizados": [primero.id], "omitidos": [segundo.id]})
+
+    def test_vista_rechaza_transicion_invalida(self):
+        pedido = self.pedido_nuevo()
+        r = self.post_json("/admin_panel/cocina/estatus/",
+                           {"ids": [pedido.id], "de": "entregado", "a": "activo"},
+                           cliente=self.panel)
+
+        self.assertEqual(r.status_code, 400)
+        self.assertEqual(Pedido.objects.get(id=pedido.id).estatus, "activo")
+
+
+# ============================================================
+# CHECKOUT ASÍNCRONO
+# ============================================================
+class ColaEntradaTest(BaseMenuTest):
+
+    def encolar(self):
+        self.agregar(self.taco, 2)
+        r = self.pagar(HTTP_PREFER="respond-async")
+        self.assertEqual(r.status_code, 202)
+        return PedidoEntrante.objects.get(id=r.json()["entrante_id"])
+
+    def test_procesa_el_pedido(self):
+        entrante = self.encolar()
+        self.assertTrue(pedidos.procesar_siguiente())
+
+        entrante.refresh_from_db()
+        self.assertEqual(entrante.estatus, "completado")
+        self.assertEqual(entrante.pedido.total, 40)
+        self.assertEqual(self.cola().pedidos_activos, 1)
+
+    def test_fallo_temporal_se_reintenta(self):
+        entrante = self.encolar()
+        with mock.patch("menu.pedidos.crear_pedido", side_effect=OperationalError("deadlock")), \
+                self.assertLogs("menu.pedidos", "ERROR"):
+            self.assertTrue(pedidos.procesar_siguiente())
+
+        entrante.refresh_from_db()
+        self.assertEqual((entrante.estatus, entrante.intentos), ("pendiente", 1))
+        self.assertIsNotNone(entrante.reintentar_despues)
+        self.assertEqual(CarritoItem.objects.count(), 0)
+
+        # Espera su turno; al vencerse se vuelve a tomar y ya sale
+        self.assertFalse(pedidos.procesar_siguiente())
+        PedidoEntrante.objects.update(reintentar_despues=None)
+        self.assertTrue(pedidos.procesar_siguiente())
+        entrante.refresh_from_db()
+        self.assertEqual(entrante.estatus, "completado")
+
+    @override_settings(PEDIDOS_ENTRANTES_MAX_INTENTOS=1)
+    def test_agotar_intentos_devuelve_el_carrito(self):
+        entrante = self.encolar()
+        with mock.patch("menu.pedidos.crear_pedido", side_effect=OperationalError("caída")), \
+                self.assertLogs("menu.pedidos", "ERROR"):
+            pedidos.procesar_siguiente()
+
+        entrante.refresh_from_db()
+        self.assertEqual(entrante.estatus, "error")
+        self.assertEqual(list(CarritoItem.objects.values_list("producto_id", "cantidad")), [(self.taco.id, 2)])
+
+    def test_error_de_datos_es_definitivo(self):
+        entrante = self.encolar()
+        with mock.patch("menu.pedidos.crear_pedido", side_effect=ValidationError("mesa inválida")):
+            pedidos.procesar_siguiente()
+
+        entrante.refresh_from_db()
+        self.assertEqual((entrante.estatus, entrante.intentos), ("error", 0))
+        self.assertEqual(CarritoItem.objects.count(), 1)
+
+
+# ============================================================
+# EVENTOS
+# ============================================================
+class CursorEventosTest(TestCase):
+
+    def evento(self, id):
+        return {"id": id, "pedido_id": id, "cliente_id": 1, "estatus": "listo", "fecha": None}
+
+    def test_id_confirmado_tarde_no_se_pierde(self):
+        cursor = eventos.CursorEventos(0, retraso=5)
+
+        # Se confirma el 2 antes que el 1
+        self.assertEqual(cursor.filtrar(0, [self.evento(2)], 2), [self.evento(2)])
+        self.assertEqual(cursor.piso, 0)
+
+        # Al confirmarse el 1 se entrega una sola vez y el 2 no se repite
+        self.assertEqual(cursor.filtrar(1, [self.evento(1), self.evento(2)], 2), [self.evento(1)])
+        self.assertEqual(cursor.filtrar(2, [self.evento(1), self.evento(2)], 2), [])
+
+        # Pasado el retraso el piso alcanza al último id visto
+        cursor.filtrar(6, [self.evento(1), self.evento(2)], 3)
+        self.assertEqual(cursor.piso, 2)
+
+    @mock.patch("menu.eventos.connection")  # close() rompería la transacción de la prueba
+    def test_arranque_deja_el_piso_atras(self, _connection):
+        usuario = User.objects.create_user("c@c.com", "c@c.com", "pw")
+        pedido = Pedido.objects.create(cliente=usuario, total=0)
+        viejo, tarde, nuevo = [
+            EventoPedido.objects.create(pedido=pedido, cliente=usuario, estatus="activo") for _ in range(3)
+        ]
+        EventoPedido.objects.filter(id=viejo.id).update(fecha=timezone.now() - timedelta(minutes=1))
+
+        cursor = eventos.CursorEventos(eventos.piso_inicial(5), retraso=5)
+        self.assertEqual(cursor.piso, viejo.id)
+
+        # Primera lectura (sin entregar): `tarde` todavía no confirmaba
+        nuevos, ultimo = eventos.leer_eventos(cursor.piso, [usuario.id])
+        cursor.filtrar(0, [d for d in nuevos if d["id"] != tarde.id], ultimo)
+
+        # Al confirmarse se entrega; lo que ya estaba al arrancar no
+        nuevos, ultimo = eventos.leer_eventos(cursor.piso, [usuario.id])
+        self.assertEqual([d["id"] for d in cursor.filtrar(1, nuevos, ultimo)], [tarde.id])
+
+
+@override_settings(EVENTOS_BACKEND="memoria")
+class EsperaEventosTest(TransactionTestCase):
+    """
+    Vistas async. Leen la BD desde otros hilos, así que los datos
+    tienen que estar confirmados (TransactionTestCase).
+    """
+
+    def setUp(self):
+        self.usuario = User.objects.create_user("a@a.com", "a@a.com", "pw")
+        self.token = ApiToken.objects.create(user=self.usuario).key
+        self.pedido = Pedido.objects.create(cliente=self.usuario, total=20)
+
+    def tearDown(self):
+        self.assertFalse(eventos.hub._suscriptores)  # toda espera se dio de baja
+
+    def get(self, url, params=None, headers=None):
+        # Los headers van por request: AsyncClient(headers=...) los pasa como "Http-..."
+        return AsyncClient().get(url, params, headers={"Authorization": "Token " + self.token, **(headers or {})})
+
+    def esperar(self, pedido_id=None, **params):
+        return self.get(f"/api/pedidos/{pedido_id or self.pedido.id}/esperar/", params)
+
+    async def test_responde_si_ya_cambio(self):
+        r = await self.esperar(estatus="listo", timeout=30)
+        self.assertEqual(r.json(), {"id": self.pedido.id, "estatus": "activo", "cambio": True})
+
+    async def test_despierta_con_el_cambio(self):
+        espera = asyncio.ensure_future(self.esperar(estatus="activo", timeout=30))
+        while self.usuario.id not in eventos.hub._suscriptores and not espera.done():
+            await asyncio.sleep(0.01)
+
+        self.pedido.estatus = "listo"
+        await sync_to_async(self.pedido.save)()
+
+        r = await asyncio.wait_for(espera, 5)  # sin esperar los 30 s
+        self.assertEqual(r.json(), {"id": self.pedido.id, "estatus": "listo", "cambio": True})
+
+    async def test_timeout_sin_cambio(self):
+        r = await self.esperar(estatus="activo", timeout=1)
+        self.assertEqual(r.json(), {"id": self.pedido.id, "estatus": "activo", "cambio": False})
+
+    async def test_pedido_de_otro_cliente(self):
+        otro = await sync_to_async(User.objects.create_user)("b@b.com", "b@b.com", "pw")
+        ajeno = await sync_to_async(Pedido.objects.create)(cliente=otro, total=20)
+
+        r = await self.esperar(ajeno.id, estatus="activo", timeout=1)
+        self.assertEqual(r.status_code, 404)
+
+    def evento_sse(self, chunk):
+        """{"id", "estatus", ...} de un evento "estatus" del stream."""
+        lineas = dict(linea.split(": ", 1) for linea in chunk.decode().strip().split("\n"))
+        self.assertEqual(lineas["event"], "estatus")
+        return json.loads(lineas["data"])
+
+    async def test_stream_manda_el_cambio(self):
+        r = await self.get("/api/pedidos/eventos/")
+        self.assertEqual(r["Content-Type"], "text/event-stream")
+        stream = r.streaming_content
+        self.assertEqual(await anext(stream), b"retry: 3000\n\n")
+
+        siguiente = asyncio.ensure_future(anext(stream))  # aquí se suscribe
+        while self.usuario.id not in eventos.hub._suscriptores:
+            await asyncio.sleep(0.01)
+        self.pedido.estatus = "listo"
+        await sync_to_async(self.pedido.save)()
+
+        datos = self.evento_sse(await asyncio.wait_for(siguiente, 5))
+        self.assertEqual((datos["pedido_id"], datos["estatus"]), (self.pedido.id, "listo"))
+        await stream.aclose()
+
+    async def test_stream_reenvia_desde_last_event_id(self):
+        visto, perdido = [
+            await sync_to_async(EventoPedido.objects.create)(pedido=self.pedido, cliente=self.usuario, estatus=estatus)
+            for estatus in ("activo", "listo")
+        ]
+
+        r = await self.get("/api/pedidos/eventos/", headers={"Last-Event-ID": str(visto.id)})
+        stream = r.streaming_content
+        await anext(stream)  # retry
+
+        chunk = await asyncio.wait_for(anext(stream), 5)
+        self.assertTrue(chunk.startswith(f"id: {perdido.id}\n".encode()))
+        self.assertEqual(self.evento_sse(chunk)["estatus"], "listo")
+        await stream.aclose()
+
+
+# ============================================================
+# ARCHIVO DE PEDIDOS
+# ============================================================
+class ArchivoTest(BaseMenuTest):
+
+    def test_archivar_y_leer(self):
+        viejo = self.pedido_nuevo(self.taco, 2)
+        vigente = self.pedido_nuevo(self.agua)
+        self.assertEqual(len(archivo.lista_de_cliente(self.usuario)), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            viejo.estatus = "entregado"
+            viejo.save()
+        Pedido.objects.filter(id=viejo.id).update(fecha=viejo.fecha - timedelta(days=100))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(archivo.archivar_pedidos(dias=90), 1)
+
+        archivado = archivo.buscar_pedido(viejo.id, cliente=self.usuario)
+        self.assertIsInstance(archivado, PedidoArchivado)
+        self.assertEqual(list(archivado.detalles.values_list("producto_id", "cantidad")), [(self.taco.id, 2)])
+        self.assertEqual(
+            [p["id"] for p in archivo.lista_de_cliente(self.usuario)],
+            [vigente.id, viejo.id],
+        )
+        self.assertEqual(self.cola().pedidos_activos, 1)
+
+
+class ListaPedidosCacheTest(BaseMenuTest):
+    """La versión se sube en on_commit: sin ejecutar esos callbacks no se invalidaría."""
+
+    def estatus_en_api(self):
+        return [p["estatus"] for p in self.api.get("/api/pedidos/").json()]
+
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pedido = self.pedido_nuevo()
+        self.assertEqual(self.estatus_en_api(), ["activo"])
+
+    def test_sin_subir_version_sale_de_la_cache(self):
+        Pedido.objects.filter(id=self.pedido.id).update(estatus="listo")
+        self.assertEqual(self.estatus_en_api(), ["activo"])
+
+    def test_guardar_estatus_invalida(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pedido.estatus = "listo"
+            cocina.guardar_estatus(self.pedido, "activo", version=self.pedido.version)
+        self.assertEqual(self.estatus_en_api(), ["listo"])
+
+    def test_cambio_masivo_invalida(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            cocina.cambiar_estatus_masivo([self.pedido.id], "activo", "listo")
+        self.assertEqual(self.estatus_en_api(), ["listo"])
+
+
+# ============================================================
+# ACUMULADOS DE VENTAS
+# ============================================================
+class VentasTest(BaseMenuTest):
+
+    def acumulados(self):
+        return (
+            sorted(VentaDiaria.objects.values_list("fecha", "producto_id", "metodo_pago", "pedidos", "cantidad", "ingresos")),
+            sorted(ResumenDiario.objects.values_list("fecha", "metodo_pago", "pedidos", "articulos", "ingresos")),
+        )
+
+    def test_dia_local_del_pedido(self):
+        pedido = self.pedido_nuevo(self.taco, 2)
+        # 05:00 UTC son las 22:00 del día anterior en Hermosillo
+        Pedido.objects.filter(id=pedido.id).update(fecha=datetime(2026, 3, 10, 5, 0, tzinfo=dt_timezone.utc))
+        cocina.cambiar_estatus_masivo([pedido.id], "activo", "entregado")
+
+        venta = VentaDiaria.objects.get()
+        self.assertEqual((venta.fecha, venta.pedidos, venta.cantidad, venta.ingresos), (date(2026, 3, 9), 1, 2, 40))
+
+    def test_acumulados_igual_a_reconstruir(self):
+        primero = self.pedido_nuevo(self.taco, 2)
+        self.agregar(self.taco)
+        self.agregar(self.agua)
+        segundo = Pedido.objects.get(id=self.pagar().json()["pedido_id"])
+        self.pedido_nuevo(self.agua)  # sigue activo: no cuenta
+
+        primero.estatus = "entregado"
+        primero.save()
+        cocina.cambiar_estatus_masivo([segundo.id], "activo", "listo")
+        cocina.cambiar_estatus_masivo([segundo.id], "listo", "entregado")
+
+        en_linea = self.acumulados()
+        self.assertEqual(ResumenDiario.objects.get().pedidos, 2)
+        self.assertEqual(VentaDiaria.objects.get(producto=self.taco).pedidos, 2)
+
+        reportes.reconstruir_ventas()
+        self.assertEqual(self.acumulados(), en_linea)
+
+    @mock.patch.object(reportes, "RECONSTRUIR_BLOQUE", 2)
+    def test_reconstruir_por_bloques_con_archivados(self):
+        entregados = [self.pedido_nuevo(self.taco, 2) for _ in range(4)]
+        Pedido.objects.filter(id=entregados[0].id).update(fecha=timezone.now() - timedelta(days=100))
+        cocina.cambiar_estatus_masivo([p.id for p in entregados], "activo", "entregado")
+        self.assertEqual(archivo.archivar_pedidos(dias=90), 1)
+        en_linea = self.acumulados()
+
+        self.assertEqual(reportes.reconstruir_ventas(), (2, 2))  # dos días
+        self.assertEqual(self.acumulados(), en_linea)
+        self.assertEqual(VentaDiaria.objects.aggregate(n=Sum("pedidos"))["n"], 4)
+
+
+class ExportacionTest(BaseMenuTest):
+
+    def test_bloques_por_llave(self):
+        ids = [self.pedido_nuevo().id for _ in range(5)]
+
+        with self.assertNumQueries(3):
+            leidos = [fila[0] for fila in reportes._por_bloques(Pedido.objects.all(), "total", bloque=2)]
+        self.assertEqual(leidos, ids)
+
+    def test_filas_pedidos_y_detalles(self):
+        entregado = self.pedido_nuevo(self.taco, 2)
+        self.pedido_nuevo(self.agua)  # activo: no sale
+        entregado.estatus = "entregado"
+        entregado.save()
+
+        pedidos_csv = list(reportes.filas_pedidos())
+        detalles_csv = list(reportes.filas_detalles())
+        self.assertEqual([(f[0], f[4], f[5]) for f in pedidos_csv], [(entregado.id, 2, 40)])
+        self.assertEqual([(f[0], f[2], f[6]) for f in detalles_csv], [(entregado.id, "Taco", 40)])
+
+
+# ============================================================
+# SE PIDE JUNTO CON
+# ============================================================
+class CoocurrenciaTest(BaseMenuTest):
+
+    def test_pares_del_bloque(self):
+        import numpy as np
+
+        renglones = np.array([[1, 5], [1, 3], [1, 5], [2, 3], [3, 9], [3, 3], [3, 5]], dtype=np.int64)
+        esperado = Counter()
+        for pedido in ({3, 5}, {3}, {3, 5, 9}):
+            esperado.update(recomendaciones._pares(pedido))
+
+        self.assertEqual(recomendaciones._pares_del_bloque(renglones), dict(esperado))
+
+    def test_reconstruir_igual_a_sumar(self):
+        refresco = Producto.objects.create(categoria=self.categoria, nombre="Refresco", precio=18)
+        for productos in ((self.taco, self.agua), (self.taco, self.agua, refresco), (self.taco,)):
+            for producto in productos:
+                self.agregar(producto)
+            pedido = Pedido.objects.get(id=self.pagar().json()["pedido_id"])
+            cocina.cambiar_estatus_masivo([pedido.id], "activo", "entregado")
+
+        en_linea = sorted(CoocurrenciaProducto.objects.values_list("producto_a_id", "producto_b_id", "pedidos"))
+        self.assertIn((self.taco.id, self.taco.id, 3), en_linea)
+
+        recomendaciones.reconstruir_coocurrencia(bloque=2)
+        self.assertEqual(
+            sorted(CoocurrenciaProducto.objects.values_list("producto_a_id", "producto_b_id", "pedidos")),
+            en_linea,
+        )
+
+
+# ============================================================
+# CONTADORES DEL DASHBOARD
+# ============================================================
+class ContadoresTest(BaseMenuTest):
+
+    def test_ingresos_al_entregar(self):
+        hoy = timezone.localdate()
+        claves = ["pedidos", contadores.clave_dia("pedidos_dia", hoy), contadores.clave_dia("ingresos_dia", hoy)]
+
+        uno = self.pedido_nuevo(self.taco, 2)
+        dos = self.pedido_nuevo(self.agua)
+        self.pedido_nuevo(self.agua)  # sigue activo
+        self.assertEqual(list(contadores.leer(claves).values()), [3, 3, 0])
+
+        uno.estatus = "entregado"
+        uno.save()
+        cocina.cambiar_estatus_masivo([dos.id], "activo", "entregado")
+        en_linea = contadores.leer(claves)
+        self.assertEqual(list(en_linea.values()), [3, 3, 55])
+
+        contadores.recalcular()
+        self.assertEqual(contadores.leer(claves), en_linea)
+
+
+# ============================================================
+# VERSIONES DE CACHÉ
+# ============================================================
+class VersionesTest(TestCase):
+
+    def setUp(self):
+        versiones._memo.clear()
+
+    def test_subir_y_leer(self):
+        self.assertEqual(versiones.version(versiones.MENU, intervalo=0), 0)
+        versiones.subir(versiones.MENU)
+        versiones.subir(versiones.MENU)
+        self.assertEqual(versiones.version(versiones.MENU, intervalo=0), 2)
+
+    @mock.patch.object(versiones, "VERSIONES_EN_MEMORIA", 3)
+    def test_memo_limitado(self):
+        for cliente_id in range(10):
+            versiones.version(versiones.pedidos_de(cliente_id))
+        self.assertLessEqual(len(versiones._memo), 3)
+
+
+# ============================================================
+# PANEL: PRODUCTOS
+# ============================================================
+class ProductoListaTest(PanelTest):
+
+    def test_lista_con_y_sin_imagen(self):
+        Producto.objects.filter(id=self.taco.id).update(imagen="productos/taco.jpg")
+        r = self.panel.get("/admin_panel/productos/")
+
+        self.assertEqual(r.status_code, 200)
+        self.assertContains(r, "/media/productos/taco.jpg")
+        self.assertContains(r, "Agua")
+
+
+class PedidoListaTest(PanelTest):
+
+    def test_cursor_desempata_por_id(self):
+        for _ in range(5):
+            self.pedido_nuevo()
+        Pedido.objects.update(fecha=timezone.now())  # misma fecha: el id decide el orden
+
+        vistos = []
+        siguiente = ""
+        with mock.patch("menu.views_admin.PEDIDOS_POR_PAGINA", 2):
+            while siguiente is not None:
+                r = self.panel.get("/admin_panel/pedidos/" + siguiente)
+                vistos += [pedido.id for pedido in r.context["pedidos"]]
+                siguiente = r.context["siguiente_url"]
+
+        self.assertEqual(vistos, list(Pedido.objects.order_by("-id").values_list("id", flat=True)))
+
+    def test_cursor_invalido_muestra_la_primera(self):
+        self.pedido_nuevo()
+        r = self.panel.get("/admin_panel/pedidos/", {"despues": "basura"})
+
+        self.assertEqual(r.status_code, 200)
+        self.assertTrue(r.context["es_primera"])
+        self.assertEqual(len(r.context["pedidos"]), 1)
+
+
+class ClienteListaTest(PanelTest):
+
+    def test_cursor_recorre_todos_sin_repetir(self):
+        for i in range(4):
+            User.objects.create_user(f"cliente{i}", password="x")
+
+        vistos = []
+        siguiente = ""
+        with mock.patch("menu.views_admin.CLIENTES_POR_PAGINA", 2):
+            while siguiente is not None:
+                r = self.panel.get("/admin_panel/clientes/" + siguiente)
+                vistos += [cliente.id for cliente in r.context["clientes"]]
+                siguiente = r.context["siguiente_url"]
+
+        esperados = list(User.objects.filter(is_staff=False).order_by("-id").values_list("id", flat=True))
+        self.assertEqual(vistos, esperados)
+
+    def test_cursor_conserva_la_busqueda(self):
+        for i in range(3):
+            User.objects.create_user(f"ana{i}", password="x")
+        User.objects.create_user("beto", password="x")
+
+        with mock.patch("menu.views_admin.CLIENTES_POR_PAGINA", 2):
+            r = self.panel.get("/admin_panel/clientes/", {"q": "ana"})
+            self.assertIn("q=ana", r.context["siguiente_url"])
+            r = self.panel.get("/admin_panel/clientes/" + r.context["siguiente_url"])
+
+        self.assertEqual([c.username for c in r.context["clientes"]], ["ana0"])
+        self.assertIsNone(r.context["siguiente_url"])
+
+
+class ImportacionTest(PanelTest):
+
+    def importar(self, texto, zip_imagenes=None):
+        datos = {"archivo": SimpleUploadedFile("productos.csv", texto.encode("utf-8"), "text/csv")}
+        if zip_imagenes is not None:
+            datos["imagenes"] = SimpleUploadedFile("imagenes.zip", zip_imagenes, "application/zip")
+        return self.panel.post("/admin_panel/productos/importar/", datos)
+
+    def test_crea_y_actualiza(self):
+        r = self.importar(
+            "categoria,nombre,precio\n"
+            " tacos ,TACO,22\n"          # misma categoría y producto, otra forma de escribirlos
+            "Bebidas,Horchata,18\n"
+            "bebidas,Jamaica,$18.50\n"
+        )
+        self.assertRedirects(r, "/admin_panel/productos/", fetch_redirect_response=False)
+
+        self.taco.refresh_from_db()
+        self.assertEqual((self.taco.precio, self.taco.categoria_id), (22, self.categoria.id))
+        self.assertEqual(Categoria.objects.count(), 2)
+        self.assertEqual(
+            sorted(Producto.objects.filter(categoria__nombre="Bebidas").values_list("nombre", "precio")),
+            [("Horchata", 18), ("Jamaica", Decimal("18.50"))],
+        )
+
+    def test_errores_no_guardan_nada(self):
+        r = self.importar(
+            "categoria,nombre,precio,id\n"
+            "Tacos,Taco al pastor,25,%d\n"
+            "Tacos,Taco,21,\n"           # es el mismo producto que la fila anterior (por nombre)
+            "Tacos,Gringa,abc,\n" % self.taco.id
+        )
+        self.assertEqual(r.status_code, 200)
+        self.assertContains(r, "Fila 3: es el producto con id %d" % self.taco.id)
+        self.assertContains(r, "Fila 4: precio inválido.")
+        self.taco.refresh_from_db()
+        self.assertEqual((self.taco.nombre, self.taco.precio), ("Taco", 20))
+
+    def test_zip_temporal_se_borra_si_algo_falla(self):
+        contenido = io.BytesIO()
+        with zipfile.ZipFile(contenido, "w") as zf:
+            zf.writestr("taco.jpg", b"no es imagen")
+
+        antes = set(os.listdir(tempfile.gettempdir()))
+        with mock.patch("menu.importacion.importar", side_effect=RuntimeError("BD caída")):
+            with self.assertRaises(RuntimeError):
+                self.importar("categoria,nombre,precio,imagen\nTacos,Taco,20,taco.jpg\n", contenido.getvalue())
+
+        nuevos = set(os.listdir(tempfile.gettempdir())) - antes
+        self.assertFalse([n for n in nuevos if n.endswith(".zip")])
+
+
+class CatalogoTest(PanelTest):
+
+    def precios(self):
+        return dict(Producto.objects.values_list("nombre", "precio"))
+
+    def test_porcentaje_redondea_a_centavos(self):
+        Producto.objects.filter(id=self.agua.id).update(precio=Decimal("15.55"))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(catalogo.ajustar_precios("porcentaje", Decimal("10")), 2)
+
+        self.assertEqual(self.precios(), {"Taco": Decimal("22.00"), "Agua": Decimal("17.11")})
+        self.assertEqual(versiones.version(versiones.MENU, intervalo=0), 1)
+
+    def test_monto_por_categoria_sin_bajar_de_cero(self):
+        bebidas = Categoria.objects.create(nombre="Bebidas")
+        Producto.objects.filter(id=self.agua.id).update(categoria=bebidas)
+
+        catalogo.ajustar_precios("monto", Decimal("-20"), bebidas)
+
+        self.assertEqual(self.precios(), {"Taco": Decimal("20.00"), "Agua": Decimal("0.00")})
+
+    def test_no_pasa_del_maximo(self):
+        catalogo.ajustar_precios("monto", importacion.PRECIO_MAXIMO)
+        self.assertEqual(set(self.precios().values()), {importacion.PRECIO_MAXIMO})
+
+    def test_cambiar_estado_solo_cuenta_los_que_cambian(self):
+        Producto.objects.filter(id=self.agua.id).update(estado="agotado")
+
+        self.assertEqual(catalogo.cambiar_estado([self.taco.id, self.agua.id], "agotado"), 1)
+        self.assertEqual(Producto.objects.filter(estado="agotado").count(), 2)
+        with self.assertRaises(ValueError):
+            catalogo.cambiar_estado([self.taco.id], "borrado")
+
+    def test_vista_ajusta_precios(self):
+        r = self.panel.post("/admin_panel/productos/precios/", {"tipo": "monto", "valor": "5", "volver": "q=ta"})
+
+        self.assertRedirects(r, "/admin_panel/productos/?q=ta", fetch_redirect_response=False)
+        self.assertEqual(self.precios(), {"Taco": Decimal("25.00"), "Agua": Decimal("20.00")})
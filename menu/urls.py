@@ -43,6 +43,9 @@ urlpatterns = [
     # CRUD Productos
     path('admin_panel/productos/', views_admin.producto_lista, name="producto_lista"),
     path('admin_panel/productos/agregar/', views_admin.producto_agregar, name="producto_agregar"),
+    path('admin_panel/productos/importar/', views_admin.producto_importar, name="producto_importar"),
+    path('admin_panel/productos/precios/', views_admin.productos_ajustar_precios, name="productos_ajustar_precios"),
+    path('admin_panel/productos/estado/', views_admin.productos_cambiar_estado, name="productos_cambiar_estado"),
     path('admin_panel/productos/editar/<int:producto_id>/', views_admin.producto_editar, name="producto_editar"),
     path('admin_panel/productos/eliminar/<int:producto_id>/', views_admin.producto_eliminar, name="producto_eliminar"),
 
@@ -60,8 +63,16 @@ urlpatterns = [
     path('admin_panel/pedidos/', views_admin.pedido_lista, name="pedido_lista"),
     path('admin_panel/pedidos/<int:pedido_id>/', views_admin.pedido_detalle, name="pedido_detalle"),
 
+    # Cocina
+    path('admin_panel/cocina/', views_admin.cocina_tablero, name="cocina_tablero"),
+    path('admin_panel/cocina/datos/', views_admin.cocina_tablero_datos, name="cocina_tablero_datos"),
+    path('admin_panel/cocina/estatus/', views_admin.pedidos_cambiar_estatus, name="pedidos_cambiar_estatus"),
+
     # Reportes y perfil admin
     path('admin_panel/reportes/ventas/', views_admin.reporte_ventas, name="reporte_ventas"),
+    path('admin_panel/reportes/ventas/csv/', views_admin.reporte_ventas_csv, name="reporte_ventas_csv"),
+    path('admin_panel/reportes/pedidos/csv/', views_admin.exportar_pedidos_csv, name="exportar_pedidos_csv"),
+    path('admin_panel/reportes/detalles/csv/', views_admin.exportar_detalles_csv, name="exportar_detalles_csv"),
     path('admin_panel/perfil/', views_admin.perfil_admin, name="perfil_admin"),
 
     # Mesas
@@ -89,10 +100,13 @@ urlpatterns = [
 
     # Pago (API)
     path('api/pago/confirmar/', views_api.api_confirmar_pago),
+    path('api/pago/entrante/<int:entrante_id>/', views_api.api_pedido_entrante),
 
     # Pedidos (API)
     path('api/pedidos/', views_api.api_pedidos),
+    path('api/pedidos/eventos/', views_api.api_pedidos_eventos),
     path('api/pedidos/<int:pedido_id>/', views_api.api_pedido_detalle),
+    path('api/pedidos/<int:pedido_id>/esperar/', views_api.api_pedido_esperar),
     path("api/registro/", views_api.api_registro), 
     
 ]
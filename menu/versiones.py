@@ -0,0 +1,102 @@
+# ============================================================
+# versiones.py
+# Números de versión para invalidar lo que se guarda en caché,
+# también entre procesos (varios workers de gunicorn).
+#
+# Cada dato cacheado lleva la versión de lo que depende (p. ej. la
+# del menú); al cambiar esos datos se sube la versión y las copias
+# viejas simplemente dejan de usarse. Así no hay que borrar llaves
+# una por una ni avisar a los otros procesos.
+#
+# Las versiones viven en la tabla VersionCache. Cada proceso las
+# recuerda en memoria y las vuelve a leer como mucho una vez por
+# request (por nombre) o cada VERSIONES_INTERVALO_SEGUNDOS:
+#
+#   MENU: categorías y productos (inicio del cliente, sugerencias)
+#   TOKENS: tokens de la API y sus usuarios (api_utils.py)
+#   RECOMENDACIONES: tabla "se pide junto con" (recomendaciones.py)
+#   ETA: modelo de tiempos de preparación (cocina.py)
+#   pedidos_de(cliente_id): historial de pedidos de un cliente
+# ============================================================
+
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+
+from .acumulados import sumar_acumulado
+from .models import VersionCache
+
+MENU = "menu"
+TOKENS = "tokens"
+RECOMENDACIONES = "recomendaciones"
+ETA = "eta"
+
+# {nombre: (version, leido_monotonic, request)} de este proceso. Hay
+# una llave por cliente (pedidos_de): al pasar de VERSIONES_EN_MEMORIA
+# se vacía y cada versión se vuelve a leer la siguiente vez.
+_memo = {}
+_local = threading.local()
+VERSIONES_EN_MEMORIA = 10000
+
+
+def pedidos_de(cliente_id):
+    """Nombre de la versión del historial de pedidos de un cliente."""
+    return f"pedidos:{cliente_id}"
+
+
+# ============================================================
+# REQUESTS (conectadas en signals.py)
+# ============================================================
+def inicio_request(**kwargs):
+    """Abre una ventana en la que cada versión se lee una sola vez."""
+    _local.request = object()
+
+
+def fin_request(**kwargs):
+    _local.request = None
+
+
+# ============================================================
+# LEER / SUBIR
+# ============================================================
+def version(nombre, intervalo=None):
+    """
+    Versión actual de `nombre` (0 si nunca se ha subido).
+
+    Se reutiliza la leída en este mismo request, o la leída hace menos
+    de `intervalo` segundos (por omisión VERSIONES_INTERVALO_SEGUNDOS;
+    0 = leerla en cada request, para datos que el propio usuario acaba
+    de cambiar).
+    """
+    if intervalo is None:
+        intervalo = getattr(settings, "VERSIONES_INTERVALO_SEGUNDOS", 2)
+
+    request = getattr(_local, "request", None)
+    guardada = _memo.get(nombre)
+    if guardada is not None:
+        valor, leido, leido_en = guardada
+        if (request is not None and leido_en is request) or time.monotonic() - leido < intervalo:
+            return valor
+
+    valor = VersionCache.objects.filter(nombre=nombre).values_list("version", flat=True).first() or 0
+    if len(_memo) >= VERSIONES_EN_MEMORIA:
+        _memo.clear()
+    _memo[nombre] = (valor, time.monotonic(), request)
+    return valor
+
+
+def subir(nombre):
+    """Sube la versión de `nombre`: lo cacheado con la anterior ya no se usa."""
+    sumar_acumulado(VersionCache, {"nombre": nombre}, {"version": 1})
+    _memo.pop(nombre, None)
+
+
+def subir_al_confirmar(*nombres):
+    """
+    Sube las versiones al confirmarse la transacción actual (o ya, si no
+    hay). Antes del commit otro request podría cachear los datos viejos
+    con la versión nueva.
+    """
+    transaction.on_commit(lambda: [subir(nombre) for nombre in nombres])
@@ -4,8 +4,9 @@
 # ============================
 # DJANGO CORE IMPORTS
 # ============================
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 
 # ============================
@@ -21,6 +22,8 @@ from django.contrib.auth import login as django_login  # alias para evitar confl
 # BASE DE DATOS
 # ============================
 from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
 
 # ============================
 # PROYECTO LOCAL
@@ -29,11 +32,13 @@ from .forms import FormLogin, FormRegistro
 from .models import (
     Producto,
     Categoria,
-    Pedido,
-    PedidoDetalle,
     Mesa,
     ApiToken,
 )
+from .pedidos import crear_pedido
+from . import archivo
+from . import versiones
+from .cocina import CocinaLlena
 
 # ============================
 # PYTHON NATIVO
@@ -139,23 +144,42 @@ def logout_view(request):
 # ======================================
 @login_required
 def cliente_dashboard(request):
-    categorias = Categoria.objects.all()
-    data_categorias = []
-
-    for cat in categorias:
-        productos = Producto.objects.filter(
-            categoria=cat,
-            estado="activo"
-        )[:3]  # Mostrar solo los primeros 3
-
-        data_categorias.append({
-            "categoria": cat,
-            "productos": productos
-        })
+    # ?orden=popular -> los más pedidos de cada categoría (ranking precalculado)
+    orden_popular = request.GET.get("orden") == "popular"
+
+    def data_categorias():
+        """
+        Primeros 3 productos activos de cada categoría: una consulta con
+        ROW_NUMBER() por categoría y otra para las categorías.
+        Solo se llama si la sección no está en caché (ver home.html).
+        """
+        if orden_popular:
+            orden = [F("popularidad__rango_categoria_30d").asc(nulls_last=True), F("nombre").asc()]
+        else:
+            orden = [F("id").asc()]
+
+        productos = (
+            Producto.objects
+            .filter(estado="activo")
+            .annotate(posicion=Window(RowNumber(), partition_by=F("categoria_id"), order_by=orden))
+            .filter(posicion__lte=3)  # Mostrar solo los primeros 3
+            .order_by("categoria_id", "posicion")
+        )
+
+        por_categoria = {}
+        for producto in productos:
+            por_categoria.setdefault(producto.categoria_id, []).append(producto)
+
+        return [
+            {"categoria": cat, "productos": por_categoria.get(cat.id, [])}
+            for cat in Categoria.objects.all()
+        ]
 
     return render(request, "menu/cliente/home.html", {
         "data_categorias": data_categorias,
-        "categorias": categorias
+        "orden_popular": orden_popular,
+        "version_menu": versiones.version(versiones.MENU),
+        "menu_cache_segundos": getattr(settings, "MENU_CACHE_SEGUNDOS", 3600),
     })
 
 
@@ -296,37 +320,35 @@ def confirmar_pedido(request):
             messages.error(request, "Tu carrito está vacío.")
             return redirect("cliente_dashboard")
 
-        total = 0
+        # --- Crear pedido (detalles, cola de cocina e historial) ---
+        lineas = []
         for product_id, data in cart.items():
             producto = Producto.objects.get(id=product_id)
-            total += producto.precio * data["cantidad"]
-
-        # --- Crear pedido ---
-        pedido = Pedido.objects.create(
-            cliente=request.user,
-            total=total,
-            estatus="activo",
-            metodo_pago="tarjeta" if not request.POST.get("pagar_sucursal") else "sucursal",
-        )
-
-        # --- Crear detalles ---
-        for product_id, data in cart.items():
-            producto = Producto.objects.get(id=product_id)
-            PedidoDetalle.objects.create(
-                pedido=pedido,
-                producto=producto,
-                cantidad=data["cantidad"],
-                precio_unitario=producto.precio,
+            lineas.append({
+                "producto_id": producto.id,
+                "cantidad": data["cantidad"],
+                "precio_unitario": str(producto.precio),
+                "nota": None,
+            })
+
+        try:
+            pedido = crear_pedido(
+                request.user,
+                lineas,
+                "tarjeta" if not request.POST.get("pagar_sucursal") else "sucursal",
+                mesa,
             )
+        except CocinaLlena as e:
+            # No se crea nada (tampoco se ocupa la mesa) y el carrito se conserva
+            transaction.set_rollback(True)
+            messages.error(request, f"{e} Intenta de nuevo en unos {e.reintentar_en} minutos.")
+            return redirect("carrito")
+        tiempo_estimado = pedido.tiempo_estimado
 
         # --- Limpiar carrito ---
         request.session["cart"] = {}
         request.session.modified = True
 
-        # --- Calcular tiempo estimado ---
-        pedidos_activos = Pedido.objects.filter(estatus="activo").count()
-        tiempo_estimado = 20 + (pedidos_activos * 10)
-
         # --- Mensaje de éxito ---
         messages.success(
             request,
@@ -383,7 +405,8 @@ def perfil_cliente(request):
 # ======================================
 @login_required
 def compras_cliente(request):
-    pedidos = Pedido.objects.filter(cliente=request.user).order_by("-fecha")
+    # Incluye los pedidos ya archivados (lista en caché por cliente)
+    pedidos = archivo.lista_de_cliente(request.user)
     return render(request, "menu/cliente/compras.html", {"pedidos": pedidos})
 
 
@@ -413,8 +436,11 @@ def carrito_items_count(request):
 # ======================================
 @login_required
 def pedido_detalle(request, pedido_id):
-    pedido = get_object_or_404(Pedido, id=pedido_id, cliente=request.user)
-    detalles = PedidoDetalle.objects.filter(pedido=pedido)
+    # Puede estar en Pedido o en el archivo
+    pedido = archivo.buscar_pedido(pedido_id, cliente=request.user)
+    if pedido is None:
+        raise Http404("Pedido no encontrado")
+    detalles = pedido.detalles.select_related("producto")
 
     return render(request, "menu/cliente/pedido_detalle.html", {
         "pedido": pedido,
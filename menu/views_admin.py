@@ -5,12 +5,30 @@
 # ============================================================
 
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth.decorators import user_passes_test
 from django.contrib import messages
 from django.contrib.auth.models import User
 
-from .models import Producto, Categoria, Pedido, Mesa
-from .forms import FormProducto, FormCategoria, FormPedidoEstado
+from .models import Producto, Categoria, Pedido, PedidoArchivado, PedidoDetalle, Mesa
+from .forms import (
+    FormProducto, FormCategoria, FormPedidoEstado, FormFiltroPedidos, FormReporteVentas,
+    FormFiltroProductos, FormFiltroClientes, FormImportarProductos, FormAjustePrecios,
+)
+from . import cocina
+from . import catalogo
+from . import contadores
+from . import importacion
+from . import reportes
+from django.db import transaction
+from django.core.paginator import Paginator
+from django.db.models import Count, Prefetch, Q
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from datetime import datetime, timedelta
+import csv
+import json
+import os
 
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.shortcuts import render, redirect
@@ -36,27 +54,121 @@ def admin_required(view_func):
 def admin_home(request):
     """
     Dashboard general del administrador.
-    Muestra conteos de clientes, productos, categorías y pedidos.
+    Muestra conteos de clientes, productos, categorías y pedidos, y los
+    pedidos / ingresos de hoy. Todo sale de la tabla Contador en una
+    sola consulta (ver contadores.py).
     """
-    contexto = {
-        'clientes': User.objects.count(),
-        'productos': Producto.objects.count(),
-        'categorias': Categoria.objects.count(),
-        'pedidos': Pedido.objects.count(),
+    hoy = timezone.localdate()
+    claves = {
+        'clientes': 'clientes',
+        'productos': 'productos',
+        'categorias': 'categorias',
+        'pedidos': 'pedidos',
+        'pedidos_hoy': contadores.clave_dia('pedidos_dia', hoy),
+        'ingresos_hoy': contadores.clave_dia('ingresos_dia', hoy),
     }
+    valores = contadores.leer(list(claves.values()))
+
+    contexto = {nombre: valores[clave] for nombre, clave in claves.items()}
+    for nombre in ('clientes', 'productos', 'categorias', 'pedidos', 'pedidos_hoy'):
+        contexto[nombre] = int(contexto[nombre])
     return render(request, 'menu/admin_panel/home.html', contexto)
 
 
 # ============================================================
 # PRODUCTOS — LISTA
 # ============================================================
+PRODUCTOS_POR_PAGINA = 24
+
+
 @admin_required
 def producto_lista(request):
     """
-    Lista todos los productos registrados en el sistema.
+    Lista los productos por páginas, con búsqueda por nombre y
+    filtros de categoría y estado.
+    """
+    filtros = FormFiltroProductos(request.GET or None)
+    productos = Producto.objects.select_related('categoria').order_by('nombre', 'id')
+
+    if filtros.is_valid():
+        datos = filtros.cleaned_data
+
+        if datos["categoria"]:
+            productos = productos.filter(categoria=datos["categoria"])
+        if datos["estado"]:
+            productos = productos.filter(estado=datos["estado"])
+
+        q = datos["q"].strip()
+        if q:
+            productos = productos.filter(nombre__icontains=q)
+
+    pagina = Paginator(productos, PRODUCTOS_POR_PAGINA).get_page(request.GET.get("page"))
+
+    # Links de paginación conservando los filtros
+    params = request.GET.copy()
+    params.pop("page", None)
+
+    return render(request, 'menu/admin_panel/producto_lista.html', {
+        'productos': pagina,
+        'pagina': pagina,
+        'filtros': filtros,
+        'params': params.urlencode(),
+        'ajuste': FormAjustePrecios(),
+        'estados': Producto.ESTADOS,
+    })
+
+
+# ============================================================
+# PRODUCTOS — CAMBIOS MASIVOS (PRECIOS Y ESTADO)
+# ============================================================
+def _volver_a_lista(request):
+    """Redirige a la lista de productos conservando sus filtros (?...)."""
+    volver = request.POST.get("volver", "")
+    return redirect(f"{reverse('producto_lista')}?{volver}" if volver else 'producto_lista')
+
+
+@admin_required
+def productos_ajustar_precios(request):
+    """
+    Sube o baja los precios de una categoría (o de todas) por
+    porcentaje o monto, con un solo UPDATE (ver catalogo.py).
+    """
+    if request.method != 'POST':
+        return redirect('producto_lista')
+
+    form = FormAjustePrecios(request.POST)
+    if form.is_valid():
+        datos = form.cleaned_data
+        cambiados = catalogo.ajustar_precios(datos["tipo"], datos["valor"], datos["categoria"])
+        messages.success(request, f"Precios actualizados en {cambiados} productos.")
+    else:
+        errores = [e for lista in form.errors.values() for e in lista]
+        messages.error(request, " ".join(errores))
+
+    return _volver_a_lista(request)
+
+
+@admin_required
+def productos_cambiar_estado(request):
     """
-    productos = Producto.objects.all()
-    return render(request, 'menu/admin_panel/producto_lista.html', {'productos': productos})
+    Marca como activos o agotados los productos seleccionados en la
+    lista, con un solo UPDATE (ver catalogo.py).
+    """
+    if request.method != 'POST':
+        return redirect('producto_lista')
+
+    ids = [int(i) for i in request.POST.getlist("ids") if i.isdigit()]
+    estado = request.POST.get("estado")
+
+    if not ids:
+        messages.error(request, "Selecciona al menos un producto.")
+    elif estado not in dict(Producto.ESTADOS):
+        messages.error(request, "Estado inválido.")
+    else:
+        cambiados = catalogo.cambiar_estado(ids, estado)
+        messages.success(request, f"{cambiados} productos marcados como {dict(Producto.ESTADOS)[estado].lower()}.")
+
+    return _volver_a_lista(request)
 
 
 # ============================================================
@@ -85,6 +197,61 @@ def producto_agregar(request):
     })
 
 
+# ============================================================
+# PRODUCTOS — IMPORTAR (CSV + ZIP DE IMÁGENES)
+# ============================================================
+@admin_required
+def producto_importar(request):
+    """
+    Carga masiva de productos desde un CSV (ver importacion.py).
+    Si alguna fila tiene errores no se guarda nada y se listan todos.
+    Las imágenes del zip se procesan en segundo plano.
+    """
+    errores = []
+
+    if request.method == 'POST':
+        form = FormImportarProductos(request.POST, request.FILES)
+        if form.is_valid():
+            ruta_zip = None
+            try:
+                imagenes_zip = None
+                if form.cleaned_data["imagenes"]:
+                    ruta_zip, imagenes_zip = importacion.guardar_zip(form.cleaned_data["imagenes"])
+
+                filas = importacion.validar(importacion.leer_csv(form.cleaned_data["archivo"]), imagenes_zip)
+
+                with transaction.atomic():
+                    resultado = importacion.importar(filas)
+                    if ruta_zip:
+                        importacion.procesar_imagenes(ruta_zip, resultado["imagenes"])
+                ruta_zip = None  # ya confirmado: lo borra procesar_imagenes al terminar
+            except importacion.ErrorImportacion as e:
+                errores = e.errores
+            else:
+                mensaje = (
+                    f"Importación lista: {resultado['creados']} productos nuevos, "
+                    f"{resultado['actualizados']} actualizados"
+                )
+                if resultado["categorias"]:
+                    mensaje += f", {resultado['categorias']} categorías nuevas"
+                if resultado["imagenes"]:
+                    mensaje += f". {len(resultado['imagenes'])} imágenes se están procesando"
+                messages.success(request, mensaje + ".")
+                return redirect('producto_lista')
+            finally:
+                # Error de validación o cualquier otra excepción: el zip temporal sobra
+                if ruta_zip and os.path.exists(ruta_zip):
+                    os.remove(ruta_zip)
+    else:
+        form = FormImportarProductos()
+
+    return render(request, 'menu/admin_panel/producto_importar.html', {
+        'form': form,
+        'errores': errores,
+        'columnas': importacion.COLUMNAS_OBLIGATORIAS,
+    })
+
+
 # ============================================================
 # PRODUCTOS — EDITAR
 # ============================================================
@@ -215,14 +382,63 @@ def categoria_eliminar(request, categoria_id):
 # ============================================================
 # CLIENTES — LISTA
 # ============================================================
+CLIENTES_POR_PAGINA = 30
+
+
 @admin_required
 def cliente_lista(request):
     """
-    Lista todos los clientes registrados.
-    (Solo los que NO son staff.)
+    Lista los clientes registrados (solo los que NO son staff), del más
+    nuevo al más viejo. Se pagina por cursor (?despues=<id>) para no
+    contar ni recorrer toda la tabla, con búsqueda por usuario, nombre
+    o correo.
     """
-    clientes = User.objects.filter(is_staff=False)
-    return render(request, 'menu/admin_panel/cliente_lista.html', {'clientes': clientes})
+    filtros = FormFiltroClientes(request.GET or None)
+    clientes = User.objects.filter(is_staff=False).order_by('-id')
+
+    if filtros.is_valid():
+        q = filtros.cleaned_data["q"].strip()
+        if q:
+            clientes = clientes.filter(
+                Q(username__istartswith=q) | Q(email__istartswith=q)
+                | Q(first_name__istartswith=q) | Q(last_name__istartswith=q)
+            )
+
+    # Página siguiente: clientes con id menor al último que se mostró
+    despues = request.GET.get("despues", "")
+    if despues.isdigit():
+        clientes = clientes.filter(id__lt=int(despues))
+
+    pagina = list(clientes[:CLIENTES_POR_PAGINA + 1])
+    hay_mas = len(pagina) > CLIENTES_POR_PAGINA
+    pagina = pagina[:CLIENTES_POR_PAGINA]
+
+    # Pedidos de los clientes de esta página (vigentes + archivados)
+    ids = [cliente.id for cliente in pagina]
+    conteos = {}
+    for modelo in (Pedido, PedidoArchivado):
+        filas = modelo.objects.filter(cliente_id__in=ids).values("cliente_id").annotate(n=Count("id")).order_by()
+        for fila in filas:
+            conteos[fila["cliente_id"]] = conteos.get(fila["cliente_id"], 0) + fila["n"]
+    for cliente in pagina:
+        cliente.num_pedidos = conteos.get(cliente.id, 0)
+
+    # Links conservando la búsqueda
+    params = request.GET.copy()
+    params.pop("despues", None)
+    primera_url = f"?{params.urlencode()}"
+    siguiente_url = None
+    if hay_mas:
+        params["despues"] = pagina[-1].id
+        siguiente_url = f"?{params.urlencode()}"
+
+    return render(request, 'menu/admin_panel/cliente_lista.html', {
+        'clientes': pagina,
+        'filtros': filtros,
+        'es_primera': not despues.isdigit(),
+        'primera_url': primera_url,
+        'siguiente_url': siguiente_url,
+    })
 
 
 # ============================================================
@@ -246,13 +462,81 @@ def cliente_eliminar(request, cliente_id):
 # ============================================================
 # PEDIDOS — LISTA
 # ============================================================
+PEDIDOS_POR_PAGINA = 30
+
+
+def _inicio_del_dia(dia):
+    """Fecha (date) -> datetime con zona horaria a las 00:00 de ese día."""
+    return timezone.make_aware(datetime.combine(dia, datetime.min.time()))
+
+
+def _cursor_pedido(pedido):
+    """Cursor de paginación: fecha e id del último pedido mostrado."""
+    return f"{pedido.fecha.isoformat()}_{pedido.id}"
+
+
+def _leer_cursor(cursor):
+    """Regresa (fecha, id) o None si el cursor no es válido."""
+    try:
+        fecha, pedido_id = cursor.rsplit("_", 1)
+        return datetime.fromisoformat(fecha), int(pedido_id)
+    except (AttributeError, ValueError):
+        return None
+
+
 @admin_required
 def pedido_lista(request):
     """
-    Lista todos los pedidos, ordenados por fecha descendente.
+    Lista los pedidos, ordenados por fecha descendente.
+    Se pagina por cursor (?despues=<fecha>_<id>) para no recorrer
+    la tabla completa, con filtros de estatus, rango de fechas y
+    búsqueda por ID o cliente.
     """
-    pedidos = Pedido.objects.order_by('-fecha')
-    return render(request, 'menu/admin_panel/pedido_lista.html', {'pedidos': pedidos})
+    filtros = FormFiltroPedidos(request.GET or None)
+    pedidos = Pedido.objects.select_related('cliente').order_by('-fecha', '-id')
+
+    if filtros.is_valid():
+        datos = filtros.cleaned_data
+
+        if datos["estatus"]:
+            pedidos = pedidos.filter(estatus=datos["estatus"])
+        if datos["desde"]:
+            pedidos = pedidos.filter(fecha__gte=_inicio_del_dia(datos["desde"]))
+        if datos["hasta"]:
+            pedidos = pedidos.filter(fecha__lt=_inicio_del_dia(datos["hasta"] + timedelta(days=1)))
+
+        q = datos["q"].strip()
+        if q.isdigit():
+            pedidos = pedidos.filter(id=int(q))
+        elif q:
+            pedidos = pedidos.filter(cliente__username__istartswith=q)
+
+    # Página siguiente: pedidos anteriores al último que se mostró
+    cursor = _leer_cursor(request.GET.get("despues"))
+    if cursor:
+        fecha, pedido_id = cursor
+        pedidos = pedidos.filter(Q(fecha__lt=fecha) | Q(fecha=fecha, id__lt=pedido_id))
+
+    pagina = list(pedidos[:PEDIDOS_POR_PAGINA + 1])
+    hay_mas = len(pagina) > PEDIDOS_POR_PAGINA
+    pagina = pagina[:PEDIDOS_POR_PAGINA]
+
+    # Links conservando los filtros
+    params = request.GET.copy()
+    params.pop("despues", None)
+    primera_url = f"?{params.urlencode()}"
+    siguiente_url = None
+    if hay_mas:
+        params["despues"] = _cursor_pedido(pagina[-1])
+        siguiente_url = f"?{params.urlencode()}"
+
+    return render(request, 'menu/admin_panel/pedido_lista.html', {
+        'pedidos': pagina,
+        'filtros': filtros,
+        'es_primera': cursor is None,
+        'primera_url': primera_url,
+        'siguiente_url': siguiente_url,
+    })
 
 
 # ============================================================
@@ -264,14 +548,33 @@ def pedido_detalle(request, pedido_id):
     Muestra los detalles del pedido y permite cambiar su estado.
     """
     pedido = get_object_or_404(Pedido, id=pedido_id)
+    status = 200
 
     if request.method == 'POST':
+        estatus_anterior = pedido.estatus
         form = FormPedidoEstado(request.POST, instance=pedido)
         if form.is_valid():
-            form.save()
-            messages.success(request, f"✅ Estado del pedido #{pedido.id} actualizado correctamente.")
-            return redirect('pedido_lista')  # ⬅️ Redirige a la lista general de pedidos
+            try:
+                # Guardar estatus, historial y cola de cocina juntos (compare-and-swap por versión)
+                with transaction.atomic():
+                    cocina.guardar_estatus(pedido, estatus_anterior, form.cleaned_data['version'])
+            except cocina.ConflictoVersion:
+                # Otro usuario lo cambió antes: se muestra el estado actual
+                messages.error(
+                    request,
+                    f"⚠️ Otro usuario actualizó el pedido #{pedido.id} mientras lo editabas. "
+                    "Revisa su estado actual e inténtalo de nuevo."
+                )
+                pedido = get_object_or_404(Pedido, id=pedido_id)
+                form = FormPedidoEstado(instance=pedido)
+                status = 409
+            else:
+                messages.success(request, f"✅ Estado del pedido #{pedido.id} actualizado correctamente.")
+                return redirect('pedido_lista')  # ⬅️ Redirige a la lista general de pedidos
 
+        else:
+            # El form ya copió el estatus rechazado a la instancia
+            pedido.estatus = estatus_anterior
 
     else:
         form = FormPedidoEstado(instance=pedido)
@@ -279,25 +582,209 @@ def pedido_detalle(request, pedido_id):
     return render(request, 'menu/admin_panel/pedido_detalle.html', {
         'pedido': pedido,
         'form': form
+    }, status=status)
+
+
+# ============================================================
+# COCINA — TABLERO
+# ============================================================
+ESTATUS_TABLERO = ("activo", "listo")
+
+# Al pedir cambios se repiten los últimos segundos: un pedido guardado en
+# una transacción que tardó en confirmarse no se pierde (el tablero
+# simplemente lo vuelve a pintar).
+TABLERO_SOLAPE = timedelta(seconds=2)
+
+
+def _pedido_tablero(pedido):
+    return {
+        "id": pedido.id,
+        "estatus": pedido.estatus,
+        "fecha": timezone.localtime(pedido.fecha).strftime("%H:%M"),
+        "cliente": pedido.cliente.get_full_name() or pedido.cliente.username,
+        "mesa": pedido.mesa.numero if pedido.mesa else None,
+        "tiempo_restante": cocina.tiempo_restante(pedido),
+        "items": [
+            {
+                "nombre": det.producto.nombre,
+                "cantidad": det.cantidad,
+                "notas": det.notas,
+            }
+            for det in pedido.detalles.all()
+        ],
+    }
+
+
+@admin_required
+def cocina_tablero(request):
+    """
+    Tablero de cocina: todos los pedidos activos y listos en una
+    pantalla. Se refresca solo con cocina_tablero_datos.
+    """
+    return render(request, 'menu/admin_panel/cocina_tablero.html')
+
+
+@admin_required
+def cocina_tablero_datos(request):
+    """
+    JSON del tablero de cocina.
+    - Sin ?desde: todos los pedidos activos y listos.
+    - Con ?desde=<cursor>: solo los pedidos que cambiaron desde ese
+      momento, incluidos los que ya se entregaron (para quitarlos).
+    Pedidos, detalles y productos salen en dos consultas.
+    """
+    ahora = timezone.now()
+    pedidos = (
+        Pedido.objects
+        .select_related('cliente', 'mesa')
+        .prefetch_related(Prefetch('detalles', queryset=PedidoDetalle.objects.select_related('producto')))
+        .order_by('fecha', 'id')
+    )
+
+    desde = request.GET.get("desde")
+    try:
+        desde = datetime.fromisoformat(desde) if desde else None
+    except ValueError:
+        desde = None
+
+    if desde is None:
+        pedidos = pedidos.filter(estatus__in=ESTATUS_TABLERO)
+    else:
+        pedidos = pedidos.filter(actualizado__gte=desde - TABLERO_SOLAPE)
+
+    return JsonResponse({
+        "cursor": ahora.isoformat(),
+        "completo": desde is None,
+        "pedidos": [_pedido_tablero(p) for p in pedidos],
+    })
+
+
+@admin_required
+def pedidos_cambiar_estatus(request):
+    """
+    Cambio de estatus de varios pedidos a la vez (tablero de cocina).
+
+    Recibe JSON: {"ids": [1, 2], "de": "activo", "a": "listo"}
+    Responde qué ids cambiaron y cuáles se omitieron porque ya no
+    estaban en el estatus esperado.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Método no permitido'}, status=405)
+
+    try:
+        data = json.loads(request.body)
+        ids = [int(i) for i in data.get("ids", [])]
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({'success': False, 'error': 'JSON inválido'}, status=400)
+
+    try:
+        cambiados = cocina.cambiar_estatus_masivo(ids, data.get("de", "activo"), data.get("a"))
+    except cocina.TransicionInvalida as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    conjunto = set(cambiados)
+
+    return JsonResponse({
+        'success': True,
+        'actualizados': cambiados,
+        'omitidos': [i for i in ids if i not in conjunto],
     })
 
 
 # ============================================================
 # REPORTES — VENTAS
 # ============================================================
+REPORTE_POR_PAGINA = 31
+
+
+def _rango_reporte(filtros):
+    """(agrupar, desde, hasta) del formulario del reporte (fechas incluidas)."""
+    if not filtros.is_valid():
+        return "dia", None, None
+
+    datos = filtros.cleaned_data
+    return datos["agrupar"] or "dia", datos["desde"], datos["hasta"]
+
+
 @admin_required
 def reporte_ventas(request):
     """
-    Muestra todas las ventas entregadas y calcula total general.
+    Ventas entregadas agrupadas por día, semana, mes, producto,
+    categoría o método de pago, en un rango de fechas.
+    Lee solo de los acumulados diarios (ver reportes.py).
     """
-    ventas = Pedido.objects.filter(estatus="entregado")
-    total_general = sum(v.total for v in ventas)
+    filtros = FormReporteVentas(request.GET or None)
+    agrupar, desde, hasta = _rango_reporte(filtros)
+
+    grupos = reportes.ventas_agrupadas(agrupar, desde, hasta)
+    pagina = Paginator(grupos, REPORTE_POR_PAGINA).get_page(request.GET.get("page"))
+
+    # Links de página conservando los filtros
+    params = request.GET.copy()
+    params.pop("page", None)
 
     return render(request, 'menu/admin_panel/reporte_ventas.html', {
-        'ventas': ventas,
-        'total_general': total_general
+        'filtros': filtros,
+        'agrupar': agrupar,
+        'nombre_agrupar': dict(reportes.AGRUPACIONES)[agrupar],
+        'es_periodo': agrupar in reportes.PERIODOS,
+        'pagina': pagina,
+        'totales': reportes.totales_ventas(desde, hasta),
+        'params': params.urlencode(),
     })
 
+
+# ============================================================
+# REPORTES — EXPORTAR CSV
+# ============================================================
+class _Eco:
+    """Pseudo-archivo para csv.writer: regresa la línea en lugar de guardarla."""
+
+    def write(self, valor):
+        return valor
+
+
+def _csv_streaming(nombre, encabezado, filas):
+    """
+    Respuesta CSV que se va mandando renglón por renglón, sin armar
+    el archivo completo en memoria.
+    """
+    escritor = csv.writer(_Eco())
+
+    def generar():
+        yield "\ufeff"  # BOM: Excel abre bien los acentos
+        yield escritor.writerow(encabezado)
+        for fila in filas:
+            yield escritor.writerow(fila)
+
+    response = StreamingHttpResponse(generar(), content_type="text/csv; charset=utf-8")
+    response["Content-Disposition"] = f'attachment; filename="{nombre}"'
+    return response
+
+
+@admin_required
+def reporte_ventas_csv(request):
+    """El reporte de ventas (mismos filtros y agrupación) en CSV."""
+    agrupar, desde, hasta = _rango_reporte(FormReporteVentas(request.GET or None))
+    return _csv_streaming(
+        f"ventas_por_{agrupar}.csv",
+        (agrupar, "pedidos", "articulos", "total"),
+        reportes.filas_ventas(agrupar, desde, hasta),
+    )
+
+
+@admin_required
+def exportar_pedidos_csv(request):
+    """Pedidos entregados del rango del reporte, uno por renglón."""
+    _, desde, hasta = _rango_reporte(FormReporteVentas(request.GET or None))
+    return _csv_streaming("pedidos.csv", reportes.ENCABEZADO_PEDIDOS, reportes.filas_pedidos(desde, hasta))
+
+
+@admin_required
+def exportar_detalles_csv(request):
+    """Productos vendidos (renglones de pedido) del rango del reporte."""
+    _, desde, hasta = _rango_reporte(FormReporteVentas(request.GET or None))
+    return _csv_streaming("pedidos_detalle.csv", reportes.ENCABEZADO_DETALLES, reportes.filas_detalles(desde, hasta))
+
 # Solo accesible para administradores
 @user_passes_test(lambda u: u.is_staff)
 def perfil_admin(request):
@@ -1,8 +1,14 @@
 # views_api.py
 
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.shortcuts import get_object_or_404
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from asgiref.sync import sync_to_async
+import asyncio
 import json
 
 # MODELOS QUE NECESITAS
@@ -13,13 +19,29 @@ from .models import (
     Carrito,
     CarritoItem,
     Pedido,
-    PedidoDetalle,
+    IdempotenciaPago,
+    PedidoEntrante,
 )
 
-# UTILIDADES DE TOKEN Y CARRITO
+# UTILIDADES DE TOKEN, CARRITO E IDEMPOTENCIA
 from .api_utils import (
     get_user_from_token,
-    get_or_create_carrito
+    get_or_create_carrito,
+    get_idempotency_key,
+    get_idempotent_response,
+    usar_checkout_asincrono,
+)
+
+# COLA DE COCINA, CREACIÓN DE PEDIDOS Y EVENTOS
+from . import cocina
+from . import eventos
+from . import archivo
+from . import recomendaciones
+from .pedidos import (
+    lineas_de_carrito,
+    crear_pedido,
+    resultado_pedido,
+    encolar_pedido,
 )
 
 
@@ -88,6 +110,7 @@ def api_productos(request):
     Devuelve productos.
     - Si viene ?categoria=ID -> solo de esa categoría
     - Si no viene -> todos los productos activos
+    - ?orden=popular -> los más pedidos primero (&ventana=7 o 30 días, default 30)
     Requiere token.
     """
     user = get_user_from_token(request)
@@ -103,13 +126,18 @@ def api_productos(request):
     if categoria_id and categoria_id.isdigit() and int(categoria_id) > 0:
         productos_qs = productos_qs.filter(categoria_id=int(categoria_id))
 
+    # Ranking precalculado (comando calcular_popularidad), sin agregar aquí
+    if request.GET.get("orden") == "popular":
+        campo = "popularidad__rango_7d" if request.GET.get("ventana") == "7" else "popularidad__rango_30d"
+        productos_qs = productos_qs.order_by(F(campo).asc(nulls_last=True), "nombre")
+
     data = [
         {
             "id": p.id,
             "nombre": p.nombre,
             "descripcion": p.descripcion,
             "precio": float(p.precio),
-            "categoria_id": p.categoria.id,
+            "categoria_id": p.categoria_id,
             # URL ABSOLUTA para que Flutter no vea "file:///media..."
             "imagen": request.build_absolute_uri(p.imagen.url) if p.imagen else None,
         }
@@ -153,7 +181,9 @@ def api_carrito_detalle(request):
     items_json = []
     total = 0
 
-    for item in carrito.items.all():
+    items = list(carrito.items.select_related("producto"))
+
+    for item in items:
         subtotal = float(item.subtotal())
         total += subtotal
 
@@ -170,9 +200,21 @@ def api_carrito_detalle(request):
                       if item.producto.imagen else None,
         })
 
+    # "Se pide junto con": tabla en memoria, sin consultas extra
+    sugeridos = [
+        {
+            "producto_id": p["id"],
+            "nombre": p["nombre"],
+            "precio": float(p["precio"]),
+            "imagen": request.build_absolute_uri(default_storage.url(p["imagen"])) if p["imagen"] else None,
+        }
+        for p in recomendaciones.sugerencias([item.producto_id for item in items])
+    ]
+
     return JsonResponse({
         "items": items_json,
-        "total": total
+        "total": total,
+        "sugerencias": sugeridos,
     })
 
 @csrf_exempt
@@ -233,6 +275,13 @@ def api_confirmar_pago(request):
     """
     Crea un pedido basado en el carrito del usuario.
     Requiere token y recibe JSON con datos de pago.
+
+    Si la app manda el header Idempotency-Key, la respuesta se guarda
+    y un reintento con la misma clave la recibe de nuevo sin crear
+    otro pedido.
+
+    Modo asíncrono (PEDIDOS_CHECKOUT_ASINCRONO en settings, o el header
+    "Prefer: respond-async"): responde 202 con entrante_id y status_url.
     """
     user = get_user_from_token(request)
     if user is None:
@@ -247,12 +296,65 @@ def api_confirmar_pago(request):
     except:
         return JsonResponse({"error": "JSON inválido."}, status=400)
 
+    clave = get_idempotency_key(request)
+
+    # Sin clave: checkout normal (pero atómico)
+    if clave is None:
+        with transaction.atomic():
+            respuesta = _confirmar_pago(request, user, data)
+            if respuesta.status_code >= 400:
+                transaction.set_rollback(True)
+        return respuesta
+
+    if len(clave) > 255:
+        return JsonResponse({"error": "Idempotency-Key demasiado larga."}, status=400)
+
+    # Reintento: repetir la respuesta guardada
+    previa = get_idempotent_response(user, clave)
+    if previa is not None:
+        return previa
+
+    try:
+        with transaction.atomic():
+            # Apartamos la clave primero; un reintento simultáneo se
+            # bloquea en el índice único hasta que este termine
+            registro = IdempotenciaPago.objects.create(usuario=user, clave=clave)
+
+            respuesta = _confirmar_pago(request, user, data)
+
+            if respuesta.status_code >= 400:
+                # Errores no se guardan: la app puede corregir y reintentar
+                transaction.set_rollback(True)
+            else:
+                registro.estado_http = respuesta.status_code
+                registro.respuesta = respuesta.content.decode("utf-8")
+                registro.save(update_fields=["estado_http", "respuesta"])
+    except IntegrityError:
+        # Otro reintento con la misma clave ya creó el pedido
+        previa = get_idempotent_response(user, clave)
+        if previa is not None:
+            return previa
+        return JsonResponse({"error": "El pago ya se está procesando."}, status=409)
+
+    return respuesta
+
+
+def _confirmar_pago(request, user, data):
+    """
+    Pasa el carrito del usuario a un Pedido.
+    Se llama dentro de transaction.atomic(): crear el pedido y vaciar
+    el carrito pasan juntos o no pasan.
+
+    En modo asíncrono solo se guarda la foto del carrito y se responde
+    202 con la URL para consultar cómo va.
+    """
     metodo_pago = data.get("metodo_pago", "tarjeta")
     mesa_numero = data.get("mesa", None)
 
-    # Obtener carrito real
+    # Obtener carrito real (bloqueado para que dos checkouts no lo usen a la vez)
     carrito = get_or_create_carrito(user)
-    items = carrito.items.all()
+    carrito = Carrito.objects.select_for_update().get(pk=carrito.pk)
+    items = list(carrito.items.all())
 
     if not items:
         return JsonResponse({"error": "El carrito está vacío."}, status=400)
@@ -267,44 +369,77 @@ def api_confirmar_pago(request):
         except Mesa.DoesNotExist:
             return JsonResponse({"error": "Mesa no válida."}, status=400)
 
-    # Calcular total
-    total = 0
-    for item in items:
-        total += float(item.subtotal())
-
-    # Crear Pedido
-    pedido = Pedido.objects.create(
-        cliente=user,
-        total=total,
-        estatus="activo",
-        metodo_pago=metodo_pago
-    )
+    lineas = lineas_de_carrito(items)
 
-    # Crear detalles
-    for item in items:
-        PedidoDetalle.objects.create(
-            pedido=pedido,
-            producto=item.producto,
-            cantidad=item.cantidad,
-            precio_unitario=item.precio_unitario,
-            notas=item.nota
-        )
+    if usar_checkout_asincrono(request):
+        entrante = encolar_pedido(user, lineas, metodo_pago, mesa.numero if mesa else None)
+        carrito.items.all().delete()
+
+        status_url = request.build_absolute_uri(f"/api/pago/entrante/{entrante.id}/")
+        respuesta = JsonResponse({
+            "message": "Pedido recibido, se está procesando.",
+            "entrante_id": entrante.id,
+            "estatus": entrante.estatus,
+            "status_url": status_url,
+        }, status=202)
+        respuesta["Location"] = status_url
+        return respuesta
+
+    # Crear Pedido con sus detalles y lugar en la cola de cocina
+    try:
+        pedido = crear_pedido(user, lineas, metodo_pago, mesa)
+    except cocina.CocinaLlena as e:
+        respuesta = JsonResponse({
+            "error": str(e),
+            "reintentar_en": e.reintentar_en,  # minutos
+        }, status=503)
+        respuesta["Retry-After"] = str(e.reintentar_en * 60)
+        return respuesta
 
     # Vaciar carrito
     carrito.items.all().delete()
 
-    # Calcular tiempo estimado
-    pedidos_activos = Pedido.objects.filter(estatus="activo").count()
-    tiempo_estimado = 20 + (pedidos_activos * 10)
-
     # Respuesta final para Flutter
     return JsonResponse({
         "message": "Pedido creado correctamente.",
-        "pedido_id": pedido.id,
-        "total": total,
-        "tiempo_estimado": tiempo_estimado
+        **resultado_pedido(pedido),
     }, status=200)
 
+
+def api_pedido_entrante(request, entrante_id):
+    """
+    Estatus de un pedido enviado en modo asíncrono.
+    Mientras esté pendiente la app debe volver a consultar
+    (header Retry-After); al completarse trae pedido_id y tiempo_estimado.
+    """
+    user = get_user_from_token(request)
+    if user is None:
+        return JsonResponse({"error": "Token inválido."}, status=401)
+
+    try:
+        entrante = PedidoEntrante.objects.get(id=entrante_id, usuario=user)
+    except PedidoEntrante.DoesNotExist:
+        return JsonResponse({"error": "Pedido no encontrado."}, status=404)
+
+    data = {
+        "entrante_id": entrante.id,
+        "estatus": entrante.estatus,
+        "total": float(entrante.total),
+    }
+
+    if entrante.estatus == "completado":
+        data.update(entrante.resultado or {})
+    elif entrante.estatus == "error":
+        data["error"] = "No se pudo crear el pedido. Los productos regresaron al carrito."
+
+    respuesta = JsonResponse(data, status=200)
+    if entrante.estatus == "pendiente":
+        espera = 2
+        if entrante.reintentar_despues:  # falló y espera su siguiente intento
+            espera = max(espera, int((entrante.reintentar_despues - timezone.now()).total_seconds()))
+        respuesta["Retry-After"] = str(espera)
+    return respuesta
+
 def api_pedidos(request):
     """
     Lista todos los pedidos del usuario autenticado por token.
@@ -313,17 +448,23 @@ def api_pedidos(request):
     if user is None:
         return JsonResponse({"error": "Token inválido."}, status=401)
 
-    pedidos = Pedido.objects.filter(cliente=user).order_by("-fecha")
+    # Vigentes + archivados (una consulta, o ninguna si está en caché)
+    pedidos = archivo.lista_de_cliente(user)
 
     data = []
 
     for p in pedidos:
         data.append({
-            "id": p.id,
-            "fecha": p.fecha.strftime("%Y-%m-%d %H:%M"),
-            "total": float(p.total),
-            "estatus": p.estatus,
-            "metodo_pago": p.metodo_pago,
+            "id": p["id"],
+            "fecha": p["fecha"].strftime("%Y-%m-%d %H:%M"),
+            "total": float(p["total"]),
+            "estatus": p["estatus"],
+            "metodo_pago": p["metodo_pago"],
+            # Resumen guardado al crear el pedido (sin leer los detalles)
+            "num_items": p["num_items"],
+            "resumen": p["resumen"],
+            "imagen": request.build_absolute_uri(default_storage.url(p["imagen_principal"]))
+                    if p["imagen_principal"] else None,
         })
 
     return JsonResponse(data, safe=False)
@@ -335,14 +476,13 @@ def api_pedido_detalle(request, pedido_id):
     if user is None:
         return JsonResponse({"error": "Token inválido."}, status=401)
 
-    try:
-        pedido = Pedido.objects.get(id=pedido_id, cliente=user)
-    except Pedido.DoesNotExist:
+    pedido = archivo.buscar_pedido(pedido_id, cliente=user)
+    if pedido is None:
         return JsonResponse({"error": "Pedido no encontrado."}, status=404)
 
     detalles_json = []
 
-    for det in pedido.detalles.all():
+    for det in pedido.detalles.select_related("producto"):
         detalles_json.append({
             "producto_id": det.producto.id,
             "nombre": det.producto.nombre,
@@ -361,11 +501,131 @@ def api_pedido_detalle(request, pedido_id):
         "total": float(pedido.total),
         "estatus": pedido.estatus,
         "metodo_pago": pedido.metodo_pago,
+        "tiempo_estimado": cocina.tiempo_restante(pedido),
         "items": detalles_json
     }
 
     return JsonResponse(data, status=200)
 
+# ============================================================
+# EVENTOS EN TIEMPO REAL (ASGI)
+# ============================================================
+def _usuario_del_token(request):
+    """
+    get_user_from_token para vistas async: cierra la conexión en cuanto
+    termina, así la espera de eventos no tiene una conexión abierta.
+    """
+    try:
+        return get_user_from_token(request)
+    finally:
+        connection.close()
+
+
+def _formato_sse(datos):
+    return f"id: {datos['id'] or ''}\nevent: estatus\ndata: {json.dumps(datos)}\n\n"
+
+
+async def _stream_eventos(user_id, ultimo_id):
+    yield "retry: 3000\n\n"
+
+    async with eventos.hub.suscribir(user_id) as sub:
+        # Al reconectarse la app manda Last-Event-ID: se reenvía lo que se perdió
+        enviados = set()
+        if ultimo_id:
+            perdidos = await sync_to_async(eventos.eventos_desde, thread_sensitive=False)(ultimo_id, [user_id])
+            for datos in perdidos:
+                enviados.add(datos["id"])
+                yield _formato_sse(datos)
+
+        while True:
+            datos = await sub.siguiente(timeout=15)
+            if datos is None:
+                yield ": ping\n\n"  # mantiene viva la conexión
+                continue
+            if datos["id"] in enviados:  # el sondeo también lo trajo
+                continue
+            yield _formato_sse(datos)
+
+
+async def api_pedidos_eventos(request):
+    """
+    Server-Sent Events con los cambios de estatus de los pedidos
+    del usuario (evento "estatus" con pedido_id y estatus).
+    Reemplaza el sondeo de /api/pedidos/<id>/. Requiere token.
+    Pensado para correr con un servidor ASGI (ver sistema_menu/asgi.py).
+    """
+    user = await sync_to_async(_usuario_del_token)(request)
+    if user is None:
+        return JsonResponse({"error": "Token inválido."}, status=401)
+
+    ultimo_id = request.headers.get("Last-Event-ID", "")
+    ultimo_id = int(ultimo_id) if ultimo_id.isdigit() else 0
+
+    respuesta = StreamingHttpResponse(
+        _stream_eventos(user.id, ultimo_id),
+        content_type="text/event-stream",
+    )
+    respuesta["Cache-Control"] = "no-cache"
+    respuesta["X-Accel-Buffering"] = "no"  # que nginx no junte los eventos
+    return respuesta
+
+
+def _estatus_pedido(pedido_id, user):
+    """Estatus actual del pedido del usuario (None si no es suyo); cierra la conexión."""
+    try:
+        return Pedido.objects.filter(id=pedido_id, cliente=user).values_list("estatus", flat=True).first()
+    finally:
+        connection.close()
+
+
+async def api_pedido_esperar(request, pedido_id):
+    """
+    Long-poll: /api/pedidos/<id>/esperar/?estatus=<actual>&timeout=30
+
+    Responde en cuanto el estatus del pedido sea distinto al que manda
+    la app, o al vencer el timeout (máx. 60 s) con cambio=false.
+    Mientras espera no ocupa conexión a la BD. Requiere token.
+
+    El estatus que se responde siempre sale de la BD: los eventos solo
+    despiertan la espera (el sondeo puede traer alguno de unos segundos
+    antes de suscribirse), y al vencer el timeout se lee una vez más
+    por si se perdió alguno.
+    """
+    user = await sync_to_async(_usuario_del_token)(request)
+    if user is None:
+        return JsonResponse({"error": "Token inválido."}, status=401)
+
+    estatus_cliente = request.GET.get("estatus")
+    timeout = request.GET.get("timeout", "30")
+    timeout = min(max(int(timeout), 1), 60) if timeout.isdigit() else 30
+
+    async with eventos.hub.suscribir(user.id) as sub:
+        # Se consulta ya suscrito para no perder un cambio entre ambos pasos
+        estatus = await sync_to_async(_estatus_pedido, thread_sensitive=False)(pedido_id, user)
+        if estatus is None:
+            return JsonResponse({"error": "Pedido no encontrado."}, status=404)
+
+        loop = asyncio.get_running_loop()
+        limite = loop.time() + timeout
+
+        while estatus == estatus_cliente:
+            restante = limite - loop.time()
+            if restante <= 0:
+                break
+            datos = await sub.siguiente(timeout=restante)
+            if datos is not None and datos["pedido_id"] == pedido_id:
+                estatus = await sync_to_async(_estatus_pedido, thread_sensitive=False)(pedido_id, user) or estatus
+
+        if estatus == estatus_cliente:
+            estatus = await sync_to_async(_estatus_pedido, thread_sensitive=False)(pedido_id, user) or estatus
+
+    return JsonResponse({
+        "id": pedido_id,
+        "estatus": estatus,
+        "cambio": estatus != estatus_cliente,
+    })
+
+
 from django.contrib.auth.models import User
 from .models import Perfil, Carrito
 from django.views.decorators.csrf import csrf_exempt
@@ -3,6 +3,10 @@ ASGI config for sistema_menu project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Las vistas async de eventos (/api/pedidos/eventos/) necesitan un servidor
+ASGI para no ocupar un worker por cliente conectado, por ejemplo:
+    uvicorn sistema_menu.asgi:application --workers 4
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -171,6 +171,117 @@ MESSAGE_TAGS = {
 }
 
 
+# ============================================
+# API: IDEMPOTENCY-KEY EN /api/pago/confirmar/
+# ============================================
+# Horas que se guarda la respuesta de un pago para repetirla en reintentos.
+# Los registros vencidos se borran con: python manage.py limpiar_idempotencia
+IDEMPOTENCIA_TTL_HORAS = 24
+
+
+# ============================================
+# API: CHECKOUT ASÍNCRONO
+# ============================================
+# True = /api/pago/confirmar/ siempre encola el pedido y responde 202.
+# Con False la app aún puede pedirlo con el header "Prefer: respond-async".
+# Los pedidos encolados los crea: python manage.py procesar_pedidos
+PEDIDOS_CHECKOUT_ASINCRONO = False
+
+# Un pedido encolado que falla por algo temporal (BD caída, deadlock)
+# se reintenta con espera creciente; pasado este número de intentos
+# queda en "error" y sus productos regresan al carrito.
+PEDIDOS_ENTRANTES_MAX_INTENTOS = 5
+
+
+# ============================================
+# API: EVENTOS DE PEDIDOS (SSE)
+# ============================================
+# "db": los eventos pasan por la tabla EventoPedido (varios procesos).
+# "memoria": solo dentro del mismo proceso (pruebas / runserver).
+EVENTOS_BACKEND = "db"
+EVENTOS_INTERVALO = 1.0  # segundos entre lecturas de eventos nuevos por proceso
+EVENTOS_RETRASO = 5.0  # segundos que se releen por transacciones que confirman tarde
+
+
+# ============================================
+# COCINA: MODELO DE TIEMPO ESTIMADO
+# ============================================
+# Cada cuántos segundos un proceso vuelve a leer los minutos por producto.
+# El modelo se entrena con: python manage.py entrenar_eta
+ETA_CACHE_SEGUNDOS = 300
+
+
+# ============================================
+# RECOMENDACIONES ("SE PIDE JUNTO CON")
+# ============================================
+# Cada cuántos segundos un proceso vuelve a leer la tabla de productos
+# pedidos juntos. Se reconstruye con: python manage.py reconstruir_coocurrencia
+RECOMENDACIONES_CACHE_SEGUNDOS = 300
+
+
+# ============================================
+# CACHÉ
+# ============================================
+# Guarda la sección de categorías del inicio y el historial de pedidos
+# de cada cliente (una llave por cliente). LocMemCache vive dentro de
+# cada worker: cada uno arma su propia copia y, al llegar a MAX_ENTRIES,
+# borra una parte (CULL_FREQUENCY) y esas llaves se vuelven a calcular.
+# Con varios workers conviene un backend compartido (Memcached o Redis)
+# con el mismo TIMEOUT; las llaves ya llevan su versión (menu/versiones.py).
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "sistema-menu",
+        "TIMEOUT": 600,
+        "OPTIONS": {
+            "MAX_ENTRIES": 5000,
+            "CULL_FREQUENCY": 4,
+        },
+    }
+}
+
+
+# ============================================
+# VERSIONES DE CACHÉ (ENTRE WORKERS)
+# ============================================
+# Cada cuántos segundos, como mucho, un worker vuelve a leer la versión
+# del menú / tokens / etc. para saber si su caché sigue vigente
+# (ver menu/versiones.py). El historial de pedidos se revisa en cada request.
+VERSIONES_INTERVALO_SEGUNDOS = 2
+
+
+# ============================================
+# INICIO DEL CLIENTE
+# ============================================
+# Segundos que se guarda en caché la sección de categorías del inicio.
+# Cualquier cambio en productos / categorías la invalida antes (versiones.MENU),
+# en todos los workers.
+MENU_CACHE_SEGUNDOS = 3600
+
+# Segundos que se guarda en caché el historial de pedidos de cada cliente.
+# Cualquier cambio en sus pedidos lo invalida antes (versiones.pedidos_de).
+PEDIDOS_CACHE_SEGUNDOS = 600
+
+
+# ============================================
+# IMPORTACIÓN MASIVA DE PRODUCTOS
+# ============================================
+# Hilos de fondo que procesan las imágenes del zip y lado máximo (px)
+# con el que se guardan.
+IMPORTACION_HILOS = 4
+IMPORTACION_IMAGEN_MAX = 1200
+
+
+# ============================================
+# COCINA: CONTROL DE ADMISIÓN
+# ============================================
+# Límites para aceptar pedidos nuevos (None = sin límite).
+# Al pasarse, el checkout responde 503 con Retry-After; en modo
+# asíncrono los pedidos esperan en la cola de entrada.
+COCINA_MAX_PEDIDOS_ACTIVOS = None
+COCINA_MAX_MINUTOS_PENDIENTES = None
+
+
 # ============================================
 # DEFAULT PRIMARY KEY
 # ============================================